@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Abattage à N joueurs (2 à 6 : 30 cartes sur 32) avec des clés entières.
+
+Chaque main est réduite à une clé entière (moteur.cle_codes : catégorie << 15 | rangs de
+départage sur 3 bits), lue directement dans les tables d'évaluation. Le classement des N mains
+se fait en une passe sur ces entiers, sans construire ni comparer de listes.
+
+Gains (règles LAN de resolve_lan_round, à somme nulle) : chaque perdant paie mise x
+MULTIPLICATEURS[main gagnante] ; le pot est partagé entre les mains à égalité en tête (les
+unités restantes vont aux premiers sièges). À deux joueurs, c'est exactement gains_manche ; le
+mode solo (joueur contre Luigi) n'existe qu'à deux.
+
+Usage : python abattage.py [--donnes 200000]  (vérification contre comparer_mains + mesure)
+"""
+
+import argparse
+import random
+import time
+from collections import namedtuple
+
+from moteur import (DECALAGE_CATEGORIE, MULTIPLICATEURS, NOMS_CATEGORIES, PAQUET, cle_codes, comparer_mains,
+                    evaluer_codes, gains_manche)
+
+MAX_JOUEURS = 6
+
+ResultatAbattage = namedtuple("ResultatAbattage", "gagnants cles variations")
+# gagnants : sièges à égalité en tête ; cles : clé de chaque main ; variations : gain de chaque siège
+
+def nom_cle(cle):
+    return NOMS_CATEGORIES[cle >> DECALAGE_CATEGORIE]
+
+def classer(cles):
+    """(meilleure clé, sièges qui l'ont) en une passe"""
+    meilleure = -1
+    gagnants = []
+    for i, k in enumerate(cles):
+        if k > meilleure:
+            meilleure = k
+            gagnants = [i]
+        elif k == meilleure:
+            gagnants.append(i)
+    return meilleure, gagnants
+
+def abattage(mains, mise, mode="lan"):
+    """mains : une séquence de 5 codes (ou de Carte) par siège"""
+    n = len(mains)
+    if n == 2:
+        # Cas du tête-à-tête (valider, resolve_lan_round) : une seule comparaison d'entiers
+        k0, k1 = cle_codes(*mains[0]), cle_codes(*mains[1])
+        cles = [k0, k1]
+        if k0 == k1: return ResultatAbattage([0, 1], cles, [0, 0])
+        if mode == "solo":
+            if k0 > k1: return ResultatAbattage([0], cles, [mise * MULTIPLICATEURS[nom_cle(k0)], 0])
+            return ResultatAbattage([1], cles, [0, mise])
+        if k0 > k1:
+            gain = mise * MULTIPLICATEURS[nom_cle(k0)]
+            return ResultatAbattage([0], cles, [gain, -gain])
+        gain = mise * MULTIPLICATEURS[nom_cle(k1)]
+        return ResultatAbattage([1], cles, [-gain, gain])
+    if not 2 <= n <= MAX_JOUEURS: raise ValueError(f"De 2 à {MAX_JOUEURS} mains : {n}")
+    if mode == "solo": raise ValueError("Le mode solo se joue à deux")
+    cles = [cle_codes(*m) for m in mains]
+    meilleure, gagnants = classer(cles)
+    variations = [0] * n
+    if len(gagnants) < n:
+        paiement = mise * MULTIPLICATEURS[nom_cle(meilleure)]
+        pot = 0
+        for i, k in enumerate(cles):
+            if k != meilleure:
+                variations[i] = -paiement
+                pot += paiement
+        part, reste = divmod(pot, len(gagnants))
+        for j, i in enumerate(gagnants):
+            variations[i] = part + (j < reste)
+    return ResultatAbattage(gagnants, cles, variations)
+
+# ------------------------
+# Référence : comparaison des tuples (score, nom, ordre_valeurs), deux à deux
+# ------------------------
+def abattage_tuples(mains, mise):
+    """Même résultat qu'abattage(mode="lan") par evaluer_codes + comparer_mains (méthode d'origine)"""
+    res = [evaluer_codes(*m) for m in mains]
+    gagnants = [0]
+    for i in range(1, len(res)):
+        c = comparer_mains(res[i], res[gagnants[0]])
+        if c > 0: gagnants = [i]
+        elif c == 0: gagnants.append(i)
+    variations = [0] * len(res)
+    if len(gagnants) < len(res):
+        paiement = mise * MULTIPLICATEURS.get(res[gagnants[0]][1], 1)
+        perdants = [i for i in range(len(res)) if i not in gagnants]
+        for i in perdants: variations[i] = -paiement
+        part, reste = divmod(paiement * len(perdants), len(gagnants))
+        for j, i in enumerate(gagnants): variations[i] = part + (j < reste)
+    return gagnants, variations
+
+def _donnes(nb, joueurs, graine):
+    rng = random.Random(graine)
+    paquet = list(range(32))
+    donnes = []
+    for _ in range(nb):
+        rng.shuffle(paquet)
+        donnes.append([paquet[5 * i:5 * i + 5] for i in range(joueurs)])
+    return donnes
+
+def verifier(nb, graine=0):
+    """Écarts entre abattage et les méthodes d'origine (2 à 6 joueurs, et gains_manche à 2)"""
+    ecarts = 0
+    for joueurs in range(2, MAX_JOUEURS + 1):
+        for mains in _donnes(nb // 5, joueurs, graine + joueurs):
+            r = abattage(mains, 10)
+            if (r.gagnants, r.variations) != abattage_tuples(mains, 10): ecarts += 1
+            if joueurs == 2:
+                res_j, res_l = evaluer_codes(*mains[0]), evaluer_codes(*mains[1])
+                issue = comparer_mains(res_j, res_l)
+                for mode in ("lan", "solo"):
+                    attendu = list(gains_manche(issue, res_j[1], res_l[1], 10, mode))
+                    if abattage(mains, 10, mode).variations != attendu: ecarts += 1
+    return ecarts
+
+def mesurer(nb, graine=0):
+    resultats = {}
+    for joueurs in (2, MAX_JOUEURS):
+        donnes = [[[PAQUET[c] for c in m] for m in d] for d in _donnes(nb, joueurs, graine)]
+        t0 = time.perf_counter()
+        for mains in donnes: abattage_tuples(mains, 10)
+        t1 = time.perf_counter()
+        for mains in donnes: abattage(mains, 10)
+        t2 = time.perf_counter()
+        resultats[joueurs] = ((t1 - t0) / nb, (t2 - t1) / nb)
+    return resultats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vérifie et mesure l'abattage à clés entières")
+    parser.add_argument("--donnes", type=int, default=200_000)
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+    ecarts = verifier(args.donnes, args.graine)
+    print(f"Vérification : {args.donnes} donnes de 2 à {MAX_JOUEURS} joueurs, {ecarts} écart(s)")
+    for joueurs, (tuples, cles) in mesurer(args.donnes, args.graine).items():
+        print(f"{joueurs} joueurs : tuples {tuples * 1e6:.2f} µs, clés {cles * 1e6:.2f} µs par abattage "
+              f"(x{tuples / cles:.1f})")
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Cache des images de cartes prétraitées (atlas).
+
+Le traitement d'origine (ouverture du PNG, redimensionnement LANCZOS, masque à coins arrondis,
+putalpha) n'est fait qu'une fois par combinaison largeur / hauteur / rayon : les pixels RGBA
+de toutes les cartes sont écrits à la suite dans un seul fichier brut, relu en mmap au lancement
+suivant et découpé en images sans aucun décodage.
+
+Le cache est invalidé si une image source change : même date de modification et même taille
+= inchangée ; sinon la somme SHA-1 du fichier décide (une copie ou une extraction PyInstaller
+dans _MEIPASS change la date sans changer le contenu).
+
+Format (petit-boutiste) :
+  en-tête : "LUAT", version u16, largeur u16, hauteur u16, rayon u16, nb_images u16
+  sources : nb_images x (nom 24s, mtime_ns i64, taille i64, sha1 20s, présente u8)
+  pixels  : nb_images x largeur x hauteur x 4 octets RGBA (zéros pour une image absente)
+
+Usage : python atlas.py [--largeur 120 --hauteur 160 --rayon 14]  (construction contre lecture)
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+from PIL import Image, ImageDraw
+
+VERSION_ATLAS = 1
+_MAGIQUE = b"LUAT"
+_ENTETE = struct.Struct("<4sHHHHH")
+_SOURCE = struct.Struct("<24sqq20sB")
+
+def traiter_image(chemin, largeur, hauteur, rayon):
+    """PNG -> image RGBA redimensionnée à coins arrondis (traitement d'origine du jeu), None si illisible"""
+    try:
+        img = Image.open(chemin).convert("RGBA").resize((largeur, hauteur), Image.LANCZOS)
+        mask = Image.new("L", img.size, 0)
+        draw = ImageDraw.Draw(mask)
+        draw.rounded_rectangle((0, 0, img.width, img.height), radius=rayon, fill=255)
+        img.putalpha(mask)
+        return img
+    except Exception:
+        return None
+
+def fichier_atlas(dossier_cache, largeur, hauteur, rayon):
+    return os.path.join(dossier_cache, f"cartes_{largeur}x{hauteur}_r{rayon}.atlas")
+
+def _sha1(chemin):
+    with open(chemin, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+def _source(chemin):
+    """(mtime_ns, taille, sha1, présente) d'une image source"""
+    try:
+        st = os.stat(chemin)
+        return st.st_mtime_ns, st.st_size, _sha1(chemin), 1
+    except OSError:
+        return 0, -1, b"\0" * 20, 0
+
+def construire_atlas(fichier, dossier, noms, largeur, hauteur, rayon):
+    """Traite les images et écrit l'atlas (remplacement atomique) ; retourne {nom: image RGBA ou None}"""
+    images = {nom: traiter_image(os.path.join(dossier, nom), largeur, hauteur, rayon) for nom in noms}
+    vide = bytes(largeur * hauteur * 4)
+    morceaux = [_ENTETE.pack(_MAGIQUE, VERSION_ATLAS, largeur, hauteur, rayon, len(noms))]
+    for nom in noms:
+        mtime, taille, sha1, presente = _source(os.path.join(dossier, nom))
+        morceaux.append(_SOURCE.pack(nom.encode("utf-8"), mtime, taille, sha1, presente and images[nom] is not None))
+    for nom in noms:
+        morceaux.append(images[nom].tobytes() if images[nom] is not None else vide)
+    temp = fichier + ".tmp"
+    try:
+        with open(temp, "wb") as f:
+            f.write(b"".join(morceaux))
+        os.replace(temp, fichier)
+    except OSError as e:
+        print("Atlas des cartes non enregistré :", e)
+    return images
+
+def _atlas_valide(donnees, dossier, noms, largeur, hauteur, rayon):
+    if len(donnees) < _ENTETE.size: return False
+    if _ENTETE.unpack_from(donnees, 0) != (_MAGIQUE, VERSION_ATLAS, largeur, hauteur, rayon, len(noms)):
+        return False
+    if len(donnees) != _ENTETE.size + len(noms) * (_SOURCE.size + largeur * hauteur * 4):
+        return False
+    for i, nom in enumerate(noms):
+        n, mtime, taille, sha1, presente = _SOURCE.unpack_from(donnees, _ENTETE.size + i * _SOURCE.size)
+        chemin = os.path.join(dossier, nom)
+        if n.rstrip(b"\0") != nom.encode("utf-8"): return False
+        try:
+            st = os.stat(chemin)
+        except OSError:
+            if taille != -1: return False
+            continue
+        if taille == -1: return False
+        if (st.st_mtime_ns, st.st_size) == (mtime, taille): continue
+        if st.st_size != taille or _sha1(chemin) != sha1: return False
+    return True
+
+def charger_cartes(dossier, noms, largeur, hauteur, rayon, dossier_cache, convertir):
+    """{nom: convertir(image RGBA) ou None} et "cache" / "construit".
+    convertir (ex : ImageTk.PhotoImage) copie les pixels : les vues sur le mmap sont libérées ensuite."""
+    fichier = fichier_atlas(dossier_cache, largeur, hauteur, rayon)
+    try:
+        with open(fichier, "rb") as f:
+            donnees = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        donnees = None
+    if donnees is not None:
+        try:
+            if _atlas_valide(donnees, dossier, noms, largeur, hauteur, rayon):
+                vue = memoryview(donnees)
+                debut = _ENTETE.size + len(noms) * _SOURCE.size
+                taille = largeur * hauteur * 4
+                resultat = {}
+                for i, nom in enumerate(noms):
+                    presente = _SOURCE.unpack_from(donnees, _ENTETE.size + i * _SOURCE.size)[4]
+                    if not presente:
+                        resultat[nom] = None
+                        continue
+                    tranche = vue[debut + i * taille:debut + (i + 1) * taille]
+                    img = Image.frombuffer("RGBA", (largeur, hauteur), tranche, "raw", "RGBA", 0, 1)
+                    resultat[nom] = convertir(img)
+                    del img
+                    tranche.release()
+                vue.release()
+                return resultat, "cache"
+        finally:
+            donnees.close()
+    images = construire_atlas(fichier, dossier, noms, largeur, hauteur, rayon)
+    return {nom: convertir(img) if img is not None else None for nom, img in images.items()}, "construit"
+
+if __name__ == "__main__":
+    import sys
+    parser = argparse.ArgumentParser(description="Construit l'atlas des cartes et compare avec la lecture du cache")
+    parser.add_argument("--largeur", type=int, default=120)
+    parser.add_argument("--hauteur", type=int, default=160)
+    parser.add_argument("--rayon", type=int, default=14)
+    args = parser.parse_args()
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    dossier = os.path.join(base, "images")
+    noms = ["7.png", "8.png", "9.png", "10.png", "champi.png", "fleur.png", "mario.png", "etoile.png", "dos.png"]
+    cache = os.path.dirname(os.path.abspath(sys.argv[0]))
+    t0 = time.perf_counter()
+    construire_atlas(fichier_atlas(cache, args.largeur, args.hauteur, args.rayon), dossier, noms,
+                     args.largeur, args.hauteur, args.rayon)
+    t1 = time.perf_counter()
+    # Image.copy() force la lecture des pixels, comme le ferait PhotoImage
+    _, statut = charger_cartes(dossier, noms, args.largeur, args.hauteur, args.rayon, cache, Image.Image.copy)
+    t2 = time.perf_counter()
+    print(f"Traitement des PNG + écriture : {(t1 - t0) * 1e3:.1f} ms")
+    print(f"Lecture de l'atlas ({statut}) : {(t2 - t1) * 1e3:.1f} ms")
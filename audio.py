@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Banque de sons : effets décodés une seule fois, joués sur un pool de canaux.
+
+Les effets sont préchargés sur un thread au démarrage ; jouer() ne touche plus au disque (un son
+demandé avant la fin du préchargement est décodé une fois à la demande). Ils passent par
+NB_CANAUX canaux réservés du mixer pygame (la musique de fond garde son propre flux) :
+  - un canal libre est pris s'il y en a un ;
+  - sinon le son le moins prioritaire (le plus ancien à priorité égale) est coupé si sa priorité
+    est inférieure ou égale à celle du nouveau son ;
+  - sinon le nouveau son est abandonné.
+BackendNul remplace pygame quand le mixer n'est pas disponible ou que la variable d'environnement
+POKER_LUIGI_SANS_SON est définie (exécution sans écran ni carte son, tests).
+"""
+
+import os
+import threading
+import time
+
+NB_CANAUX = 4
+
+class BackendPygame:
+    def __init__(self, nb_canaux):
+        import pygame
+        mixer = pygame.mixer
+        if mixer.get_num_channels() < nb_canaux: mixer.set_num_channels(nb_canaux)
+        mixer.set_reserved(nb_canaux)
+        self.mixer = mixer
+        self.canaux = [mixer.Channel(i) for i in range(nb_canaux)]
+
+    def charger(self, chemin):
+        return self.mixer.Sound(chemin)
+
+    def occupe(self, i):
+        return self.canaux[i].get_busy()
+
+    def jouer(self, i, son):
+        self.canaux[i].play(son)
+
+class BackendNul:
+    """Aucun son : les effets sont "chargés" (vérification du fichier) mais jamais joués"""
+    def __init__(self, nb_canaux):
+        self.canaux = [None] * nb_canaux
+
+    def charger(self, chemin):
+        if not os.path.exists(chemin): raise FileNotFoundError(chemin)
+        return chemin
+
+    def occupe(self, i):
+        return False
+
+    def jouer(self, i, son):
+        pass
+
+def creer_backend(nb_canaux=NB_CANAUX):
+    """BackendPygame si le mixer est initialisé, sinon BackendNul"""
+    if os.environ.get("POKER_LUIGI_SANS_SON"): return BackendNul(nb_canaux)
+    try:
+        import pygame
+        if pygame.mixer.get_init():
+            return BackendPygame(nb_canaux)
+    except Exception as e:
+        print("Sons désactivés :", e)
+    return BackendNul(nb_canaux)
+
+class BanqueSons:
+    def __init__(self, priorites, backend=None, nb_canaux=NB_CANAUX):
+        """priorites : {chemin: priorité}, plus grand = plus important"""
+        self.priorites = dict(priorites)
+        self.backend = backend or creer_backend(nb_canaux)
+        self.sons = {}       # chemin -> son décodé, ou None si absent / illisible
+        self._verrou = threading.Lock()
+        self._canaux = [None] * len(self.backend.canaux)  # (priorité, début) du son en cours
+        self.compteurs = {"joues": 0, "voles": 0, "abandonnes": 0, "absents": 0, "charges_a_la_demande": 0}
+        self.pret = threading.Event()
+
+    def precharger(self):
+        """Décode tous les effets en tâche de fond"""
+        def travail():
+            for chemin in self.priorites: self._son(chemin)
+            self.pret.set()
+        threading.Thread(target=travail, daemon=True).start()
+
+    def _son(self, chemin, a_la_demande=False):
+        with self._verrou:
+            if chemin not in self.sons:
+                try:
+                    self.sons[chemin] = self.backend.charger(chemin)
+                except Exception:
+                    self.sons[chemin] = None
+                if a_la_demande: self.compteurs["charges_a_la_demande"] += 1
+            return self.sons[chemin]
+
+    def _canal(self, priorite):
+        """Indice du canal à utiliser, ou None si le son doit être abandonné"""
+        victime = None
+        for i, en_cours in enumerate(self._canaux):
+            if en_cours is None or not self.backend.occupe(i): return i
+            if victime is None or en_cours < self._canaux[victime]: victime = i
+        if victime is not None and self._canaux[victime][0] <= priorite:
+            self.compteurs["voles"] += 1
+            return victime
+        return None
+
+    def jouer(self, chemin):
+        son = self.sons.get(chemin)
+        if son is None:
+            if chemin in self.sons:
+                self.compteurs["absents"] += 1
+                return
+            son = self._son(chemin, a_la_demande=True)
+            if son is None:
+                self.compteurs["absents"] += 1
+                return
+        priorite = self.priorites.get(chemin, 0)
+        i = self._canal(priorite)
+        if i is None:
+            self.compteurs["abandonnes"] += 1
+            return
+        try:
+            self.backend.jouer(i, son)
+        except Exception:
+            return
+        self._canaux[i] = (priorite, time.perf_counter())
+        self.compteurs["joues"] += 1
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Banc d'essai des chemins critiques (moteur, IA, réseau, rendu).
+
+Chaque mesure est lancée --echauffement fois sans être comptée, puis --repetitions fois ; une
+répétition exécute l'opération n fois et donne un temps par opération. Le résultat est écrit en
+JSON (toutes les répétitions, médiane, moyenne, écart-type, min, opérations/s).
+
+Avec --reference, chaque mesure est comparée à celle d'un fichier précédent : écart des médianes
+et test de Mann-Whitney sur les répétitions. Une mesure est "plus lente" (ou "plus rapide") si
+l'écart dépasse --seuil et que p < 0.05 ; le code de sortie vaut 1 s'il y en a une plus lente.
+
+Les mesures Tk (_charger_images_cartes, afficher_cartes_joueur) ont besoin d'un affichage
+(fenêtre cachée) et sont ignorées sans lui ; de même pour la table de Luigi si strategie_luigi.bin
+n'existe pas.
+
+Usage : python bench.py [--repetitions 7] [--sortie base.json] [--reference base.json] [--filtre reseau]
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from itertools import combinations
+
+from moteur import PAQUET, JeuDeCartes, MainJoueur, Partie, regle_luigi_simple
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+class Ignore(Exception):
+    """Mesure impossible dans cet environnement (raison en message)"""
+
+_BANCS = []
+
+def banc(nom):
+    """Enregistre une préparation : fonction -> (opération sans argument, n par répétition, nettoyage ou None)"""
+    def decorer(f):
+        _BANCS.append((nom, f))
+        return f
+    return decorer
+
+# ------------------------
+# Moteur et IA
+# ------------------------
+@banc("evaluer_main_toutes_mains")
+def _evaluer_main():
+    mains = []
+    for combi in combinations(PAQUET, 5):
+        m = MainJoueur()
+        m.cartes = list(combi)
+        mains.append(m)
+    def op():
+        for m in mains: m.evaluer_main()
+    return op, 1, None
+
+@banc("donne_reinitialiser_piocher")
+def _donne():
+    jeu = JeuDeCartes(random.Random(0))
+    piocher = jeu.piocher
+    def op():
+        jeu.reinitialiser()
+        for _ in range(10): piocher()
+    return op, 10_000, None
+
+def _tour_luigi(table=None):
+    from moteur import installer_strategie_luigi
+    rng = random.Random(1)
+    donnes = []
+    for _ in range(2_000):
+        cartes = list(PAQUET)
+        rng.shuffle(cartes)
+        donnes.append((cartes[:5], cartes[5:]))
+    partie = Partie(10 ** 9, 10 ** 9, "solo", graine=0)
+    main, jeu = partie.luigi.main, partie.jeu
+    it = iter(())
+    def op():
+        nonlocal it
+        donne = next(it, None)
+        if donne is None:
+            it = iter(donnes)
+            donne = next(it)
+        main.cartes = list(donne[0])
+        jeu.cartes = list(donne[1])
+        partie.tour_luigi()
+    installer_strategie_luigi(table)
+    def nettoyer():
+        installer_strategie_luigi(None)
+        if table: table.fermer()
+    return op, 2_000, nettoyer
+
+@banc("tour_luigi_regle_simple")
+def _tour_luigi_simple():
+    return _tour_luigi(None)
+
+@banc("tour_luigi_table")
+def _tour_luigi_table():
+    import strategie
+    if not os.path.exists(strategie.FICHIER_TABLE): raise Ignore("strategie_luigi.bin absent (python strategie.py)")
+    try:
+        table = strategie.TableStrategie(strategie.FICHIER_TABLE)
+    except (OSError, ValueError) as e:
+        raise Ignore(f"table inutilisable : {e}")
+    return _tour_luigi(table)
+
+@banc("manche_solo_complete")
+def _manche():
+    partie = Partie(10 ** 9, 10 ** 9, "solo", graine=0)
+    return (lambda: partie.jouer_manche(10, regle_luigi_simple)), 2_000, None
+
+def _abattage(joueurs, fonction):
+    from abattage import _donnes
+    donnes = [[[PAQUET[c] for c in m] for m in d] for d in _donnes(5_000, joueurs, 0)]
+    def op():
+        for mains in donnes: fonction(mains, 10)
+    return op, 1, None
+
+@banc("abattage_2_joueurs_tuples")
+def _abattage_2_tuples():
+    from abattage import abattage_tuples
+    return _abattage(2, abattage_tuples)
+
+@banc("abattage_2_joueurs_cles")
+def _abattage_2_cles():
+    from abattage import abattage
+    return _abattage(2, abattage)
+
+@banc("abattage_6_joueurs_tuples")
+def _abattage_6_tuples():
+    from abattage import abattage_tuples
+    return _abattage(6, abattage_tuples)
+
+@banc("abattage_6_joueurs_cles")
+def _abattage_6_cles():
+    from abattage import abattage
+    return _abattage(6, abattage)
+
+# ------------------------
+# Réseau (boucle locale)
+# ------------------------
+def _port_libre():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+def _paire_reseau():
+    import io
+    from reseau import NetworkManager
+    port = _port_libre()
+    hote = NetworkManager(True, "127.0.0.1", port)
+    with contextlib.redirect_stdout(io.StringIO()):
+        t = threading.Thread(target=hote.start_host)
+        t.start()
+        client = NetworkManager(False, "127.0.0.1", port)
+        for _ in range(50):
+            if client.start_client(): break
+            time.sleep(0.05)
+        t.join(10)
+    if not hote.conn or not client.conn:
+        hote.close()
+        client.close()
+        raise Ignore("connexion en boucle locale impossible")
+    def fermer():
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.close()
+            hote.close()
+    return hote, client, fermer
+
+@banc("reseau_send")
+def _reseau_send():
+    hote, client, fermer = _paire_reseau()
+    msg = {"type": "HAND", "hand_obj": [0, 5, 10, 15, 20]}
+    # L'hôte vide la socket en continu pour que send() ne bloque jamais sur un tampon plein
+    threading.Thread(target=hote.receive_loop, args=(lambda m: None,), daemon=True).start()
+    return (lambda: client.send(msg)), 5_000, fermer
+
+@banc("reseau_aller_retour")
+def _reseau_aller_retour():
+    hote, client, fermer = _paire_reseau()
+    start = {"type": "START", "hand": [1, 6, 11, 16, 21]}
+    hand = {"type": "HAND", "hand_obj": [0, 5, 10, 15, 20]}
+    def op():
+        hote.send(start)
+        client._recv_message()
+        client.send(hand)
+        hote._recv_message()
+    return op, 2_000, fermer
+
+@banc("reseau_decoupage_trames")
+def _reseau_decoupage():
+    """send() par lots puis découpage des trames arrivées ensemble (chemin de réception seul)"""
+    hote, client, fermer = _paire_reseau()
+    msg = {"type": "HAND", "hand_obj": [0, 5, 10, 15, 20]}
+    lot = 100
+    def op():
+        for _ in range(lot): client.send(msg)
+        for _ in range(lot): hote._recv_message()
+    return op, 50, fermer
+
+# ------------------------
+# Rendu Tk (fenêtre cachée)
+# ------------------------
+_module_jeu = None
+
+def _jeu():
+    """Module "poker Luigi.py" (nom de fichier avec espace : chargé par son chemin)"""
+    global _module_jeu
+    if _module_jeu is None:
+        spec = importlib.util.spec_from_file_location("poker_luigi", os.path.join(DOSSIER, "poker Luigi.py"))
+        _module_jeu = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_module_jeu)
+    return _module_jeu
+
+def _racine():
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise Ignore(f"pas d'affichage : {e}")
+    root.withdraw()
+    return root
+
+def _application(root, jeu):
+    """PokerAppModern réduite aux champs utilisés par le chargement et le rendu des cartes : ni
+    solde, ni historique, ni rejeu, ni son"""
+    import tkinter as tk
+    app = jeu.PokerAppModern.__new__(jeu.PokerAppModern)
+    app.root, app.mode, app.network = root, "solo", None
+    app.partie = Partie(100, 100, "solo", graine=0)
+    app.selection = set()
+    app.lan_opponent_hand = None
+    app.compteurs_rendu = {"widgets_crees": 0, "slots_modifies": 0, "rendus": 0,
+                           "temps_rendu_s": 0.0, "temps_rendu_max_s": 0.0}
+    app._voulu_joueur = [(None, False)] * 5
+    app._voulu_luigi = [(None, False)] * 5
+    app._rendu_prevu = False
+    app._charger_images_cartes()
+    app.image_vide = tk.PhotoImage(width=app.card_w, height=app.card_h)
+    for nom, haut in (("Adversaire", True), ("Toi", False)):
+        pane = tk.Frame(root, bg=app.PANEL)
+        pane.pack()
+        app._construire_pane(pane, nom, app.LUIGI if haut else app.PLAYER, top=haut)
+    return app
+
+@banc("charger_images_cartes")
+def _charger_images():
+    jeu = _jeu()
+    root = _racine()
+    app = _application(root, jeu)
+    return app._charger_images_cartes, 5, root.destroy
+
+@banc("afficher_cartes_joueur")
+def _afficher_cartes():
+    jeu = _jeu()
+    root = _racine()
+    app = _application(root, jeu)
+    partie = app.partie
+    def op():
+        # Nouvelle donne + une carte sélectionnée : 5 places changent, rendu forcé sans attendre la boucle Tk
+        partie.distribuer()
+        app.selection = {0}
+        app.afficher_cartes_joueur()
+        root.update_idletasks()
+    return op, 200, root.destroy
+
+# ------------------------
+# Exécution et comparaison
+# ------------------------
+def mesurer(nom, preparer, repetitions, echauffement):
+    op, n, nettoyer = preparer()
+    try:
+        temps = []
+        for r in range(echauffement + repetitions):
+            t0 = time.perf_counter()
+            for _ in range(n): op()
+            if r >= echauffement: temps.append((time.perf_counter() - t0) / n)
+    finally:
+        if nettoyer: nettoyer()
+    mediane = statistics.median(temps)
+    return {"unite": "s/op", "operations_par_repetition": n, "repetitions": temps,
+            "mediane": mediane, "moyenne": statistics.fmean(temps),
+            "ecart_type": statistics.stdev(temps) if len(temps) > 1 else 0.0,
+            "min": min(temps), "ops_s": 1.0 / mediane if mediane else None}
+
+def mann_whitney(a, b):
+    """p bilatéral du test U de Mann-Whitney (approximation normale, correction des égalités)"""
+    n1, n2 = len(a), len(b)
+    valeurs = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    rangs = [0.0] * len(valeurs)
+    i = 0
+    egalites = 0.0
+    while i < len(valeurs):
+        j = i
+        while j + 1 < len(valeurs) and valeurs[j + 1][0] == valeurs[i][0]: j += 1
+        for k in range(i, j + 1): rangs[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        egalites += t ** 3 - t
+        i = j + 1
+    r1 = sum(r for r, (_, g) in zip(rangs, valeurs) if g == 0)
+    u = r1 - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - egalites / (n * (n - 1)))
+    if variance <= 0: return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return math.erfc(max(z, 0) / math.sqrt(2))
+
+def comparer(resultats, reference, seuil):
+    comparaison = {}
+    for nom, r in resultats.items():
+        base = reference.get(nom)
+        if not base: continue
+        ecart = r["mediane"] / base["mediane"] - 1
+        p = mann_whitney(r["repetitions"], base["repetitions"])
+        verdict = "inchange"
+        if p < 0.05 and abs(ecart) > seuil: verdict = "plus_lent" if ecart > 0 else "plus_rapide"
+        comparaison[nom] = {"ecart": ecart, "p": p, "verdict": verdict}
+    return comparaison
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai de Poker Luigi")
+    parser.add_argument("--repetitions", type=int, default=7)
+    parser.add_argument("--echauffement", type=int, default=1)
+    parser.add_argument("--filtre", default=None, help="seulement les mesures dont le nom contient ce texte")
+    parser.add_argument("--sortie", default=None)
+    parser.add_argument("--reference", default=None, help="résultats JSON d'un lancement précédent")
+    parser.add_argument("--seuil", type=float, default=0.05, help="écart relatif des médianes jugé significatif")
+    parser.add_argument("--lister", action="store_true")
+    args = parser.parse_args()
+    if args.lister:
+        for nom, _ in _BANCS: print(nom)
+        return
+
+    rapport = {"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+               "plateforme": platform.platform(), "processeur": platform.processor() or platform.machine(),
+               "repetitions": args.repetitions, "echauffement": args.echauffement,
+               "resultats": {}, "ignores": {}}
+    for nom, preparer in _BANCS:
+        if args.filtre and args.filtre not in nom: continue
+        try:
+            # Les messages du jeu (chargement des images, connexions) ne doivent pas se mêler au JSON
+            with contextlib.redirect_stdout(sys.stderr):
+                r = mesurer(nom, preparer, args.repetitions, args.echauffement)
+        except Ignore as e:
+            rapport["ignores"][nom] = str(e)
+            print(f"{nom:<28} ignoré : {e}", file=sys.stderr)
+            continue
+        rapport["resultats"][nom] = r
+        print(f"{nom:<28} {r['mediane'] * 1e6:>12.2f} µs/op  ±{r['ecart_type'] / r['mediane']:>6.1%}  "
+              f"{r['ops_s']:>12.0f} op/s", file=sys.stderr)
+
+    regression = False
+    if args.reference:
+        with open(args.reference, "r", encoding="utf-8") as f:
+            reference = json.load(f)["resultats"]
+        rapport["reference"] = args.reference
+        rapport["comparaison"] = comparer(rapport["resultats"], reference, args.seuil)
+        for nom, c in rapport["comparaison"].items():
+            print(f"{nom:<28} {c['ecart']:>+8.1%}  p={c['p']:.3f}  {c['verdict']}", file=sys.stderr)
+            regression |= c["verdict"] == "plus_lent"
+
+    texte = json.dumps(rapport, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f: f.write(texte)
+    else:
+        print(texte)
+    sys.exit(1 if regression else 0)
+
+if __name__ == "__main__":
+    main()
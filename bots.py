@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Interface des bots (stratégies d'échange et de mise).
+
+Un bot reçoit sa main (moteur.MainJoueur) et l'état de la donne (EtatDonne) et répond :
+  - defausse(main, etat) : masque des cartes à échanger (bit i = carte i de main.cartes) ;
+  - mise(main, etat)     : après l'échange, mise proposée parmi etat.mises.
+Un bot ne garde pas d'état entre les manches d'un tournoi (il peut être recréé dans chaque
+processus) ; il est désigné par son nom dans BOTS ou par "module:Classe" (charger_bot).
+
+Bot de référence : "luigi", la règle de Luigi du jeu (table de stratégie, sinon règle simple).
+
+Usage : voir tournoi.py
+"""
+
+import importlib
+from collections import namedtuple
+
+import moteur
+from moteur import choisir_defausse_luigi, regle_luigi_simple
+
+MISES = (10, 20, 30)  # mises proposées par l'interface (diminuer_mise / augmenter_mise)
+
+EtatDonne = namedtuple("EtatDonne", "siege restantes echanges_adverses mises")
+# siege : 0 échange en premier, 1 en second ; restantes : cartes encore dans le paquet ;
+# echanges_adverses : nombre de cartes échangées par l'adversaire (None s'il n'a pas encore joué)
+
+def masque(indices):
+    m = 0
+    for i in indices: m |= 1 << i
+    return m
+
+INDICES = tuple(tuple(i for i in range(5) if m >> i & 1) for m in range(32))
+
+class Bot:
+    """Bot de base : garde sa main et mise le minimum"""
+    nom = "garde"
+    def defausse(self, main, etat):
+        return 0
+    def mise(self, main, etat):
+        return etat.mises[0]
+
+class BotRegleSimple(Bot):
+    """Ancienne règle de Luigi : sous une Suite, jette ses 3 cartes les plus faibles"""
+    nom = "simple"
+    def defausse(self, main, etat):
+        return masque(regle_luigi_simple(main))
+
+class BotLuigi(Bot):
+    """Bot de référence : la décision de Luigi dans le jeu (table de stratégie si disponible)"""
+    nom = "luigi"
+    def __init__(self):
+        if moteur._strategie_luigi is None:
+            try:
+                import strategie
+                moteur.installer_strategie_luigi(strategie.TableStrategie())
+            except (OSError, ValueError) as e:
+                print("Bot luigi : table de stratégie indisponible, règle simple :", e)
+    def defausse(self, main, etat):
+        return masque(choisir_defausse_luigi(main))
+
+class BotPrudent(BotLuigi):
+    """Échange comme Luigi, puis mise selon la main finale : 30 dès le Brelan, 20 sur Double Paire"""
+    nom = "prudent"
+    def mise(self, main, etat):
+        score = main.evaluer_main()[0]
+        if score >= 3: return etat.mises[-1]
+        if score == 2: return etat.mises[len(etat.mises) // 2]
+        return etat.mises[0]
+
+BOTS = {b.nom: b for b in (Bot, BotRegleSimple, BotLuigi, BotPrudent)}
+
+def charger_bot(nom):
+    """Instance d'un bot : nom de BOTS ou "module:Classe" (classe dérivée de Bot)"""
+    if nom in BOTS: return BOTS[nom]()
+    if ":" not in nom: raise ValueError(f"Bot inconnu : {nom} (connus : {', '.join(BOTS)})")
+    module, classe = nom.split(":", 1)
+    return getattr(importlib.import_module(module), classe)()
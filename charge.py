@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Générateur de charge pour le protocole LAN (boucle locale).
+
+Lance N clients scriptés qui jouent des cycles START / HAND, aussi vite que possible ou à une
+cadence fixée, et écrit un rapport JSON (latence p50/p95/p99, manches/s, erreurs) pour comparer
+les changements de protocole ou de serveur d'un commit à l'autre.
+
+Cibles :
+  serveur : clients asyncio face à serveur.py (lancé dans un processus à part, ou --adresse
+            pour un serveur déjà démarré). Un client garde ses cartes, envoie HAND dès le START,
+            résout la manche comme resolve_lan_round et se reconnecte quand sa partie est finie.
+  lan     : paires hôte / client NetworkManager (threads, comme le jeu) ; l'hôte distribue
+            comme lan_host_start_round.
+
+Latence d'une manche, mesurée par le côté qui attend la réponse :
+  serveur : de l'envoi du HAND du client à la réception du HAND adverse relayé par le serveur ;
+  lan     : côté hôte, de l'envoi du START (suivi de son HAND) à la réception du HAND du client,
+            soit un aller-retour START -> HAND complet.
+
+Usage : python charge.py --clients 200 --duree 10 [--cible serveur|lan] [--cadence 5] [--sortie rapport.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import protocole
+from moteur import JeuDeCartes, MainJoueur, Partie, carte_depuis_code
+from serveur import augmenter_limite_fichiers
+
+DELAI_REPONSE = 10.0
+SOLDE_CHARGE = 10 ** 9  # parties sans fin côté serveur lancé par l'outil
+
+def _resoudre(partie, main_adverse):
+    """Même calcul que resolve_lan_round ; True si la partie est finie"""
+    adverse = MainJoueur()
+    adverse.cartes = [carte_depuis_code(c) for c in main_adverse]
+    partie.resoudre(10, adverse)
+    return partie.fin_partie() is not None
+
+class Mesures:
+    def __init__(self):
+        self.latences = []
+        self.erreurs = Counter()
+        self.manches = 0
+        self.connexions = 0
+
+    def rapport(self, cible, clients, cadence, duree):
+        rapport = {"cible": cible, "clients": clients, "cadence": cadence, "duree_s": round(duree, 3),
+                   "manches": self.manches, "manches_s": round(self.manches / duree, 1),
+                   "connexions": self.connexions, "erreurs": dict(self.erreurs),
+                   "taux_erreur": round(sum(self.erreurs.values()) / max(self.manches + sum(self.erreurs.values()), 1), 6)}
+        if len(self.latences) >= 2:
+            q = statistics.quantiles(self.latences, n=100)
+            rapport["latence_ms"] = {"p50": round(q[49] * 1e3, 3), "p95": round(q[94] * 1e3, 3),
+                                     "p99": round(q[98] * 1e3, 3), "max": round(max(self.latences) * 1e3, 3),
+                                     "moyenne": round(statistics.fmean(self.latences) * 1e3, 3)}
+        return rapport
+
+# ------------------------
+# Cible : serveur multi-tables
+# ------------------------
+async def _lire(reader):
+    entete = await reader.readexactly(protocole.ENTETE.size)
+    msglen = protocole.ENTETE.unpack(entete)[0]
+    if msglen > protocole.TAILLE_MAX_CORPS:
+        raise protocole.ErreurProtocole(f"Trame trop grande : {msglen} octets")
+    return protocole.decoder(await reader.readexactly(msglen))
+
+async def client_serveur(adresse, fin, cadence, mesures):
+    periode = 1.0 / cadence if cadence else 0.0
+    while time.perf_counter() < fin:
+        try:
+            reader, writer = await asyncio.open_connection(*adresse)
+        except OSError:
+            mesures.erreurs["connexion"] += 1
+            await asyncio.sleep(0.1)
+            continue
+        mesures.connexions += 1
+        partie = Partie(SOLDE_CHARGE, SOLDE_CHARGE, "lan")
+        envoi = None
+        prochain = time.perf_counter()
+        termine = False
+        try:
+            writer.write(protocole.hello())
+            protocole.verifier_hello(await asyncio.wait_for(_lire(reader), DELAI_REPONSE))
+            while time.perf_counter() < fin:
+                # Jamais bloqué au-delà de la fin du test par un adversaire qui s'est arrêté
+                restant = max(fin - time.perf_counter(), 0.01)
+                msg = await asyncio.wait_for(_lire(reader), min(DELAI_REPONSE, restant))
+                if msg["type"] == "START":
+                    partie.joueur.main.cartes = [carte_depuis_code(c) for c in msg["hand"]]
+                    if periode:
+                        prochain += periode
+                        await asyncio.sleep(max(prochain - time.perf_counter(), 0))
+                    writer.write(protocole.encoder({"type": "HAND", "hand_obj": partie.joueur.main.codes()}))
+                    envoi = time.perf_counter()
+                elif msg["type"] == "HAND" and envoi is not None:
+                    mesures.latences.append(time.perf_counter() - envoi)
+                    mesures.manches += 1
+                    envoi = None
+                    if _resoudre(partie, msg["hand_obj"]):
+                        termine = True
+                        break
+        except asyncio.IncompleteReadError:
+            # Fermeture normale si notre partie vient de finir côté serveur
+            if not termine: mesures.erreurs["deconnexion"] += 1
+        except asyncio.TimeoutError:
+            if time.perf_counter() < fin: mesures.erreurs["delai"] += 1
+        except (protocole.ErreurProtocole, ConnectionError) as e:
+            mesures.erreurs[type(e).__name__] += 1
+        finally:
+            writer.close()
+
+async def charger_serveur(adresse, clients, duree, cadence, mesures):
+    fin = time.perf_counter() + duree
+    await asyncio.gather(*(client_serveur(adresse, fin, cadence, mesures) for _ in range(clients)))
+
+def lancer_serveur(port, delai_manche):
+    """serveur.py dans son propre processus (la charge et le serveur ne partagent pas la boucle)"""
+    dossier = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, os.path.join(dossier, "serveur.py"), "--hote", "127.0.0.1",
+                             "--port", str(port), "--pause", "0", "--solde", str(SOLDE_CHARGE),
+                             "--stats", "0", "--delai-manche", str(delai_manche)],
+                            stdout=subprocess.DEVNULL)
+    limite = time.perf_counter() + 10
+    while time.perf_counter() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("Le serveur ne démarre pas")
+
+# ------------------------
+# Cible : paires NetworkManager (hôte / client du jeu)
+# ------------------------
+def paire_lan(port, fin, cadence, mesures, verrou):
+    from reseau import NetworkManager
+    hote = NetworkManager(True, "127.0.0.1", port)
+    connecte = threading.Thread(target=hote.start_host)
+    connecte.start()
+    client = NetworkManager(False, "127.0.0.1", port)
+    for _ in range(50):
+        if client.start_client(): break
+        client = NetworkManager(False, "127.0.0.1", port)
+        time.sleep(0.05)
+    connecte.join()
+    if not hote.conn or not client.conn:
+        with verrou: mesures.erreurs["connexion"] += 1
+        return
+    with verrou: mesures.connexions += 1
+
+    # Client : répond HAND à chaque START (comme valider en mode lan)
+    def client_recoit(msg):
+        if msg["type"] == "START":
+            client.send({"type": "HAND", "hand_obj": msg["hand"]})
+    threading.Thread(target=client.receive_loop, args=(client_recoit,), daemon=True).start()
+
+    recu = threading.Event()
+    def hote_recoit(msg):
+        if msg["type"] == "HAND": recu.set()
+    threading.Thread(target=hote.receive_loop, args=(hote_recoit,), daemon=True).start()
+
+    jeu = JeuDeCartes()
+    periode = 1.0 / cadence if cadence else 0.0
+    prochain = time.perf_counter()
+    while time.perf_counter() < fin:
+        if periode:
+            prochain += periode
+            time.sleep(max(prochain - time.perf_counter(), 0))
+        jeu.reinitialiser()
+        main_hote = [jeu.piocher() for _ in range(5)]
+        main_client = [jeu.piocher() for _ in range(5)]
+        recu.clear()
+        t0 = time.perf_counter()
+        hote.send({"type": "START", "hand": [int(c) for c in main_client]})
+        hote.send({"type": "HAND", "hand_obj": [int(c) for c in main_hote]})
+        if not recu.wait(DELAI_REPONSE):
+            with verrou: mesures.erreurs["delai"] += 1
+            break
+        with verrou:
+            mesures.latences.append(time.perf_counter() - t0)
+            mesures.manches += 1
+        if not hote.running or not client.running:
+            with verrou: mesures.erreurs["deconnexion"] += 1
+            break
+    hote.close()
+    client.close()
+
+def charger_lan(port, clients, duree, cadence, mesures):
+    fin = time.perf_counter() + duree
+    verrou = threading.Lock()
+    paires = [threading.Thread(target=paire_lan, args=(port + i, fin, cadence, mesures, verrou))
+              for i in range(max(clients // 2, 1))]
+    for t in paires: t.start()
+    for t in paires: t.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du protocole LAN de Poker Luigi")
+    parser.add_argument("--cible", choices=("serveur", "lan"), default="serveur")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duree", type=float, default=10.0)
+    parser.add_argument("--cadence", type=float, default=0.0, help="manches/s par client (0 = au plus vite)")
+    parser.add_argument("--adresse", default=None, help="hote:port d'un serveur déjà lancé (cible serveur)")
+    parser.add_argument("--port", type=int, default=5700)
+    parser.add_argument("--sortie", default=None)
+    args = parser.parse_args()
+
+    mesures = Mesures()
+    if args.cible == "lan":
+        t0 = time.perf_counter()
+        # NetworkManager affiche chaque connexion : on garde la sortie pour le rapport JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            charger_lan(args.port, args.clients, args.duree, args.cadence, mesures)
+    else:
+        augmenter_limite_fichiers()
+        proc = None
+        if args.adresse:
+            hote, port = args.adresse.rsplit(":", 1)
+            adresse = (hote, int(port))
+        else:
+            adresse = ("127.0.0.1", args.port)
+            proc = lancer_serveur(args.port, DELAI_REPONSE)
+        t0 = time.perf_counter()
+        try:
+            asyncio.run(charger_serveur(adresse, args.clients, args.duree, args.cadence, mesures))
+        finally:
+            if proc:
+                proc.terminate()
+                proc.wait()
+    rapport = mesures.rapport(args.cible, args.clients, args.cadence, time.perf_counter() - t0)
+    texte = json.dumps(rapport, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f: f.write(texte)
+    print(texte)
+
+if __name__ == "__main__":
+    main()
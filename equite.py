@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Moteur d'équité pour la phase d'échange (mode solo contre Luigi).
+
+Pour une main de 5 cartes, calcule pour chacun des 32 sous-ensembles de défausse :
+probabilité de victoire / égalité / défaite et gain moyen en crédits (MULTIPLICATEURS x mise).
+Les 27 cartes inconnues contiennent la main de Luigi, nos cartes de remplacement et sa pioche
+(choisir_defausse_luigi, comme Partie.tour_luigi : de 0 à 5 cartes jetées). Luigi joue comme dans
+le jeu : la table de strategie.py (chargée, ou générée si besoin, par la ligne de commande) ; avec
+--regle-luigi simple, ou sans table installée quand le module est importé, il joue regle_luigi_simple.
+
+ - énumération exacte quand le nombre de donnes possibles tient dans le budget ;
+ - sinon tirages aléatoires avec graine (mêmes tirages pour les 32 défausses) + intervalle de confiance à 95 %.
+Les 32 défausses sont réparties sur un pool de processus.
+
+Usage : python equite.py As♥ Roi♥ Dame♥ 7♠ 8♣ [--mise 10] [--mode solo|lan] [--tirages 20000]
+                         [--regle-luigi table|simple]
+        (couleurs acceptées aussi en lettres : c=♥ k=♦ t=♣ p=♠)
+"""
+
+import argparse
+import math
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from moteur import (Carte, JeuDeCartes, MainJoueur, choisir_defausse_luigi, comparer_mains, gains_manche,
+                    installer_strategie_luigi)
+
+Equite = namedtuple("Equite", "defausse victoire egalite defaite gain ic_victoire ic_gain exacte donnes")
+
+# Les 32 défausses possibles (indices des cartes jetées), de la plus petite à la plus grande
+DEFAUSSES = [d for k in range(6) for d in combinations(range(5), k)]
+
+BUDGET_EXACT = 200_000
+NB_TIRAGES = 20_000
+Z_95 = 1.96
+
+def gain_joueur(issue, nom_j, nom_l, mise, mode="solo"):
+    """Variation du solde du joueur pour une manche (règles de moteur.gains_manche)"""
+    return gains_manche(issue, nom_j, nom_l, mise, mode)[0]
+
+def _cartes_inconnues(main):
+    """Les 27 cartes qui ne sont pas dans notre main, tirées d'un JeuDeCartes neuf (ordre stable)"""
+    connues = {c.code for c in main}
+    return sorted((c for c in JeuDeCartes().cartes if c.code not in connues), key=lambda c: c.code)
+
+def _main_luigi_finale(main_l, pioche, jetees=None):
+    """Applique la règle de Luigi ; pioche contient au moins autant de cartes qu'il en jette (5 suffisent)"""
+    if jetees is None: jetees = choisir_defausse_luigi(main_l)
+    if not jetees: return main_l, False
+    if len(pioche) < len(jetees):
+        raise ValueError(f"Pioche de {len(pioche)} cartes pour {len(jetees)} cartes jetées")
+    finale = MainJoueur()
+    finale.cartes = list(main_l.cartes)
+    for i, c in zip(jetees, pioche):
+        finale.cartes[i] = c
+    return finale, True
+
+def evaluer_defausse(main, defausse, mise=10, mode="solo", budget_exact=BUDGET_EXACT, nb_tirages=NB_TIRAGES, graine=0):
+    """Équité d'une défausse (indices dans main, liste de 5 Carte)"""
+    inconnues = _cartes_inconnues(main)
+    gardees = [c for i, c in enumerate(main) if i not in defausse]
+    k = len(defausse)
+    n = len(inconnues)
+    # Majorant du nombre de donnes : nos remplacements x main de Luigi x sa pioche (5 cartes au plus)
+    donnes = math.comb(n, k) * math.comb(n - k, 5) * math.comb(n - k - 5, 5)
+    if donnes <= budget_exact:
+        return _exacte(gardees, defausse, inconnues, mise, mode)
+    return _echantillonnee(gardees, defausse, inconnues, mise, mode, nb_tirages, graine)
+
+def _exacte(gardees, defausse, inconnues, mise, mode):
+    main_j, main_l = MainJoueur(), MainJoueur()
+    k = len(defausse)
+    total_v = total_e = total_g = 0.0
+    nb = 0
+    for remplacement in combinations(inconnues, k):
+        main_j.cartes = gardees + list(remplacement)
+        res_j = main_j.evaluer_main()
+        reste = [c for c in inconnues if c not in remplacement]
+        for cartes_l in combinations(reste, 5):
+            main_l.cartes = list(cartes_l)
+            jetees = choisir_defausse_luigi(main_l)
+            pioches = list(combinations([c for c in reste if c not in cartes_l], len(jetees)))
+            # Chaque main de Luigi pèse 1, répartie uniformément sur ses pioches possibles
+            poids = 1.0 / len(pioches)
+            for pioche in pioches:
+                finale, _ = _main_luigi_finale(main_l, pioche, jetees)
+                res_l = finale.evaluer_main()
+                issue = comparer_mains(res_j, res_l)
+                if issue > 0: total_v += poids
+                elif issue == 0: total_e += poids
+                total_g += poids * gain_joueur(issue, res_j[1], res_l[1], mise, mode)
+            nb += 1
+    return Equite(tuple(defausse), total_v / nb, total_e / nb, 1 - (total_v + total_e) / nb,
+                  total_g / nb, 0.0, 0.0, True, nb)
+
+def _echantillonnee(gardees, defausse, inconnues, mise, mode, nb_tirages, graine):
+    # Même graine pour toutes les défausses : la main et la pioche de Luigi sont identiques
+    # d'une défausse à l'autre, ce qui réduit la variance des comparaisons entre défausses.
+    rng = random.Random(graine)
+    main_j, main_l = MainJoueur(), MainJoueur()
+    k = len(defausse)
+    nb_v = nb_e = 0
+    somme_g = somme_g2 = 0.0
+    for _ in range(nb_tirages):
+        # Main de Luigi, sa pioche (5 places : il jette de 0 à 5 cartes), nos remplacements
+        tirage = rng.sample(inconnues, 15)
+        main_l.cartes = tirage[:5]
+        main_j.cartes = gardees + tirage[10:10 + k]
+        finale, _ = _main_luigi_finale(main_l, tirage[5:10])
+        res_j, res_l = main_j.evaluer_main(), finale.evaluer_main()
+        issue = comparer_mains(res_j, res_l)
+        if issue > 0: nb_v += 1
+        elif issue == 0: nb_e += 1
+        g = gain_joueur(issue, res_j[1], res_l[1], mise, mode)
+        somme_g += g
+        somme_g2 += g * g
+    p = nb_v / nb_tirages
+    gain = somme_g / nb_tirages
+    variance = max(somme_g2 / nb_tirages - gain * gain, 0.0)
+    return Equite(tuple(defausse), p, nb_e / nb_tirages, 1 - (nb_v + nb_e) / nb_tirages, gain,
+                  Z_95 * math.sqrt(p * (1 - p) / nb_tirages), Z_95 * math.sqrt(variance / nb_tirages),
+                  False, nb_tirages)
+
+def _tache(args):
+    return evaluer_defausse(*args)
+
+def _installer_table(fichier):
+    """Processus de calcul : même règle de Luigi que l'appelant"""
+    if fichier:
+        import strategie
+        installer_strategie_luigi(strategie.TableStrategie(fichier))
+
+def analyser_main(main, mise=10, mode="solo", budget_exact=BUDGET_EXACT, nb_tirages=NB_TIRAGES, graine=0, processus=None,
+                  table=None):
+    """Équité des 32 défausses d'une main (liste de 5 Carte), triées par gain moyen décroissant.
+    table : fichier de strategie.py joué par Luigi (None : la règle déjà installée dans ce processus)"""
+    if len(set(main)) != 5: raise ValueError("La main doit contenir 5 cartes distinctes")
+    taches = [(main, d, mise, mode, budget_exact, nb_tirages, graine) for d in DEFAUSSES]
+    if processus == 1:
+        _installer_table(table)
+        resultats = [_tache(t) for t in taches]
+    else:
+        with ProcessPoolExecutor(max_workers=processus or os.cpu_count(), initializer=_installer_table,
+                                 initargs=(table,)) as pool:
+            resultats = list(pool.map(_tache, taches))
+    return sorted(resultats, key=lambda r: r.gain, reverse=True)
+
+LETTRES_COULEURS = {"c": "♥", "k": "♦", "t": "♣", "p": "♠"}
+
+def lire_carte(texte):
+    """'As♥', '10p', 'Valet♣' -> Carte"""
+    valeur, couleur = texte[:-1], texte[-1]
+    couleur = LETTRES_COULEURS.get(couleur.lower(), couleur)
+    if valeur not in Carte.valeurs or couleur not in Carte.couleurs:
+        raise ValueError(f"Carte inconnue : {texte}")
+    return Carte(valeur, couleur)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Équité des 32 défausses d'une main de Poker Luigi")
+    parser.add_argument("cartes", nargs=5, help="ex : As♥ Roi♥ Dame♥ 7p 8t")
+    parser.add_argument("--mise", type=int, default=10)
+    parser.add_argument("--mode", choices=("solo", "lan"), default="solo")
+    parser.add_argument("--tirages", type=int, default=NB_TIRAGES)
+    parser.add_argument("--budget-exact", type=int, default=BUDGET_EXACT)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--processus", type=int, default=None)
+    parser.add_argument("--regle-luigi", choices=("table", "simple"), default="table",
+                        help="table : la table d'échange du jeu (strategie.py) ; simple : regle_luigi_simple")
+    args = parser.parse_args()
+
+    try:
+        main = [lire_carte(t) for t in args.cartes]
+    except ValueError as e:
+        parser.error(str(e))
+    if len(set(main)) != 5:
+        parser.error(f"cartes en double : {' '.join(args.cartes)}")
+    table = None
+    if args.regle_luigi == "table":
+        import strategie
+        strategie.charger_table().fermer()  # (re)générée ici plutôt que dans chaque processus
+        table = strategie.FICHIER_TABLE
+    resultats = analyser_main(main, args.mise, args.mode, args.budget_exact, args.tirages, args.graine, args.processus,
+                              table)
+    print(f"Main : {main}  (mise {args.mise}, mode {args.mode}, Luigi : règle {args.regle_luigi})")
+    print(f"{'Défausse':<24}{'Victoire':>16}{'Égalité':>9}{'Défaite':>9}{'Gain moyen':>18}")
+    for r in resultats:
+        jetees = " ".join(repr(main[i]) for i in r.defausse) or "-"
+        marge = "exact" if r.exacte else f"±{r.ic_victoire:.1%}"
+        print(f"{jetees:<24}{r.victoire:>8.1%} {marge:>7}{r.egalite:>9.1%}{r.defaite:>9.1%}"
+              f"{r.gain:>10.2f} ±{r.ic_gain:.2f}")
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Évaluation de mains en lot (NumPy).
+Outil hors-ligne pour l'analyse et le réglage de l'IA : nécessite numpy (pip install numpy).
+
+Entrée : tableau (N, 5) de codes de cartes 0-31 (rang * 4 + couleur, cf. moteur.Carte.code).
+Sortie : deux tableaux (categorie, cle)
+ - categorie : le score de evaluer_main (0 = Carte haute ... 8 = Quinte Flush)
+ - cle       : ordre_valeurs compacté en base 8, cle = somme(ordre[i] * 8 ** (4 - i)).
+   À catégorie égale, ordre_valeurs a toujours la même longueur, donc comparer les clés
+   revient exactement à comparer les listes comme le font valider / resolve_lan_round.
+
+Usage : python evaluation_vectorisee.py [nb_mains]  (vérification complète + débit)
+"""
+
+import sys
+import time
+from itertools import combinations
+
+import numpy as np
+
+from moteur import NOMS_CATEGORIES, PAQUET, MainJoueur  # NOMS_CATEGORIES : noms des catégories d'evaluer_lot
+
+TAILLE_BLOC = 1 << 16  # garde les tableaux temporaires dans le cache CPU
+_RANGS = np.arange(8, dtype=np.int8)[:, None]
+# Réseau de tri de Batcher pour 8 éléments (19 comparateurs) : trier 8 lignes de longueur N
+# avec np.maximum / np.minimum est bien plus rapide qu'un np.sort sur des lignes de 8.
+_RESEAU_TRI_8 = ((0, 1), (2, 3), (4, 5), (6, 7), (0, 2), (1, 3), (4, 6), (5, 7), (1, 2), (5, 6),
+                 (0, 4), (3, 7), (1, 5), (2, 6), (1, 4), (3, 6), (2, 4), (3, 5), (3, 4))
+
+def evaluer_lot(codes):
+    """Évalue un tableau (N, 5) de codes de cartes. Retourne (categorie int8, cle int32)."""
+    codes = np.asarray(codes)
+    if codes.ndim != 2 or codes.shape[1] != 5:
+        raise ValueError("codes doit être un tableau (N, 5)")
+    n = codes.shape[0]
+    categories = np.empty(n, dtype=np.int8)
+    cles = np.empty(n, dtype=np.int32)
+    for debut in range(0, n, TAILLE_BLOC):
+        fin = min(debut + TAILLE_BLOC, n)
+        # Disposition en colonnes (5, n) : toutes les réductions se font sur des vecteurs contigus
+        colonnes = np.ascontiguousarray(codes[debut:fin].T, dtype=np.int8)
+        categories[debut:fin], cles[debut:fin] = _evaluer_bloc(colonnes)
+    return categories, cles
+
+def _evaluer_bloc(colonnes):
+    rangs = colonnes >> 2
+    couleurs = colonnes & 3
+
+    # Histogramme des rangs (8, n)
+    hist = np.zeros((8, colonnes.shape[1]), dtype=np.int8)
+    for k in range(5):
+        hist += rangs[k] == _RANGS
+
+    flush = ((couleurs[0] == couleurs[1]) & (couleurs[0] == couleurs[2])
+             & (couleurs[0] == couleurs[3]) & (couleurs[0] == couleurs[4]))
+    nb_distincts = np.count_nonzero(hist, axis=0)
+    max_occ = hist.max(axis=0)
+    nb_paires = np.count_nonzero(hist == 2, axis=0)
+    suite = (nb_distincts == 5) & (rangs.max(axis=0) - rangs.min(axis=0) == 4)
+
+    # Même ordre de priorité que MainJoueur.evaluer_main
+    categories = np.select(
+        [flush & suite, (nb_distincts == 2) & (max_occ == 4), nb_distincts == 2, flush, suite,
+         max_occ == 3, nb_paires == 2, nb_paires == 1],
+        [8, 7, 6, 5, 4, 3, 2, 1], default=0).astype(np.int8)
+
+    # ordre_valeurs : rangs présents triés par (occurrences, rang) décroissant, absents en fin (-1)
+    poids = list(np.where(hist > 0, hist * 8 + _RANGS, -1))
+    for i, j in _RESEAU_TRI_8:
+        poids[i], poids[j] = np.maximum(poids[i], poids[j]), np.minimum(poids[i], poids[j])
+    cles = np.zeros(colonnes.shape[1], dtype=np.int32)
+    for p in poids[:5]:
+        cles <<= 3
+        cles |= np.where(p >= 0, p & 7, 0)
+    return categories, cles
+
+def cle_ordre(ordre_valeurs):
+    """Équivalent scalaire de la clé de départage (pour comparer avec evaluer_main)"""
+    return sum(v * 8 ** (4 - i) for i, v in enumerate(ordre_valeurs))
+
+def toutes_les_mains():
+    """Les 201 376 mains de 5 cartes du paquet de 32, en codes (N, 5) uint8"""
+    return np.array(list(combinations(range(32), 5)), dtype=np.uint8)
+
+def mains_aleatoires(n, graine=0):
+    rng = np.random.default_rng(graine)
+    return np.argsort(rng.random((n, 32)), axis=1)[:, :5].astype(np.uint8)
+
+def verifier_espace_complet():
+    """Compare evaluer_lot à MainJoueur.evaluer_main sur tout l'espace des mains. Retourne le nb d'écarts."""
+    codes = toutes_les_mains()
+    categories, cles = evaluer_lot(codes)
+    cartes = list(PAQUET)
+    main = MainJoueur()
+    ecarts = 0
+    for i, ligne in enumerate(codes.tolist()):
+        main.cartes = [cartes[c] for c in ligne]
+        score, _, ordre = main.evaluer_main()
+        if score != categories[i] or cle_ordre(ordre) != cles[i]:
+            ecarts += 1
+    return ecarts
+
+if __name__ == "__main__":
+    nb = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    ecarts = verifier_espace_complet()
+    print(f"Vérification : {len(toutes_les_mains())} mains, {ecarts} écart(s)")
+
+    codes = mains_aleatoires(nb)
+    evaluer_lot(codes[:TAILLE_BLOC])  # chauffe
+    t0 = time.perf_counter()
+    evaluer_lot(codes)
+    duree = time.perf_counter() - t0
+    print(f"Débit : {nb} mains en {duree:.3f} s -> {nb / duree / 1e6:.2f} M mains/s")
+    sys.exit(1 if ecarts else 0)
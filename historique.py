@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Historique des manches (SQLite).
+
+Chaque manche jouée (valider en solo, resolve_lan_round en LAN) devient une ligne : mains
+distribuées, masques de défausse, mains finales, catégorie de chaque main (evaluer_main) et sa
+force = moteur.cle_main(res) (clé entière comparable), mise et gains.
+Les mains sont compactées en un entier (5 codes de 5 bits, dans l'ordre des places : le bit i
+d'un masque de défausse désigne la carte i). En LAN, la donne et la défausse de l'adversaire
+sont inconnues (NULL).
+
+Les écritures passent par un thread : enregistrer() ne fait que déposer la ligne dans une file,
+le thread insère tout ce qui est en attente en une seule transaction.
+
+Usage : python historique.py stats [--base historique.db] [--json]
+        python historique.py remplir 1000000 [--graine 0]   (manches solo simulées, pour tester)
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+from moteur import NOMS_CATEGORIES, Partie, cle_main, evaluer_codes, regle_luigi_simple
+
+FICHIER_HISTORIQUE = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "historique.db")
+TAILLE_LOT = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manches (
+    id INTEGER PRIMARY KEY,
+    horodatage REAL NOT NULL,
+    mode TEXT NOT NULL,
+    mise INTEGER NOT NULL,
+    donne_j INTEGER, defausse_j INTEGER, nb_defausse_j INTEGER,
+    finale_j INTEGER NOT NULL, categorie_donne_j INTEGER, categorie_j INTEGER NOT NULL, force_j INTEGER NOT NULL,
+    donne_l INTEGER, defausse_l INTEGER, nb_defausse_l INTEGER,
+    finale_l INTEGER NOT NULL, categorie_donne_l INTEGER, categorie_l INTEGER NOT NULL, force_l INTEGER NOT NULL,
+    issue INTEGER NOT NULL,
+    delta_j INTEGER NOT NULL,
+    delta_l INTEGER NOT NULL
+);
+-- Index couvrants : chaque agrégat de stats() se lit dans un seul index, sans toucher la table
+CREATE INDEX IF NOT EXISTS idx_categorie_j ON manches (mode, categorie_j, issue, delta_j);
+CREATE INDEX IF NOT EXISTS idx_tirage_l ON manches (mode, nb_defausse_l, categorie_donne_l, categorie_l, delta_l);
+CREATE INDEX IF NOT EXISTS idx_tirage_j ON manches (mode, nb_defausse_j, categorie_donne_j, categorie_j, delta_j);
+"""
+
+_COLONNES = ("horodatage", "mode", "mise",
+             "donne_j", "defausse_j", "nb_defausse_j", "finale_j", "categorie_donne_j", "categorie_j", "force_j",
+             "donne_l", "defausse_l", "nb_defausse_l", "finale_l", "categorie_donne_l", "categorie_l", "force_l",
+             "issue", "delta_j", "delta_l")
+_INSERTION = f"INSERT INTO manches ({', '.join(_COLONNES)}) VALUES ({', '.join('?' * len(_COLONNES))})"
+
+def compacter(codes):
+    """5 codes de cartes -> entier (code de la carte i dans les bits 5i..5i+4)"""
+    n = 0
+    for i, c in enumerate(codes): n |= int(c) << (5 * i)
+    return n
+
+def decompacter(n):
+    return [(n >> (5 * i)) & 31 for i in range(5)]
+
+def ligne_manche(partie, res, mise, main_adverse=None):
+    """Ligne d'historique à partir de moteur.Partie après resoudre() (res = ResultatManche)"""
+    donne_j, donne_l = partie.donnes
+    def_j, def_l = partie.defausses
+    if donne_l is None: def_l = None
+    finale_j = partie.joueur.main.codes()
+    finale_l = (main_adverse or partie.luigi.main).codes()
+    return (time.time(), partie.mode, mise,
+            compacter(donne_j) if donne_j else None, def_j, bin(def_j).count("1"),
+            compacter(finale_j), evaluer_codes(*donne_j)[0] if donne_j else None, res.res_j[0], cle_main(res.res_j),
+            compacter(donne_l) if donne_l else None, def_l, None if def_l is None else bin(def_l).count("1"),
+            compacter(finale_l), evaluer_codes(*donne_l)[0] if donne_l else None, res.res_l[0], cle_main(res.res_l),
+            res.issue, res.delta_joueur, res.delta_luigi)
+
+def ouvrir(fichier=FICHIER_HISTORIQUE):
+    conn = sqlite3.connect(fichier)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+class Historique:
+    """Écrivain en tâche de fond : enregistrer() ne bloque jamais l'interface"""
+    _FIN = object()
+
+    def __init__(self, fichier=FICHIER_HISTORIQUE, taille_lot=TAILLE_LOT):
+        self.fichier = fichier
+        self.taille_lot = taille_lot
+        self.file = queue.Queue()
+        self.ecrites = 0
+        self._thread = threading.Thread(target=self._ecrire, daemon=True)
+        self._thread.start()
+
+    def enregistrer(self, ligne):
+        self.file.put(ligne)
+
+    def _ecrire(self):
+        try:
+            conn = ouvrir(self.fichier)
+        except sqlite3.Error as e:
+            print("Historique indisponible :", e)
+            return
+        fin = False
+        while not fin:
+            lot = [self.file.get()]
+            while len(lot) < self.taille_lot:
+                try: lot.append(self.file.get_nowait())
+                except queue.Empty: break
+            if lot[-1] is self._FIN or self._FIN in lot:
+                fin = True
+                lot = [l for l in lot if l is not self._FIN]
+            if lot:
+                try:
+                    with conn: conn.executemany(_INSERTION, lot)
+                    self.ecrites += len(lot)
+                except sqlite3.Error as e:
+                    print("Erreur historique :", e)
+        conn.close()
+
+    def fermer(self, delai=10.0):
+        """Vide la file puis arrête le thread"""
+        self.file.put(self._FIN)
+        self._thread.join(delai)
+
+# ------------------------
+# Agrégats
+# ------------------------
+def stats(conn, mode=None):
+    filtre, params = ("WHERE mode = ?", (mode,)) if mode else ("", ())
+    et = "AND" if mode else "WHERE"
+    resultat = {}
+    resultat["total"] = [dict(zip(("mode", "manches", "victoires", "egalites", "gain_moyen_j"), r)) for r in conn.execute(
+        f"SELECT mode, COUNT(*), AVG(issue > 0), AVG(issue = 0), AVG(delta_j) FROM manches {filtre} GROUP BY mode",
+        params)]
+    resultat["par_categorie_j"] = [
+        {"categorie": NOMS_CATEGORIES[c], "manches": n, "victoires": v, "gain_moyen_j": g}
+        for c, n, v, g in conn.execute(
+            f"SELECT categorie_j, COUNT(*), AVG(issue > 0), AVG(delta_j) FROM manches INDEXED BY idx_categorie_j "
+            f"{filtre} GROUP BY categorie_j ORDER BY categorie_j", params)]
+    resultat["tirage_luigi"] = [
+        {"cartes_echangees": k, "manches": n, "amelioration": a, "categorie_avant": av, "categorie_apres": ap,
+         "gain_moyen_l": g}
+        for k, n, a, av, ap, g in conn.execute(
+            f"SELECT nb_defausse_l, COUNT(*), AVG(categorie_l > categorie_donne_l), AVG(categorie_donne_l), "
+            f"AVG(categorie_l), AVG(delta_l) FROM manches INDEXED BY idx_tirage_l {filtre} {et} nb_defausse_l IS NOT NULL "
+            f"GROUP BY nb_defausse_l ORDER BY nb_defausse_l", params)]
+    resultat["tirage_joueur"] = [
+        {"cartes_echangees": k, "manches": n, "amelioration": a, "gain_moyen_j": g}
+        for k, n, a, g in conn.execute(
+            f"SELECT nb_defausse_j, COUNT(*), AVG(categorie_j > categorie_donne_j), AVG(delta_j) "
+            f"FROM manches INDEXED BY idx_tirage_j {filtre} {et} nb_defausse_j IS NOT NULL "
+            f"GROUP BY nb_defausse_j ORDER BY nb_defausse_j", params)]
+    return resultat
+
+def remplir(hist, nb, graine=0):
+    """Manches solo simulées (joueur : ancienne règle de Luigi, Luigi : sa règle courante)"""
+    partie = Partie(10 ** 9, 10 ** 9, "solo", random.Random(graine))
+    for _ in range(nb):
+        res = partie.jouer_manche(10, regle_luigi_simple)
+        hist.enregistrer(ligne_manche(partie, res, 10))
+
+def _afficher(resultat):
+    for t in resultat["total"]:
+        print(f"{t['mode']:<5} {t['manches']:>10} manches  victoires {t['victoires']:.1%}  "
+              f"égalités {t['egalites']:.1%}  gain moyen {t['gain_moyen_j']:+.2f}")
+    print("\nCatégorie finale du joueur     Manches  Victoires  Gain moyen")
+    for r in resultat["par_categorie_j"]:
+        print(f"  {r['categorie']:<27}{r['manches']:>9}{r['victoires']:>10.1%}{r['gain_moyen_j']:>+12.2f}")
+    for cle, titre in (("tirage_luigi", "Luigi"), ("tirage_joueur", "joueur")):
+        print(f"\nTirage du {titre} : cartes échangées  Manches  Amélioration  Gain moyen")
+        for r in resultat[cle]:
+            gain = r.get("gain_moyen_l", r.get("gain_moyen_j"))
+            print(f"  {r['cartes_echangees']:>30}{r['manches']:>9}{r['amelioration']:>14.1%}{gain:>+12.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Historique des manches de Poker Luigi")
+    parser.add_argument("commande", choices=("stats", "remplir"))
+    parser.add_argument("nombre", type=int, nargs="?", default=100_000, help="manches à simuler (remplir)")
+    parser.add_argument("--base", default=FICHIER_HISTORIQUE)
+    parser.add_argument("--mode", choices=("solo", "lan"), default=None)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    if args.commande == "remplir":
+        hist = Historique(args.base)
+        remplir(hist, args.nombre, args.graine)
+        hist.fermer(delai=None)
+        print(f"{hist.ecrites} manches écrites en {time.perf_counter() - t0:.1f} s")
+    else:
+        conn = ouvrir(args.base)
+        resultat = stats(conn, args.mode)
+        if args.json: print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        else: _afficher(resultat)
+        print(f"\n({time.perf_counter() - t0:.2f} s)", file=sys.stderr)
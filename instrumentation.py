@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Instrumentation à la demande : chronométrage des fonctions critiques, export,
+profil par échantillonnage.
+
+Rien n'est actif par défaut : le jeu n'importe ce module et ne remplace ses fonctions que si
+POKER_LUIGI_INSTRUMENTATION (fichier JSON d'export) ou POKER_LUIGI_STATS_PORT (port local) est
+défini. Désactivée, l'instrumentation ne coûte donc rien ; activée, un appel mesuré coûte deux
+lectures de perf_counter_ns et une mise à jour d'histogramme (moins d'une microseconde).
+
+Histogrammes : compartiments en puissances de 2 de nanosecondes (compartiment k = durées dans
+[2^(k-1), 2^k) ns), quantiles donnés par la borne haute de leur compartiment (précision x2).
+
+Export :
+  - fichier : instantané JSON réécrit de façon atomique toutes les INTERVALLE_EXPORT secondes et
+    à la sortie ;
+  - port local (127.0.0.1) : une connexion envoie une ligne de commande et reçoit la réponse :
+      stats      instantané JSON (aussi si rien n'est envoyé)
+      profil N   profil par échantillonnage de tous les threads pendant N secondes (texte)
+      remise     remet les mesures à zéro
+
+Usage : python instrumentation.py stats [--port 5599]
+        python instrumentation.py profil 10 [--port 5599] [--sortie profil.txt]
+        python instrumentation.py lire mesures.json
+"""
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+PORT_STATS = 5599
+INTERVALLE_EXPORT = 5.0
+INTERVALLE_ECHANTILLON = 0.005
+DUREE_PROFIL_MAX = 300.0
+_NB_COMPARTIMENTS = 64
+
+class Histogramme:
+    __slots__ = ("appels", "erreurs", "total_ns", "min_ns", "max_ns", "compartiments")
+    def __init__(self):
+        self.appels = self.erreurs = self.total_ns = self.max_ns = 0
+        self.min_ns = None
+        self.compartiments = [0] * _NB_COMPARTIMENTS
+
+    def ajouter(self, ns):
+        self.appels += 1
+        self.total_ns += ns
+        if self.min_ns is None or ns < self.min_ns: self.min_ns = ns
+        if ns > self.max_ns: self.max_ns = ns
+        self.compartiments[min(ns.bit_length(), _NB_COMPARTIMENTS - 1)] += 1
+
+    def quantile(self, q):
+        """Borne haute (ns) du compartiment contenant le quantile q"""
+        rang = q * self.appels
+        cumul = 0
+        for k, n in enumerate(self.compartiments):
+            cumul += n
+            if n and cumul >= rang: return min(1 << k, self.max_ns)
+        return self.max_ns
+
+    def resume(self):
+        if not self.appels: return {"appels": 0, "erreurs": self.erreurs}
+        return {"appels": self.appels, "erreurs": self.erreurs, "total_ms": self.total_ns / 1e6,
+                "moyenne_us": self.total_ns / self.appels / 1e3, "min_us": self.min_ns / 1e3,
+                "p50_us": self.quantile(0.5) / 1e3, "p90_us": self.quantile(0.9) / 1e3,
+                "p99_us": self.quantile(0.99) / 1e3, "max_us": self.max_ns / 1e3,
+                "compartiments_us": {f"<{(1 << k) / 1e3:g}": n for k, n in enumerate(self.compartiments) if n}}
+
+_histogrammes = {}
+_compteurs = Counter()
+_debut = time.time()
+
+def histogramme(nom):
+    h = _histogrammes.get(nom)
+    if h is None: h = _histogrammes[nom] = Histogramme()
+    return h
+
+def compter(nom, n=1):
+    _compteurs[nom] += n
+
+def remise_a_zero():
+    global _debut
+    _histogrammes.clear()
+    _compteurs.clear()
+    _debut = time.time()
+
+# ------------------------
+# Chronométrage
+# ------------------------
+def chronometrer(nom, f):
+    """f enveloppée : chaque appel est ajouté à l'histogramme nom (exceptions comptées à part)"""
+    h = histogramme(nom)
+    horloge = time.perf_counter_ns
+    @functools.wraps(f)
+    def mesuree(*args, **kwargs):
+        t0 = horloge()
+        try:
+            return f(*args, **kwargs)
+        except BaseException:
+            h.erreurs += 1
+            raise
+        finally:
+            h.ajouter(horloge() - t0)
+    return mesuree
+
+def instrumenter(cible, noms, prefixe=None):
+    """Remplace les fonctions noms de cible (classe ou module) par leur version chronométrée"""
+    prefixe = prefixe or getattr(cible, "__name__", type(cible).__name__)
+    for nom in noms:
+        f = getattr(cible, nom)
+        if hasattr(f, "__wrapped__"): continue  # déjà instrumentée
+        setattr(cible, nom, chronometrer(f"{prefixe}.{nom}", f))
+
+def instrumenter_boucle(cible, nom, prefixe=None):
+    """Boucle de réception bloquante (receive_loop(callback)) : mesure chaque message traité par le
+    callback plutôt que la boucle entière"""
+    prefixe = prefixe or cible.__name__
+    boucle = getattr(cible, nom)
+    if hasattr(boucle, "__wrapped__"): return
+    @functools.wraps(boucle)
+    def mesuree(self, callback, *args, **kwargs):
+        return boucle(self, chronometrer(f"{prefixe}.{nom}", callback), *args, **kwargs)
+    setattr(cible, nom, mesuree)
+
+# ------------------------
+# Export
+# ------------------------
+def instantane():
+    return {"horodatage": time.time(), "duree_s": time.time() - _debut, "pid": os.getpid(),
+            "compteurs": dict(_compteurs),
+            "fonctions": {nom: h.resume() for nom, h in sorted(_histogrammes.items())}}
+
+def ecrire(fichier):
+    temp = fichier + ".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(instantane(), f, indent=2, ensure_ascii=False)
+    os.replace(temp, fichier)
+
+def _exporter(fichier, intervalle):
+    while True:
+        time.sleep(intervalle)
+        try: ecrire(fichier)
+        except OSError as e: print("Export des mesures impossible :", e)
+
+# ------------------------
+# Profil par échantillonnage
+# ------------------------
+def profiler(duree, intervalle=INTERVALLE_ECHANTILLON):
+    """Échantillonne les piles Python de tous les autres threads pendant duree secondes.
+    Retourne {"duree_s", "echantillons", "propre": Counter, "inclus": Counter, "piles": Counter}
+    (fonctions "fichier:nom:ligne", piles repliées "thread;f1;f2;..." pour flamegraph.pl)."""
+    moi = threading.get_ident()
+    propre, inclus, piles = Counter(), Counter(), Counter()
+    echantillons = 0
+    t0 = time.perf_counter()
+    fin = t0 + min(duree, DUREE_PROFIL_MAX)
+    while time.perf_counter() < fin:
+        noms = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == moi: continue
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+                frame = frame.f_back
+            if not pile: continue
+            propre[pile[0]] += 1
+            for f in set(pile): inclus[f] += 1
+            piles[";".join([noms.get(ident, str(ident))] + pile[::-1])] += 1
+        echantillons += 1
+        time.sleep(intervalle)
+    return {"duree_s": time.perf_counter() - t0, "echantillons": echantillons,
+            "propre": propre, "inclus": inclus, "piles": piles}
+
+def formater_profil(profil, nb=30):
+    total = max(sum(profil["propre"].values()), 1)
+    lignes = [f"{profil['echantillons']} échantillons en {profil['duree_s']:.1f} s", "",
+              f"{'propre':>8} {'inclus':>8}  fonction"]
+    for f, n in profil["propre"].most_common(nb):
+        lignes.append(f"{n / total:>8.1%} {profil['inclus'][f] / total:>8.1%}  {f}")
+    lignes += ["", "# Piles repliées (flamegraph.pl)"]
+    lignes += [f"{pile} {n}" for pile, n in profil["piles"].most_common()]
+    return "\n".join(lignes) + "\n"
+
+# ------------------------
+# Port de statistiques
+# ------------------------
+def _repondre(conn):
+    with conn:
+        conn.settimeout(0.5)
+        try:
+            commande = conn.recv(256).decode("utf-8", "replace").split()
+        except socket.timeout:
+            commande = []
+        conn.settimeout(None)
+        if commande[:1] == ["profil"]:
+            try:
+                duree = float(commande[1]) if len(commande) > 1 else 10.0
+                if not 0 < duree < float("inf"): raise ValueError(commande[1])
+            except ValueError as e:
+                reponse = f"erreur : durée de profil invalide ({e}), attendu : profil N (secondes)\n"
+            else:
+                reponse = formater_profil(profiler(duree))
+        elif commande[:1] == ["remise"]:
+            remise_a_zero()
+            reponse = "ok\n"
+        else:
+            reponse = json.dumps(instantane(), indent=2, ensure_ascii=False) + "\n"
+        try:
+            conn.sendall(reponse.encode("utf-8"))
+        except OSError:
+            pass  # client parti avant la réponse
+
+def _servir(serveur):
+    while True:
+        conn, _ = serveur.accept()
+        threading.Thread(target=_repondre, args=(conn,), daemon=True).start()
+
+def demarrer(fichier=None, port=None, intervalle=INTERVALLE_EXPORT):
+    """Lance l'export périodique vers fichier et / ou le port de statistiques local"""
+    if fichier:
+        threading.Thread(target=_exporter, args=(fichier, intervalle), daemon=True, name="export-mesures").start()
+        atexit.register(ecrire, fichier)
+    if port:
+        serveur = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        serveur.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        serveur.bind(("127.0.0.1", port))
+        serveur.listen(4)
+        threading.Thread(target=_servir, args=(serveur,), daemon=True, name="port-stats").start()
+        print(f"Statistiques : 127.0.0.1:{port}")
+
+# ------------------------
+# Client en ligne de commande
+# ------------------------
+def interroger(commande, port=PORT_STATS, delai=None):
+    with socket.create_connection(("127.0.0.1", port), timeout=delai) as s:
+        s.sendall(commande.encode("utf-8") + b"\n")
+        morceaux = []
+        while True:
+            m = s.recv(65536)
+            if not m: break
+            morceaux.append(m)
+    return b"".join(morceaux).decode("utf-8")
+
+def afficher(donnees):
+    print(f"{'fonction':<40}{'appels':>9}{'moy µs':>10}{'p50':>9}{'p90':>9}{'p99':>9}{'max µs':>11}{'total ms':>11}")
+    for nom, r in donnees["fonctions"].items():
+        if not r["appels"]: continue
+        print(f"{nom:<40}{r['appels']:>9}{r['moyenne_us']:>10.1f}{r['p50_us']:>9.1f}{r['p90_us']:>9.1f}"
+              f"{r['p99_us']:>9.1f}{r['max_us']:>11.1f}{r['total_ms']:>11.1f}")
+    for nom, n in donnees["compteurs"].items(): print(f"{nom:<40}{n:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesures d'une partie de Poker Luigi lancée avec instrumentation")
+    parser.add_argument("commande", choices=("stats", "profil", "remise", "lire"))
+    parser.add_argument("argument", nargs="?", help="durée du profil (s) ou fichier à lire")
+    parser.add_argument("--port", type=int, default=PORT_STATS)
+    parser.add_argument("--sortie", default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.commande == "lire":
+        with open(args.argument, "r", encoding="utf-8") as f: texte = f.read()
+    elif args.commande == "profil":
+        texte = interroger(f"profil {float(args.argument or 10)}", args.port)
+    else:
+        texte = interroger(args.commande, args.port, delai=10)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f: f.write(texte)
+    if args.commande in ("stats", "lire") and not args.json:
+        afficher(json.loads(texte))
+    elif not args.sortie:
+        print(texte, end="")
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Moteur de jeu (cartes, paquet, évaluation des mains).
+Aucune dépendance graphique ou audio : utilisable en script ou en outil hors-ligne.
+"""
+
+import random
+from collections import namedtuple
+from itertools import combinations
+
+# ------------------------
+# Données
+# ------------------------
+MULTIPLICATEURS = {
+    "Carte haute": 1, "Paire": 2, "Double Paire": 3, "Brelan": 4,
+    "Suite": 5, "Couleur": 6, "Full": 8, "Carré": 10, "Quinte Flush": 20
+}
+
+class Carte(int):
+    """Carte compacte : un entier 0-31 (rang * 4 + couleur). Les 32 instances sont créées une
+    seule fois (PAQUET) ; valeur / couleur / valeur_num restent disponibles pour l'interface."""
+    valeurs = ['7', '8', '9', '10', 'Valet', 'Dame', 'Roi', 'As']
+    couleurs = ['♥', '♦', '♣', '♠']
+    __slots__ = ()
+    def __new__(cls, valeur, couleur):
+        return PAQUET[_INDEX_VALEUR[valeur] * 4 + _INDEX_COULEUR[couleur]]
+    def __repr__(self): return _NOMS[self]
+    def __bool__(self): return True  # le 7♥ (code 0) reste une carte : "if c:" teste seulement None
+    def __reduce__(self): return (carte_depuis_code, (int(self),))
+    @property
+    def code(self): return int(self)
+    @property
+    def valeur(self): return Carte.valeurs[self >> 2]
+    @property
+    def couleur(self): return Carte.couleurs[self & 3]
+    def valeur_num(self): return self >> 2
+
+_INDEX_VALEUR = {v: i for i, v in enumerate(Carte.valeurs)}
+_INDEX_COULEUR = {c: i for i, c in enumerate(Carte.couleurs)}
+PAQUET = tuple(int.__new__(Carte, code) for code in range(32))
+_NOMS = tuple(f"{Carte.valeurs[code >> 2]}{Carte.couleurs[code & 3]}" for code in range(32))
+
+def carte_depuis_code(code):
+    """Code 0-31 (réseau, tables) -> Carte ; lève IndexError si le code est invalide"""
+    if not 0 <= code < 32: raise IndexError(f"Code de carte invalide : {code}")
+    return PAQUET[code]
+
+class JeuDeCartes:
+    __slots__ = ("rng", "cartes")
+    def __init__(self, rng=None):
+        self.rng = rng or random  # random.Random(graine) pour un paquet reproductible
+        self.reinitialiser()
+    def reinitialiser(self, sauf=()):
+        """Paquet complet mélangé, moins les cartes de sauf (codes déjà distribués ailleurs)"""
+        self.cartes = [c for c in PAQUET if c not in sauf] if sauf else list(PAQUET)
+        self.melanger()
+    def melanger(self):
+        self.rng.shuffle(self.cartes)
+    def piocher(self):
+        return self.cartes.pop() if self.cartes else None
+
+class MainJoueur:
+    __slots__ = ("cartes",)
+    def __init__(self): self.cartes = []
+    def ajouter(self, carte):
+        if carte is not None: self.cartes.append(carte)
+    def evaluer_main(self):
+        if len(self.cartes) == 5:
+            return evaluer_codes(*self.cartes)
+        return evaluer_generique([c.valeur for c in self.cartes], [c.couleur for c in self.cartes])
+    def codes(self):
+        """Main sous forme de codes 0-31 (pour le réseau)"""
+        return [int(c) for c in self.cartes]
+
+class Joueur:
+    __slots__ = ("nom", "solde", "main")
+    def __init__(self, nom, solde=100):
+        self.nom = nom
+        self.solde = solde
+        self.main = MainJoueur()
+    def miser(self, montant):
+        if montant > self.solde: return False
+        self.solde -= montant
+        return True
+    def recevoir_gain(self, montant): self.solde += montant
+
+# Table de stratégie (strategie.TableStrategie) ; None tant qu'elle n'est pas installée
+_strategie_luigi = None
+
+def installer_strategie_luigi(table):
+    global _strategie_luigi
+    _strategie_luigi = table
+
+def regle_luigi_simple(main):
+    """Règle historique de Luigi : en dessous d'une Suite, il jette ses 3 cartes les plus faibles"""
+    score, _, _ = main.evaluer_main()
+    if score < 4:
+        return sorted(range(5), key=lambda i: main.cartes[i].valeur_num())[:3]
+    return []
+
+def choisir_defausse_luigi(main):
+    """Indices des cartes que Luigi jette : table de stratégie si elle est installée, sinon règle simple"""
+    if _strategie_luigi is not None and len(main.cartes) == 5:
+        return _strategie_luigi.defausse(main.cartes)
+    return regle_luigi_simple(main)
+
+# ------------------------
+# Manche et partie (machine d'état sans interface)
+# ------------------------
+ResultatManche = namedtuple("ResultatManche", "issue nom_j nom_l delta_joueur delta_luigi res_j res_l")
+
+def comparer_mains(res_j, res_l):
+    """1 si la main du joueur gagne, 0 en cas d'égalité, -1 sinon (score puis ordre_valeurs)"""
+    s_j, _, v_j = res_j
+    s_l, _, v_l = res_l
+    if s_j > s_l or (s_j == s_l and v_j > v_l): return 1
+    if s_j == s_l and v_j == v_l: return 0
+    return -1
+
+def gains_manche(issue, nom_j, nom_l, mise, mode="solo"):
+    """(variation joueur, variation adversaire).
+    Solo : victoire = mise x multiplicateur pour le joueur, défaite = la mise pour Luigi (le joueur n'est pas débité).
+    LAN : à somme nulle, le perdant paie mise x multiplicateur de la main gagnante."""
+    if issue > 0:
+        gain = mise * MULTIPLICATEURS.get(nom_j, 1)
+        return (gain, 0) if mode == "solo" else (gain, -gain)
+    if issue < 0:
+        if mode == "solo": return (0, mise)
+        gain = mise * MULTIPLICATEURS.get(nom_l, 1)
+        return (-gain, gain)
+    return (0, 0)
+
+def nouvelle_graine():
+    """Graine 64 bits imprévisible pour une nouvelle partie"""
+    return random.SystemRandom().getrandbits(64)
+
+class Partie:
+    """État d'une partie : paquet, deux joueurs et phase de la manche en cours.
+    Phases : "attente" -> distribuer() -> "echange" -> resoudre() -> "resolue" (ou "terminee")
+    donnes / defausses : mains distribuées (codes) et masques des places échangées (bit i = carte i),
+    pour l'historique des manches.
+    Sans rng ni jeu, la partie a son propre random.Random(graine) : toutes ses donnes se rejouent
+    à partir de la graine (tirée au hasard si elle n'est pas fournie, voir rejeu.py)."""
+    __slots__ = ("jeu", "joueur", "luigi", "mode", "phase", "donnes", "defausses", "graine")
+    def __init__(self, sj=100, sl=100, mode="solo", rng=None, jeu=None, graine=None):
+        self.graine = None
+        if rng is None and jeu is None:
+            self.graine = nouvelle_graine() if graine is None else graine
+            rng = random.Random(self.graine)
+        self.jeu = jeu or JeuDeCartes(rng)
+        self.joueur = Joueur("Toi", sj)
+        self.luigi = Joueur("Adversaire", sl)
+        self.mode = mode
+        self.phase = "attente"
+        self.donnes = (None, None)
+        self.defausses = [0, 0]
+
+    def distribuer(self):
+        self.jeu.reinitialiser()
+        self.joueur.main.cartes = []
+        self.luigi.main.cartes = []
+        for _ in range(5):
+            self.joueur.main.ajouter(self.jeu.piocher())
+            self.luigi.main.ajouter(self.jeu.piocher())
+        self.noter_donne()
+
+    def noter_donne(self, main_luigi_connue=True):
+        """Début de manche : mémorise les mains distribuées (en LAN, celle de l'adversaire est inconnue)"""
+        self.donnes = (self.joueur.main.codes(), self.luigi.main.codes() if main_luigi_connue else None)
+        self.defausses = [0, 0]
+        self.phase = "echange"
+
+    def echanger_cartes(self, indices):
+        for i in indices:
+            c = self.jeu.piocher()
+            if c:
+                self.joueur.main.cartes[i] = c
+                self.defausses[0] |= 1 << i
+
+    def tour_luigi(self, politique=None):
+        for i in (politique or choisir_defausse_luigi)(self.luigi.main):
+            c = self.jeu.piocher()
+            if c:
+                self.luigi.main.cartes[i] = c
+                self.defausses[1] |= 1 << i
+
+    def resoudre(self, mise, main_adverse=None):
+        """Compare la main du joueur à celle de l'adversaire (Luigi par défaut) et applique les gains"""
+        res_j = self.joueur.main.evaluer_main()
+        res_l = (main_adverse or self.luigi.main).evaluer_main()
+        # Évaluations complètes gardées pour l'historique ; l'issue se décide sur les clés entières
+        k_j, k_l = cle_main(res_j), cle_main(res_l)
+        issue = (k_j > k_l) - (k_j < k_l)
+        d_j, d_l = gains_manche(issue, res_j[1], res_l[1], mise, self.mode)
+        self.joueur.solde += d_j
+        self.luigi.solde += d_l
+        self.phase = "terminee" if self.fin_partie() else "resolue"
+        return ResultatManche(issue, res_j[1], res_l[1], d_j, d_l, res_j, res_l)
+
+    def fin_partie(self):
+        """None tant que la partie continue, sinon "defaite" (joueur à 0) ou "victoire" (adversaire à 0)"""
+        if self.joueur.solde <= 0: return "defaite"
+        if self.luigi.solde <= 0: return "victoire"
+        return None
+
+    def jouer_manche(self, mise, politique_joueur, politique_luigi=None):
+        """Manche complète sans interface : donne, échange du joueur, tour de Luigi, résolution"""
+        self.distribuer()
+        self.echanger_cartes(politique_joueur(self.joueur.main))
+        self.tour_luigi(politique_luigi)
+        return self.resoudre(mise)
+
+# ------------------------
+# Évaluation des mains
+# ------------------------
+def evaluer_generique(valeurs, couleurs):
+    """Algorithme de référence (analyse des fréquences), valable pour n'importe quelle taille de main"""
+    if not valeurs: return (0, "Erreur", [])
+    nums = sorted([Carte.valeurs.index(v) for v in valeurs])
+    unique_vals = len(set(valeurs))
+    flush = len(set(couleurs)) == 1
+    straight = False
+    if len(nums) >= 5:
+         straight = all(nums[i] + 1 == nums[i + 1] for i in range(4))
+    counts = {v: valeurs.count(v) for v in set(valeurs)}
+    tri_counts = sorted(counts.items(), key=lambda x: (x[1], Carte.valeurs.index(x[0])), reverse=True)
+    ordre_valeurs = [Carte.valeurs.index(v) for v, _ in tri_counts]
+
+    if flush and straight: return (8, "Quinte Flush", ordre_valeurs)
+    elif unique_vals == 2:
+        return (7, "Carré", ordre_valeurs) if any(valeurs.count(v) == 4 for v in valeurs) else (6, "Full", ordre_valeurs)
+    elif flush: return (5, "Couleur", ordre_valeurs)
+    elif straight: return (4, "Suite", ordre_valeurs)
+    elif any(valeurs.count(v) == 3 for v in valeurs): return (3, "Brelan", ordre_valeurs)
+    elif sum(1 for v in set(valeurs) if valeurs.count(v) == 2) == 2: return (2, "Double Paire", ordre_valeurs)
+    elif any(valeurs.count(v) == 2 for v in valeurs): return (1, "Paire", ordre_valeurs)
+    else: return (0, "Carte haute", ordre_valeurs)
+
+# Tables par code de carte (0-31) :
+#  - POIDS_RANG : 5 ** rang -> la somme sur 5 cartes encode l'histogramme des rangs en base 5
+#    (au plus 4 cartes par rang), c'est une signature unique de la main hors couleur.
+#  - BIT_RANG / BIT_COULEUR : masques pour reconnaître une couleur et indexer la table des flushs.
+POIDS_RANG = [5 ** (code >> 2) for code in range(32)]
+BIT_RANG = [1 << (code >> 2) for code in range(32)]
+BIT_COULEUR = [1 << (code & 3) for code in range(32)]
+
+_table_rangs = None    # signature base 5 -> (score, nom, ordre_valeurs)
+_table_couleurs = None # masque des 5 rangs -> (score, nom, ordre_valeurs) pour une main d'une seule couleur
+_cles_rangs = None     # mêmes index -> cle_main(...) (entier de classement)
+_cles_couleurs = None
+
+NOMS_CATEGORIES = tuple(MULTIPLICATEURS)  # indexés par score (0 = Carte haute ... 8 = Quinte Flush)
+DECALAGE_CATEGORIE = 15                   # cle_main : score << 15 | ordre_valeurs sur 5 x 3 bits
+
+def cle_main(res):
+    """(score, nom, ordre_valeurs) -> un seul entier ; comparer deux clés = comparer_mains.
+    À score égal, ordre_valeurs a toujours la même longueur : chaque rang (0-7) tient sur 3 bits."""
+    cle = res[0]
+    for v in res[2]: cle = cle << 3 | v
+    return cle << 3 * (5 - len(res[2]))
+
+def _construire_tables():
+    """Construit les tables une seule fois : 784 signatures de rangs + 56 masques de couleur"""
+    global _table_rangs, _table_couleurs, _cles_rangs, _cles_couleurs
+    rangs = {}
+    # Multi-ensembles de 5 rangs parmi 8 (max 4 exemplaires) : couleurs distinctes par rang,
+    # et une 2e couleur si les 5 rangs sont différents pour ne jamais tomber sur une flush.
+    for multi in combinations(range(8 + 4), 5):
+        main = [r - i for i, r in enumerate(multi)]
+        if max(main.count(r) for r in main) > 4: continue
+        codes, vus = [], {}
+        for r in main:
+            codes.append(r * 4 + vus.get(r, 0))
+            vus[r] = vus.get(r, 0) + 1
+        if len(vus) == 5: codes[0] += 1
+        rangs[sum(POIDS_RANG[c] for c in codes)] = _evaluer_reference(codes)
+    couleurs = [None] * 256
+    for main in combinations(range(8), 5):
+        codes = [r * 4 for r in main]
+        couleurs[sum(BIT_RANG[c] for c in codes)] = _evaluer_reference(codes)
+    _table_rangs, _table_couleurs = rangs, couleurs
+    _cles_rangs = {sig: cle_main(res) for sig, res in rangs.items()}
+    _cles_couleurs = [cle_main(res) if res else None for res in couleurs]
+
+def _evaluer_reference(codes):
+    return evaluer_generique([Carte.valeurs[c >> 2] for c in codes], [Carte.couleurs[c & 3] for c in codes])
+
+def evaluer_codes(a, b, c, d, e):
+    """Évalue 5 cartes données par leur code 0-31 en O(1). Même résultat que evaluer_generique."""
+    if _table_rangs is None: _construire_tables()
+    if BIT_COULEUR[a] & BIT_COULEUR[b] & BIT_COULEUR[c] & BIT_COULEUR[d] & BIT_COULEUR[e]:
+        score, nom, ordre = _table_couleurs[BIT_RANG[a] | BIT_RANG[b] | BIT_RANG[c] | BIT_RANG[d] | BIT_RANG[e]]
+    else:
+        score, nom, ordre = _table_rangs[POIDS_RANG[a] + POIDS_RANG[b] + POIDS_RANG[c] + POIDS_RANG[d] + POIDS_RANG[e]]
+    return (score, nom, list(ordre))
+
+def cle_codes(a, b, c, d, e):
+    """Clé de classement (cle_main) de 5 codes de cartes, lue directement dans les tables"""
+    if _cles_rangs is None: _construire_tables()
+    if BIT_COULEUR[a] & BIT_COULEUR[b] & BIT_COULEUR[c] & BIT_COULEUR[d] & BIT_COULEUR[e]:
+        return _cles_couleurs[BIT_RANG[a] | BIT_RANG[b] | BIT_RANG[c] | BIT_RANG[d] | BIT_RANG[e]]
+    return _cles_rangs[POIDS_RANG[a] + POIDS_RANG[b] + POIDS_RANG[c] + POIDS_RANG[d] + POIDS_RANG[e]]
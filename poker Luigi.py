@@ -4,19 +4,22 @@ Poker Luigi - LAN Edition (FINAL V3 - Game Over)
 Ajout : Condition de victoire/défaite à 0 crédits.
 """
 
+import time
+DEBUT = time.perf_counter()
+
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
-import random
-import json
+import atexit
 import os
 import sys
-from PIL import Image, ImageTk, ImageDraw
-import pygame
 import threading
-import socket
-import pickle
-import time
-import struct
+
+from moteur import carte_depuis_code, MainJoueur, Partie, installer_strategie_luigi
+from audio import BanqueSons
+from registre import Registre
+
+# pygame, PIL, le réseau et la table de stratégie sont importés à la première utilisation
+# (ou en tâche de fond après l'affichage du menu) : la première fenêtre n'attend que Tk.
 
 # ------------------------
 # Fonction magique pour le chemin des ressources (.exe)
@@ -35,15 +38,13 @@ dossier_images = resource_path("images")
 dossier_sons = resource_path("sons")
 dossier_courant = os.path.dirname(os.path.abspath(sys.argv[0]))
 FICHIER_SOLDE = os.path.join(dossier_courant, "solde.json")
+FICHIER_JOURNAL = os.path.join(dossier_courant, "solde.journal")
+FICHIER_HISTORIQUE = os.path.join(dossier_courant, "historique.db")
+DOSSIER_REJEUX = os.path.join(dossier_courant, "rejeux")
 
 # ------------------------
 # Son / musique
 # ------------------------
-try:
-    pygame.mixer.init()
-except Exception as e:
-    print("Impossible d'initialiser pygame.mixer:", e)
-
 SON_DSI = os.path.join(dossier_sons, "dsi.wav")
 SON_VICTOIRE = os.path.join(dossier_sons, "victoire.wav")
 SON_DEFAITE = os.path.join(dossier_sons, "defaite.wav")
@@ -53,220 +54,191 @@ SON_FOND = os.path.join(dossier_sons, "fond.mp3")
 SON_START = os.path.join(dossier_sons, "start.wav")
 SON_DISTRIB = os.path.join(dossier_sons, "card_distrib.wav")
 
+# Les résultats passent avant le bruit de distribution quand tous les canaux sont pris
+PRIORITES_SONS = {SON_VICTOIRE: 2, SON_DEFAITE: 2, SON_EGALITE: 2, SON_CLAP: 2,
+                  SON_DSI: 1, SON_START: 1, SON_DISTRIB: 0}
+PERIODE_RESEAU_MS = 16  # vidage des messages reçus par la boucle Tk (reseau.FileMessages)...
+BUDGET_RESEAU_S = 0.008  # ...pendant au plus 8 ms par passage : le reste attend le passage suivant
+DELAI_SON_EN_ATTENTE = 1.5  # un son demandé avant la fin de l'init audio est joué s'il n'est pas trop vieux
+
+banque_sons = None
+_sons_en_attente = []
+_verrou_audio = threading.Lock()
+
+def initialiser_audio():
+    """Import de pygame, mixer, préchargement des effets puis musique de fond (thread lancé après la 1re fenêtre)"""
+    global banque_sons
+    if banque_sons is not None: return
+    if not os.environ.get("POKER_LUIGI_SANS_SON"):
+        try:
+            import pygame
+            pygame.mixer.init()
+        except Exception as e:
+            print("Impossible d'initialiser pygame.mixer:", e)
+    banque = BanqueSons(PRIORITES_SONS)
+    banque.precharger()
+    with _verrou_audio:
+        banque_sons = banque
+        en_attente = _sons_en_attente[:]
+        _sons_en_attente.clear()
+    for fichier, t in en_attente:
+        if time.perf_counter() - t < DELAI_SON_EN_ATTENTE: banque.jouer(fichier)
+    jouer_musique_fond()
+
+def demarrer_audio_en_fond():
+    threading.Thread(target=initialiser_audio, daemon=True).start()
+
 def jouer_son(fichier):
-    if not os.path.exists(fichier): return
-    try:
-        snd = pygame.mixer.Sound(fichier)
-        snd.play()
-    except: pass
+    with _verrou_audio:
+        if banque_sons is None:
+            _sons_en_attente.append((fichier, time.perf_counter()))
+            return
+    banque_sons.jouer(fichier)
 
 def jouer_musique_fond():
-    if not os.path.exists(SON_FOND): return
+    if not os.path.exists(SON_FOND) or os.environ.get("POKER_LUIGI_SANS_SON"): return
     try:
+        import pygame
         pygame.mixer.music.load(SON_FOND)
         pygame.mixer.music.set_volume(0.35)
         pygame.mixer.music.play(-1)
     except: pass
 
-threading.Thread(target=jouer_musique_fond, daemon=True).start()
-
 # ------------------------
 # Données & Logique
 # ------------------------
-MULTIPLICATEURS = {
-    "Carte haute": 1, "Paire": 2, "Double Paire": 3, "Brelan": 4,
-    "Suite": 5, "Couleur": 6, "Full": 8, "Carré": 10, "Quinte Flush": 20
-}
-
-def charger_solde():
-    if os.path.exists(FICHIER_SOLDE):
+_registre = None
+
+def registre_soldes():
+    """Registre des crédits (journal + instantané solde.json), ouvert au premier accès et fermé à la sortie.
+    Si le dossier n'est pas inscriptible, les soldes lus (ou 100/100) sont tenus en mémoire."""
+    global _registre
+    if _registre is None:
+        _registre = Registre(FICHIER_SOLDE, FICHIER_JOURNAL, charger=False)
         try:
-            with open(FICHIER_SOLDE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return data.get("joueur", 100), data.get("luigi", 100)
-        except: return 100, 100
-    return 100, 100
+            _registre.charger()
+        except OSError as e:
+            print("Soldes non enregistrés, partie tenue en mémoire :", e)
+        atexit.register(_registre.fermer)
+    return _registre
 
-def sauvegarder_solde(solde_joueur, solde_luigi):
-    try:
-        with open(FICHIER_SOLDE, "w", encoding="utf-8") as f:
-            json.dump({"joueur": solde_joueur, "luigi": solde_luigi}, f)
-    except: pass
+_historique = None
 
-class Carte:
-    valeurs = ['7', '8', '9', '10', 'Valet', 'Dame', 'Roi', 'As']
-    couleurs = ['♥', '♦', '♣', '♠']
-    def __init__(self, valeur, couleur):
-        self.valeur = valeur
-        self.couleur = couleur
-    def __repr__(self): return f"{self.valeur}{self.couleur}"
-    def valeur_num(self): return Carte.valeurs.index(self.valeur)
-
-class JeuDeCartes:
-    def __init__(self):
-        self.reinitialiser()
-    def reinitialiser(self):
-        self.cartes = [Carte(v, c) for v in Carte.valeurs for c in Carte.couleurs]
-        self.melanger()
-    def melanger(self): 
-        random.shuffle(self.cartes)
-    def piocher(self): 
-        return self.cartes.pop() if self.cartes else None
-
-class MainJoueur:
-    def __init__(self): self.cartes = []
-    def ajouter(self, carte): 
-        if carte is not None: self.cartes.append(carte)
-    def evaluer_main(self):
-        if not self.cartes: return (0, "Erreur", [])
-        valeurs = [c.valeur for c in self.cartes]
-        couleurs = [c.couleur for c in self.cartes]
-        nums = sorted([Carte.valeurs.index(v) for v in valeurs])
-        unique_vals = len(set(valeurs))
-        flush = len(set(couleurs)) == 1
-        straight = False
-        if len(nums) >= 5:
-             straight = all(nums[i] + 1 == nums[i + 1] for i in range(4))
-        counts = {v: valeurs.count(v) for v in set(valeurs)}
-        tri_counts = sorted(counts.items(), key=lambda x: (x[1], Carte.valeurs.index(x[0])), reverse=True)
-        ordre_valeurs = [Carte.valeurs.index(v) for v, _ in tri_counts]
-
-        if flush and straight: return (8, "Quinte Flush", ordre_valeurs)
-        elif unique_vals == 2:
-            return (7, "Carré", ordre_valeurs) if any(valeurs.count(v) == 4 for v in valeurs) else (6, "Full", ordre_valeurs)
-        elif flush: return (5, "Couleur", ordre_valeurs)
-        elif straight: return (4, "Suite", ordre_valeurs)
-        elif any(valeurs.count(v) == 3 for v in valeurs): return (3, "Brelan", ordre_valeurs)
-        elif sum(1 for v in set(valeurs) if valeurs.count(v) == 2) == 2: return (2, "Double Paire", ordre_valeurs)
-        elif any(valeurs.count(v) == 2 for v in valeurs): return (1, "Paire", ordre_valeurs)
-        else: return (0, "Carte haute", ordre_valeurs)
-
-class Joueur:
-    def __init__(self, nom, solde=100):
-        self.nom = nom
-        self.solde = solde
-        self.main = MainJoueur()
-    def miser(self, montant):
-        if montant > self.solde: return False
-        self.solde -= montant
-        return True
-    def recevoir_gain(self, montant): self.solde += montant
+def noter_manche(partie, res, mise, main_adverse=None):
+    """Ajoute la manche à historique.db (écriture sur un thread, sqlite3 importé au premier appel)"""
+    global _historique
+    try:
+        from historique import Historique, ligne_manche
+        if _historique is None:
+            _historique = Historique(FICHIER_HISTORIQUE)
+            atexit.register(_historique.fermer)
+        _historique.enregistrer(ligne_manche(partie, res, mise, main_adverse))
+    except Exception as e:
+        print("Erreur historique:", e)
+
+def enregistreur_rejeu(partie, mise):
+    """Rejeu de la partie solo (graine + échanges + mises) dans rejeux/, None si impossible"""
+    try:
+        from rejeu import Enregistreur
+        os.makedirs(DOSSIER_REJEUX, exist_ok=True)
+        nom = time.strftime("solo_%Y%m%d_%H%M%S") + f"_{partie.graine:016x}.lurp"
+        enr = Enregistreur(os.path.join(DOSSIER_REJEUX, nom), partie, mise)
+        atexit.register(enr.fermer)
+        return enr
+    except (OSError, ValueError) as e:
+        print("Rejeu non enregistré :", e)
+        return None
 
-# ------------------------
-# Classe Réseau (ROBUSTE)
-# ------------------------
-class NetworkManager:
-    def __init__(self, is_host, ip=None, port=5555):
-        self.is_host = is_host
-        self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        self.addr = (ip, port) if ip else ('0.0.0.0', port)
-        self.conn = None
-        self.running = True
-
-    def start_host(self):
-        try:
-            self.client.bind(self.addr)
-            self.client.listen(1)
-            print("Serveur: En attente...")
-            self.conn, addr = self.client.accept()
-            print(f"Serveur: Client connecté {addr}")
-            return True
-        except Exception as e:
-            print("Erreur Host:", e)
-            return False
+def charger_solde():
+    r = registre_soldes()
+    return r.solde_joueur, r.solde_luigi
 
-    def start_client(self):
-        try:
-            self.client.connect(self.addr)
-            self.conn = self.client
-            print("Client: Connecté au serveur")
-            return True
-        except Exception as e:
-            print("Erreur Client:", e)
-            return False
+def sauvegarder_solde(solde_joueur, solde_luigi):
+    """Ajoute la manche au journal (un write ; fsync groupé, instantané périodique)"""
+    try:
+        registre_soldes().enregistrer_soldes(solde_joueur, solde_luigi)
+    except OSError as e:
+        print("Erreur sauvegarde solde:", e)
 
-    def send(self, data):
-        """Envoie des données avec un header de taille (4 bytes)"""
-        try:
-            if self.conn:
-                serialized = pickle.dumps(data)
-                message = struct.pack('>I', len(serialized)) + serialized
-                self.conn.sendall(message)
-        except Exception as e:
-            print("Erreur Send:", e)
-            self.running = False
-
-    def _recv_all(self, n):
-        """Lit exactement n octets du flux"""
-        data = b''
-        while len(data) < n:
-            try:
-                packet = self.conn.recv(n - len(data))
-                if not packet: return None
-                data += packet
-            except: return None
-        return data
-
-    def receive_loop(self, callback):
-        while self.running:
-            try:
-                if self.conn:
-                    raw_msglen = self._recv_all(4)
-                    if not raw_msglen: break
-                    msglen = struct.unpack('>I', raw_msglen)[0]
-                    data = self._recv_all(msglen)
-                    if not data: break
-                    obj = pickle.loads(data)
-                    callback(obj)
-            except Exception as e:
-                print("Erreur Receive:", e)
-                break
-        print("Connexion perdue.")
-
-    def get_local_ip(self):
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except: return "127.0.0.1"
-    
-    def close(self):
-        self.running = False
-        if self.conn: self.conn.close()
-        if self.client: self.client.close()
+def charger_strategie_luigi():
+    """Ouvre (ou régénère) la table d'échange de Luigi ; en attendant il joue la règle simple"""
+    try:
+        import strategie
+        installer_strategie_luigi(strategie.charger_table(processus=True))
+    except Exception as e:
+        print("Stratégie de Luigi indisponible, règle simple utilisée:", e)
 
 # ------------------------
 # Widgets Custom
 # ------------------------
+# Fonds de boutons rendus une seule fois : images PIL partagées par toutes les fenêtres, et une
+# PhotoImage par fenêtre racine (une PhotoImage appartient à l'interpréteur Tk qui l'a créée).
+_fonds_boutons = {}
+
+def _fond_bouton(largeur, hauteur, couleur, enfonce=False):
+    """Pilule arrondie (même géométrie que l'ancien dessin en arcs) ; enfonce = réduite de 2 %"""
+    cle = (largeur, hauteur, couleur, enfonce)
+    img = _fonds_boutons.get(cle)
+    if img is None:
+        from PIL import Image, ImageDraw
+        k = 3  # sur-échantillonnage pour des bords lisses
+        echelle = 0.98 if enfonce else 1.0
+        cx, cy = largeur / 2, hauteur / 2
+        demi_l, demi_h = (largeur / 2 - 2) * echelle, (hauteur / 2 - 2) * echelle
+        radius = (hauteur / 2 - 4) * echelle
+        grand = Image.new("RGBA", (largeur * k, hauteur * k), (0, 0, 0, 0))
+        ImageDraw.Draw(grand).rounded_rectangle(
+            ((cx - demi_l) * k, (cy - demi_h) * k, (cx + demi_l) * k, (cy + demi_h) * k),
+            radius=radius * k, fill=couleur)
+        img = _fonds_boutons[cle] = grand.resize((largeur, hauteur), Image.LANCZOS)
+    return img
+
+def _photo_bouton(widget, largeur, hauteur, couleur, enfonce=False):
+    racine = widget.nametowidget(".")
+    photos = getattr(racine, "_photos_boutons", None)
+    if photos is None: photos = racine._photos_boutons = {}
+    cle = (largeur, hauteur, couleur, enfonce)
+    if cle not in photos:
+        from PIL import ImageTk
+        photos[cle] = ImageTk.PhotoImage(_fond_bouton(*cle), master=racine)
+    return photos[cle]
+
 def bouton_arrondi(parent, texte, command, largeur=180, hauteur=44,
                    couleur="#2E8B57", hover="#3CB371", texte_couleur="white", font=("Helvetica", 12, "bold")):
+    """Canvas à deux items (fond image + texte) : survol et clic ne changent que l'image du fond"""
     canvas = tk.Canvas(parent, width=largeur, height=hauteur, bg=parent["bg"], highlightthickness=0)
-    radius = int(hauteur/2 - 4)
-    x0, y0, x1, y1 = 2, 2, largeur-2, hauteur-2
-    def draw(bg_color):
-        canvas.delete("all")
-        canvas.create_arc(x0, y0, x0+2*radius, y0+2*radius, start=90, extent=90, fill=bg_color, outline=bg_color)
-        canvas.create_arc(x1-2*radius, y0, x1, y0+2*radius, start=0, extent=90, fill=bg_color, outline=bg_color)
-        canvas.create_arc(x0, y1-2*radius, x0+2*radius, y1, start=180, extent=90, fill=bg_color, outline=bg_color)
-        canvas.create_arc(x1-2*radius, y1-2*radius, x1, y1, start=270, extent=90, fill=bg_color, outline=bg_color)
-        canvas.create_rectangle(x0+radius, y0, x1-radius, y1, fill=bg_color, outline=bg_color)
-        canvas.create_rectangle(x0, y0+radius, x1, y1-radius, fill=bg_color, outline=bg_color)
-        canvas.create_text((largeur)//2, (hauteur)//2, text=texte, fill=texte_couleur, font=font)
-    draw(couleur)
-    def on_enter(_): draw(hover)
-    def on_leave(_): draw(couleur)
+    normal = _photo_bouton(canvas, largeur, hauteur, couleur)
+    survol = _photo_bouton(canvas, largeur, hauteur, hover)
+    enfonce = _photo_bouton(canvas, largeur, hauteur, hover, True)
+    fond = canvas.create_image(0, 0, image=normal, anchor="nw")
+    canvas.create_text((largeur)//2, (hauteur)//2, text=texte, fill=texte_couleur, font=font)
+    dedans = [False]
+    def on_enter(_):
+        dedans[0] = True
+        canvas.itemconfigure(fond, image=survol)
+    def on_leave(_):
+        dedans[0] = False
+        canvas.itemconfigure(fond, image=normal)
     def on_click(e=None):
-        canvas.scale("all", largeur//2, hauteur//2, 0.98, 0.98)
-        canvas.after(90, lambda: canvas.scale("all", largeur//2, hauteur//2, 1/0.98, 1/0.98))
+        canvas.itemconfigure(fond, image=enfonce)
+        canvas.after(90, lambda: canvas.itemconfigure(fond, image=survol if dedans[0] else normal))
         if command: command()
     canvas.bind("<Enter>", on_enter)
     canvas.bind("<Leave>", on_leave)
     canvas.bind("<Button-1>", on_click)
     return canvas
 
+class EmplacementCarte:
+    """Une des 5 places d'une main : Frame + Label créés une fois, puis seulement reconfigurés.
+    etat = (visuel, surligné) tel qu'affiché ; visuel = code de carte, "dos" ou None (place vide)"""
+    __slots__ = ("frame", "label", "etat", "colonne")
+    def __init__(self, parent, colonne, bg, image_vide):
+        self.frame = tk.Frame(parent, bg=bg, padx=6, pady=6)
+        self.label = tk.Label(self.frame, image=image_vide, compound="center", bg=bg, fg="white")
+        self.label.pack()
+        self.colonne = colonne
+        self.etat = None
+
 # ------------------------
 # Application Principale
 # ------------------------
@@ -290,25 +262,39 @@ class PokerAppModern:
         # Etats LAN
         self.lan_opponent_hand = None
         self.lan_my_hand_sent = False
+        self.file_reseau = None
         
         # Jeu
         solde_j, solde_l = charger_solde()
-        self.partie = self.PartieWrapper(solde_j, solde_l)
+        self.partie = Partie(solde_j, solde_l, mode)
         self.mise = 10
+        print(f"Graine de la partie : {self.partie.graine:#018x}")
+        self.rejeu = enregistreur_rejeu(self.partie, self.mise) if mode == "solo" else None
         self.mise_max = 30
         self.selection = set()
         self.echange_effectue = False
 
         self._charger_images_cartes()
+        # Image transparente à la taille d'une carte : garde la taille des places sans image
+        self.image_vide = tk.PhotoImage(width=self.card_w, height=self.card_h)
+        self.compteurs_rendu = {"widgets_crees": 0, "slots_modifies": 0, "rendus": 0,
+                                "temps_rendu_s": 0.0, "temps_rendu_max_s": 0.0}
+        self._voulu_joueur = [(None, False)] * 5
+        self._voulu_luigi = [(None, False)] * 5
+        self._rendu_prevu = False
         self.setup_ui()
 
         if self.mode == "solo":
+            threading.Thread(target=charger_strategie_luigi, daemon=True).start()
             self.partie.distribuer()
             self.afficher_cartes_joueur()
             self.masquer_cartes_adversaire()
         elif self.mode == "lan":
             if self.network:
+                from reseau import FileMessages
+                self.file_reseau = FileMessages()
                 threading.Thread(target=self.network.receive_loop, args=(self.on_network_message,), daemon=True).start()
+                self.root.after(PERIODE_RESEAU_MS, self._vider_file_reseau)
             
             if self.network and self.network.is_host:
                 self.root.after(1000, self.lan_host_start_round)
@@ -316,33 +302,6 @@ class PokerAppModern:
                 self.label_status.config(text="En attente de l'hôte pour commencer...")
                 self._set_buttons_state(False)
 
-    class PartieWrapper:
-        def __init__(self, sj, sl):
-            self.jeu = JeuDeCartes()
-            self.joueur = Joueur("Toi", sj)
-            self.luigi = Joueur("Adversaire", sl)
-        
-        def distribuer(self):
-            self.jeu.reinitialiser()
-            self.joueur.main.cartes = []
-            self.luigi.main.cartes = []
-            for _ in range(5):
-                self.joueur.main.ajouter(self.jeu.piocher())
-                self.luigi.main.ajouter(self.jeu.piocher())
-
-        def echanger_cartes(self, indices):
-            for i in indices:
-                c = self.jeu.piocher()
-                if c: self.joueur.main.cartes[i] = c
-        
-        def tour_luigi(self):
-            score, _, _ = self.luigi.main.evaluer_main()
-            if score < 4:
-                indices = sorted(range(5), key=lambda i: self.luigi.main.cartes[i].valeur_num())[:3]
-                for i in indices: 
-                    c = self.jeu.piocher()
-                    if c: self.luigi.main.cartes[i] = c
-
     # --------------------
     # UI Setup
     # --------------------
@@ -376,8 +335,16 @@ class PokerAppModern:
         tk.Label(parent, text=nom, font=("Segoe UI", 14, "bold"), fg=color, bg=self.PANEL).pack(anchor="w", padx=12, pady=(10,0))
         frame = tk.Frame(parent, bg=self.PANEL)
         frame.pack(pady=10)
-        if top: self.frame_luigi_cartes = frame
-        else: self.frame_joueur_cartes = frame
+        slots = [EmplacementCarte(frame, i, self.PANEL, self.image_vide) for i in range(5)]
+        self.compteurs_rendu["widgets_crees"] += 2 * len(slots)
+        if top:
+            self.frame_luigi_cartes = frame
+            self.slots_luigi = slots
+        else:
+            self.frame_joueur_cartes = frame
+            self.slots_joueur = slots
+            for i, slot in enumerate(slots):
+                slot.label.bind("<Button-1>", lambda e, idx=i: self.toggle_selection(idx))
 
     def _construire_actions(self, parent):
         if self.mode == "solo":
@@ -407,77 +374,83 @@ class PokerAppModern:
 
     def _charger_images_cartes(self):
         print(f"Chargement images : {dossier_images}")
+        t0 = time.perf_counter()
+        import atlas
+        from PIL import ImageTk
         mapping = {'7': '7.png', '8': '8.png', '9': '9.png', '10': '10.png',
                    'Valet': 'champi.png', 'Dame': 'fleur.png', 'Roi': 'mario.png', 'As': 'etoile.png'}
-        self.images_cartes = {}
         self.card_w, self.card_h = 120, 160
-        
-        def process_img(filename):
-            path = os.path.join(dossier_images, filename)
-            try:
-                img = Image.open(path).convert("RGBA").resize((self.card_w, self.card_h), Image.LANCZOS)
-                mask = Image.new("L", img.size, 0)
-                draw = ImageDraw.Draw(mask)
-                draw.rounded_rectangle((0,0,img.width,img.height), radius=self.CARD_RADIUS, fill=255)
-                img.putalpha(mask)
-                return ImageTk.PhotoImage(img)
-            except: return None
-
-        for val, fname in mapping.items():
-            self.images_cartes[val] = process_img(fname)
-        self.images_dos = process_img("dos.png")
 
+        # PNG traités une seule fois puis relus depuis l'atlas (mmap) aux lancements suivants
+        images, statut = atlas.charger_cartes(dossier_images, list(mapping.values()) + ["dos.png"],
+                                              self.card_w, self.card_h, self.CARD_RADIUS,
+                                              dossier_courant, ImageTk.PhotoImage)
+        self.images_cartes = {val: images[fname] for val, fname in mapping.items()}
+        self.images_dos = images["dos.png"]
+        self.temps_images = (time.perf_counter() - t0, statut)
+
+    # --------------------
+    # Rendu des cartes : 5 places persistantes par côté, seules les places modifiées sont
+    # reconfigurées, et toutes les demandes d'un même tour de boucle Tk sont regroupées.
+    # --------------------
     def afficher_cartes_joueur(self):
-        for w in self.frame_joueur_cartes.winfo_children(): w.destroy()
-        for i, c in enumerate(self.partie.joueur.main.cartes):
-            if not c: continue
-            frame = tk.Frame(self.frame_joueur_cartes, bg=self.PANEL, padx=6, pady=6)
-            frame.grid(row=0, column=i, padx=8)
-            imgtk = self.images_cartes.get(c.valeur)
-            if imgtk:
-                lbl = tk.Label(frame, image=imgtk, bg=self.PANEL)
-                lbl.image = imgtk
-            else:
-                card = tk.Frame(frame, width=self.card_w, height=self.card_h, bg="#18202b")
-                tk.Label(card, text=f"{c.valeur}\n{c.couleur}", fg="white", bg="#18202b").place(relx=0.5, rely=0.5, anchor="center")
-                card.pack_propagate(False)
-                lbl = card
-            
-            if i in self.selection: lbl.config(highlightthickness=4, highlightbackground=self.ACCENT)
-            else: lbl.config(highlightthickness=1, highlightbackground="#0f1620")
-            lbl.bind("<Button-1>", lambda e, idx=i: self.toggle_selection(idx))
-            lbl.pack()
+        cartes = self.partie.joueur.main.cartes
+        self._voulu_joueur = [(int(cartes[i]), i in self.selection) if i < len(cartes) and cartes[i] else (None, False)
+                              for i in range(5)]
+        self._planifier_rendu()
 
     def masquer_cartes_adversaire(self):
-        for w in self.frame_luigi_cartes.winfo_children(): w.destroy()
-        for i in range(5):
-            frame = tk.Frame(self.frame_luigi_cartes, bg=self.PANEL, padx=6, pady=6)
-            frame.grid(row=0, column=i, padx=8)
-            if self.images_dos:
-                lbl = tk.Label(frame, image=self.images_dos, bg=self.PANEL)
-                lbl.image = self.images_dos
-                lbl.pack()
-            else:
-                placeholder = tk.Frame(frame, width=self.card_w, height=self.card_h, bg="#16202b")
-                tk.Label(placeholder, text="?", font=("Segoe UI", 28), bg="#16202b").place(relx=0.5, rely=0.5, anchor="center")
-                placeholder.pack()
+        self._voulu_luigi = [("dos", False)] * 5
+        self._planifier_rendu()
 
     def reveler_cartes_adversaire(self):
-        for w in self.frame_luigi_cartes.winfo_children(): w.destroy()
         main_adv = self.lan_opponent_hand.cartes if self.mode == "lan" else self.partie.luigi.main.cartes
-        for i, c in enumerate(main_adv):
-            if not c: continue
-            frame = tk.Frame(self.frame_luigi_cartes, bg=self.PANEL, padx=6, pady=6)
-            frame.grid(row=0, column=i, padx=8)
-            imgtk = self.images_cartes.get(c.valeur)
+        self._voulu_luigi = [(int(main_adv[i]), False) if i < len(main_adv) and main_adv[i] else (None, False)
+                             for i in range(5)]
+        self._planifier_rendu()
+
+    def _planifier_rendu(self):
+        if not self._rendu_prevu:
+            self._rendu_prevu = True
+            self.root.after_idle(self._rendre_cartes)
+
+    def _rendre_cartes(self):
+        self._rendu_prevu = False
+        t0 = time.perf_counter()
+        c = self.compteurs_rendu
+        for slots, voulu, fond in ((self.slots_joueur, self._voulu_joueur, "#18202b"),
+                                   (self.slots_luigi, self._voulu_luigi, "#16202b")):
+            for slot, etat in zip(slots, voulu):
+                if slot.etat == etat: continue
+                self._appliquer_slot(slot, etat, fond, slots is self.slots_joueur)
+                c["slots_modifies"] += 1
+        duree = time.perf_counter() - t0
+        c["rendus"] += 1
+        c["temps_rendu_s"] += duree
+        c["temps_rendu_max_s"] = max(c["temps_rendu_max_s"], duree)
+
+    def _appliquer_slot(self, slot, etat, fond, joueur):
+        visuel, surligne = etat
+        ancien = slot.etat
+        slot.etat = etat
+        if visuel is None:
+            slot.frame.grid_remove()
+            return
+        if ancien is None or ancien[0] is None:
+            slot.frame.grid(row=0, column=slot.colonne, padx=8)
+        if ancien is None or ancien[0] != visuel:
+            if visuel == "dos":
+                imgtk, texte, police = self.images_dos, "?", ("Segoe UI", 28)
+            else:
+                c = carte_depuis_code(visuel)
+                imgtk, texte, police = self.images_cartes.get(c.valeur), f"{c.valeur}\n{c.couleur}", None
             if imgtk:
-                lbl = tk.Label(frame, image=imgtk, bg=self.PANEL)
-                lbl.image = imgtk
-                lbl.pack()
+                slot.label.config(image=imgtk, text="", bg=self.PANEL)
             else:
-                p = tk.Frame(frame, width=self.card_w, height=self.card_h, bg="#16202b")
-                tk.Label(p, text=f"{c.valeur}\n{c.couleur}", fg="white", bg="#18202b").pack()
-                p.pack()
+                slot.label.config(image=self.image_vide, text=texte, font=police or "TkDefaultFont", bg=fond)
+        if joueur and (ancien is None or ancien[1] != surligne):
+            if surligne: slot.label.config(highlightthickness=4, highlightbackground=self.ACCENT)
+            else: slot.label.config(highlightthickness=1, highlightbackground="#0f1620")
 
     # --------------------
     # LOGIQUE RESEAU CORRIGÉE
@@ -495,23 +468,45 @@ class PokerAppModern:
         hand_client = [self.partie.jeu.piocher() for _ in range(5)]
         
         self.partie.joueur.main.cartes = hand_host
+        self.partie.noter_donne(main_luigi_connue=False)
         self.afficher_cartes_joueur()
         self.masquer_cartes_adversaire()
         self._set_buttons_state(True)
         self.label_status.config(text="Nouvelle manche LAN !")
 
-        msg = {"type": "START", "hand": hand_client}
+        msg = {"type": "START", "hand": [int(c) for c in hand_client]}
+        self.network.noter_soldes(self.partie.joueur.solde, self.partie.luigi.solde)
         self.network.send(msg)
+        self.network.diffuser({"type": "MANCHE", "soldes": (self.partie.joueur.solde, self.partie.luigi.solde)})
 
     def on_network_message(self, data):
-        self.root.after(0, lambda: self.handle_message(data))
+        # Thread réseau : pas d'appel Tk ici, la boucle Tk vide la file par lots
+        self.file_reseau.ajouter(data)
+
+    def _vider_file_reseau(self):
+        fin = time.perf_counter() + BUDGET_RESEAU_S
+        while time.perf_counter() < fin and self.partie.phase != "terminee":
+            lot = self.file_reseau.vider()
+            if not lot: break
+            for data in lot:
+                if self.partie.phase == "terminee": break  # fenêtre détruite par verifier_fin_partie
+                try:
+                    self.handle_message(data)
+                except Exception:
+                    # Comme Tk pour un callback : erreur affichée, la suite du lot est traitée
+                    self.root.report_callback_exception(*sys.exc_info())
+        try: self.root.after(PERIODE_RESEAU_MS, self._vider_file_reseau)
+        except tk.TclError: pass  # fenêtre détruite (fin de partie)
 
     def handle_message(self, data):
         if not data: return
         msg_type = data.get("type")
         
         if msg_type == "START":
-            self.partie.joueur.main.cartes = data.get("hand")
+            self.partie.joueur.main.cartes = [carte_depuis_code(c) for c in data.get("hand")]
+            # Pioche locale sans notre donne : on ne peut pas repiocher une carte défaussée
+            self.partie.jeu.reinitialiser(sauf=set(data.get("hand")))
+            self.partie.noter_donne(main_luigi_connue=False)
             self.afficher_cartes_joueur()
             self.masquer_cartes_adversaire()
             self._set_buttons_state(True)
@@ -525,47 +520,51 @@ class PokerAppModern:
         
         elif msg_type == "HAND":
             self.lan_opponent_hand = MainJoueur()
-            self.lan_opponent_hand.cartes = data.get("hand_obj")
+            self.lan_opponent_hand.cartes = [carte_depuis_code(c) for c in data.get("hand_obj")]
             if self.lan_my_hand_sent:
                 self.resolve_lan_round()
             else:
                 self.label_status.config(text="L'adversaire a joué. À toi !")
 
+        elif msg_type == "ETAT":
+            # Reprise après une coupure : ETAT ne contient que ce qui a été manqué
+            if "hand" in data:
+                self.partie.joueur.solde, self.partie.luigi.solde = data["soldes"]
+                self.label_solde.config(text=f"Toi: {self.partie.joueur.solde} | Adv: {self.partie.luigi.solde}")
+                # Manche déjà commencée ici (même donne, pas encore résolue) : la rejouer effacerait
+                # les échanges faits (defausses) et fausserait l'historique
+                if not (self.partie.phase == "echange" and self.partie.donnes[0] == list(data["hand"])):
+                    self.handle_message({"type": "START", "hand": data["hand"]})
+            if "hand_obj" in data:
+                self.handle_message({"type": "HAND", "hand_obj": data["hand_obj"]})
+            if "hand" not in data and "hand_obj" not in data:
+                self.label_status.config(text="Connexion rétablie.")
+
     def resolve_lan_round(self):
         self.reveler_cartes_adversaire()
-        s_j, t_j, v_j = self.partie.joueur.main.evaluer_main()
-        s_l, t_l, v_l = self.lan_opponent_hand.evaluer_main()
-        
-        mise = 10
-        msg = ""
-        gain = 0
-        win = False
-        draw = False
-        
-        if s_j > s_l: win = True
-        elif s_j == s_l:
-            if v_j > v_l: win = True
-            elif v_j == v_l: draw = True
+        res = self.partie.resoudre(10, self.lan_opponent_hand)
+        noter_manche(self.partie, res, 10, self.lan_opponent_hand)
         
-        if draw:
-            msg = f"🤝 Égalité ({t_j})"
+        if res.issue == 0:
+            msg = f"🤝 Égalité ({res.nom_j})"
             jouer_son(SON_EGALITE)
-        elif win:
-            gain = mise * MULTIPLICATEURS.get(t_j, 1)
-            self.partie.joueur.recevoir_gain(gain)
-            self.partie.luigi.solde -= gain
-            msg = f"🎉 Tu gagnes ! ({t_j})"
+        elif res.issue > 0:
+            msg = f"🎉 Tu gagnes ! ({res.nom_j})"
             jouer_son(SON_VICTOIRE)
         else:
-            gain = mise * MULTIPLICATEURS.get(t_l, 1)
-            self.partie.joueur.solde -= gain
-            self.partie.luigi.recevoir_gain(gain)
-            msg = f"😬 Perdu... ({t_l})"
+            msg = f"😬 Perdu... ({res.nom_l})"
             jouer_son(SON_DEFAITE)
 
         self.label_status.config(text=msg)
         self.label_solde.config(text=f"Toi: {self.partie.joueur.solde} | Adv: {self.partie.luigi.solde}")
         sauvegarder_solde(self.partie.joueur.solde, self.partie.luigi.solde)
+        if self.network.is_host:
+            # Flux public : les mains ne sont diffusées aux spectateurs qu'une fois la manche jouée
+            soldes = (self.partie.joueur.solde, self.partie.luigi.solde)
+            self.network.diffuser({"type": "REVELE", "main_hote": self.partie.joueur.main.codes(),
+                                   "main_client": self.lan_opponent_hand.codes()})
+            self.network.diffuser({"type": "RESULTAT", "issue": res.issue, "gain_hote": res.delta_joueur,
+                                   "soldes": soldes})
 
         # CHECK GAME OVER
         if self.verifier_fin_partie():
@@ -576,12 +575,14 @@ class PokerAppModern:
 
     def verifier_fin_partie(self):
         """Vérifie si un des joueurs est à 0 et termine la partie"""
-        if self.partie.joueur.solde <= 0:
+        fin = self.partie.fin_partie()
+        if fin and self.rejeu: self.rejeu.fermer()
+        if fin == "defaite":
             jouer_son(SON_DEFAITE)
             messagebox.showinfo("GAME OVER", "Tu n'as plus de crédits ! L'adversaire t'a plumé.")
             self.root.destroy()
             return True
-        elif self.partie.luigi.solde <= 0:
+        elif fin == "victoire":
             jouer_son(SON_VICTOIRE)
             messagebox.showinfo("VICTOIRE", "L'adversaire est ruiné ! Tu as gagné.")
             self.root.destroy()
@@ -617,22 +618,19 @@ class PokerAppModern:
         if self.mode == "solo":
             self.partie.tour_luigi()
             jouer_son(SON_DISTRIB)
-            s_j, t_j, v_j = self.partie.joueur.main.evaluer_main()
-            s_l, t_l, v_l = self.partie.luigi.main.evaluer_main()
+            manche = self.partie.resoudre(self.mise)
+            noter_manche(self.partie, manche, self.mise)
+            if self.rejeu: self.rejeu.manche(self.mise)
             
-            if s_j > s_l or (s_j==s_l and v_j > v_l):
-                gain = self.mise * MULTIPLICATEURS.get(t_j, 1)
-                self.partie.joueur.recevoir_gain(gain)
+            if manche.issue > 0:
                 jouer_son(SON_VICTOIRE)
-                res = f"Gagné ! ({t_j})"
-            elif s_j == s_l and v_j == v_l:
+                res = f"Gagné ! ({manche.nom_j})"
+            elif manche.issue == 0:
                 res = "Égalité"
                 jouer_son(SON_EGALITE)
             else:
-                gain = self.mise
-                self.partie.luigi.recevoir_gain(gain)
                 jouer_son(SON_DEFAITE)
-                res = f"Perdu ({t_l})"
+                res = f"Perdu ({manche.nom_l})"
             
             self.reveler_cartes_adversaire()
             self.label_status.config(text=res)
@@ -644,7 +642,7 @@ class PokerAppModern:
                 self.root.after(3000, self.nouvelle_manche_solo)
 
         elif self.mode == "lan":
-            msg = {"type": "HAND", "hand_obj": self.partie.joueur.main.cartes}
+            msg = {"type": "HAND", "hand_obj": self.partie.joueur.main.codes()}
             self.network.send(msg)
             self.lan_my_hand_sent = True
             if self.lan_opponent_hand:
@@ -699,6 +697,7 @@ class StartMenu:
         launch_game("solo")
 
     def go_host(self):
+        from reseau import NetworkManager
         net = NetworkManager(is_host=True)
         ip = net.get_local_ip()
         wait_win = tk.Toplevel(self.root)
@@ -716,6 +715,7 @@ class StartMenu:
     def go_join(self):
         ip = simpledialog.askstring("Connexion", "IP de l'hôte :")
         if ip:
+            from reseau import NetworkManager
             net = NetworkManager(is_host=False, ip=ip)
             if net.start_client():
                 self.root.destroy()
@@ -724,12 +724,88 @@ class StartMenu:
                 messagebox.showerror("Erreur", "Connexion impossible.")
 
 def launch_game(mode, network=None):
+    t0 = time.perf_counter()
     r = tk.Tk()
     app = PokerAppModern(r, mode, network)
     jouer_son(SON_START)
+    r.after_idle(lambda: rapport_demarrage(app, t0))
     r.mainloop()
+    print("Rendu des cartes :", app.compteurs_rendu)
+    if app.file_reseau: print("Messages réseau :", app.file_reseau.statistiques())
+
+def rapport_demarrage(app, t0):
+    """Affiché une fois la fenêtre de jeu dessinée : permet de comparer démarrage à froid et avec l'atlas"""
+    duree_images, statut = app.temps_images
+    print(f"Démarrage : images {duree_images * 1e3:.1f} ms (atlas {statut}), "
+          f"fenêtre de jeu prête en {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+def apres_premiere_fenetre(root, fonction):
+    """Appelle fonction une fois la fenêtre affichée (premier <Map> puis fin des dessins en attente)"""
+    def sur_map(_):
+        root.unbind("<Map>", identifiant)
+        root.after_idle(fonction)
+    identifiant = root.bind("<Map>", sur_map, add="+")
+
+def premiere_fenetre():
+    """Mode --premiere-fenetre : ouvre le menu, mesure le temps jusqu'à son affichage puis quitte"""
+    root = tk.Tk()
+    StartMenu(root)
+    def mesurer():
+        maintenant = time.perf_counter()
+        depuis_processus = ""
+        if "POKER_LUIGI_T0" in os.environ:
+            depuis_processus = f"{(time.time() - float(os.environ['POKER_LUIGI_T0'])) * 1e3:.1f} ms après le lancement du processus, "
+        print(f"Première fenêtre : {depuis_processus}{(maintenant - DEBUT) * 1e3:.1f} ms après le début du script")
+        root.destroy()
+    apres_premiere_fenetre(root, mesurer)
+    root.mainloop()
+
+def profil_demarrage(nb_imports=15):
+    """Relance le jeu sous -X importtime jusqu'à la première fenêtre et résume les imports les plus lents"""
+    import subprocess
+    env = dict(os.environ, POKER_LUIGI_T0=repr(time.time()), POKER_LUIGI_SANS_SON="1")
+    proc = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--premiere-fenetre"],
+                          capture_output=True, text=True, encoding="utf-8", errors="replace", env=env)
+    imports = []
+    for ligne in proc.stderr.splitlines():
+        if not ligne.startswith("import time:") or "|" not in ligne: continue
+        _, cumul, nom = ligne[len("import time:"):].split("|")
+        # Seuls les imports de premier niveau (sans indentation) : le cumul inclut leurs dépendances
+        if cumul.strip().isdigit() and not nom.startswith("  "):
+            imports.append((int(cumul), nom.strip()))
+    print(f"Imports de premier niveau les plus lents (sur {len(imports)}) :")
+    for cumul, nom in sorted(imports, reverse=True)[:nb_imports]:
+        print(f"  {cumul / 1e3:8.1f} ms  {nom}")
+    print(f"Total imports de premier niveau : {sum(c for c, _ in imports) / 1e3:.1f} ms")
+    sortie = [l for l in proc.stdout.splitlines() if l.startswith("Première fenêtre")]
+    print(sortie[-1] if sortie else f"Pas de fenêtre (code {proc.returncode}) :\n{proc.stderr.splitlines()[-1:]}")
+
+def activer_instrumentation():
+    """Chronométrage des fonctions critiques si POKER_LUIGI_INSTRUMENTATION (fichier JSON) ou
+    POKER_LUIGI_STATS_PORT (port local, voir instrumentation.py) est défini ; sinon rien n'est
+    importé ni remplacé et le jeu tourne sans aucun surcoût."""
+    fichier = os.environ.get("POKER_LUIGI_INSTRUMENTATION")
+    port = os.environ.get("POKER_LUIGI_STATS_PORT")
+    if not (fichier or port): return
+    import instrumentation
+    import reseau
+    instrumentation.instrumenter(PokerAppModern, ("valider", "handle_message", "_vider_file_reseau",
+                                                  "afficher_cartes_joueur", "_rendre_cartes",
+                                                  "_charger_images_cartes"))
+    instrumentation.instrumenter(sys.modules[__name__], ("jouer_son", "sauvegarder_solde"), prefixe="jeu")
+    instrumentation.instrumenter(reseau.NetworkManager, ("send", "_decouper"))
+    instrumentation.instrumenter_boucle(reseau.NetworkManager, "receive_loop")
+    instrumentation.demarrer(fichier, int(port) if port else None)
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    menu = StartMenu(root)
-    root.mainloop()
\ No newline at end of file
+    activer_instrumentation()
+    if "--profil-demarrage" in sys.argv:
+        profil_demarrage()
+    elif "--premiere-fenetre" in sys.argv:
+        premiere_fenetre()
+    else:
+        root = tk.Tk()
+        menu = StartMenu(root)
+        # Son et musique après l'affichage du menu : pygame ne retarde plus la première fenêtre
+        apres_premiere_fenetre(root, demarrer_audio_en_fond)
+        root.mainloop()
\ No newline at end of file
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Protocole réseau binaire (remplace pickle).
+
+Chaque trame garde l'en-tête de 4 octets (taille du corps, '>I'), puis :
+  corps = type (1 octet) + charge utile de taille fixe
+    HELLO 0x01 : "PKLG" + version u16       (négociation, premier message de chaque côté)
+    START 0x02 : 5 codes de cartes (1 octet chacun)
+    HAND  0x03 : 5 codes de cartes
+    SESSION 0x04 : jeton de session (16 octets), envoyé par l'hôte après les HELLO
+    REPRISE 0x05 : "PKLG" + version + jeton + n° de manche + drapeaux (remplace HELLO pour
+                   reprendre une session après une coupure)
+    ETAT  0x06 : réponse à REPRISE, seulement ce que le pair a manqué (voir InstantaneManche)
+  Spectateurs (flux public, aucune main avant l'abattage) :
+    SPECTATEUR 0x07 : "PKLG" + version (remplace HELLO pour regarder une table)
+    MANCHE   0x08 : n° de manche + soldes (hôte, client), au début de chaque manche
+    REVELE   0x09 : n° + mains finales de l'hôte et du client
+    RESULTAT 0x0A : n° + issue pour l'hôte (1, 0, -1) + gain de l'hôte + soldes
+Les messages restent des dicts ({"type": "START", "hand": [codes]}) pour handle_message.
+Pour ajouter un message : un code de type, un struct et une entrée dans _MESSAGES.
+
+Usage : python protocole.py  (micro-benchmark contre l'ancien chemin pickle)
+"""
+
+import pickle
+import struct
+import sys
+import timeit
+
+VERSION = 2
+MAGIQUE = b"PKLG"
+ENTETE = struct.Struct(">I")
+TAILLE_MAX_CORPS = 64 * 1024
+TAILLE_JETON = 16
+
+# Drapeaux de ETAT
+ETAT_START = 1  # le pair a manqué le START de la manche en cours : "hand" présent
+ETAT_HAND = 2   # HAND de l'émetteur que le pair n'a pas reçu : "hand_obj" présent
+ETAT_RECUE = 4  # l'émetteur a bien reçu le HAND du pair pour cette manche
+
+class ErreurProtocole(Exception):
+    """Trame invalide, type inconnu ou version incompatible"""
+
+def _verifier_codes(codes):
+    if max(codes) > 31:
+        raise ErreurProtocole(f"Code de carte invalide : {codes}")
+    return codes
+
+def _encodeur_main(cle):
+    def encoder(trame, code, msg):
+        return trame.pack(trame.size - ENTETE.size, code, *msg[cle])
+    def decoder(nom, charge, corps):
+        # Charge "5B" : les octets sont directement les codes, pas besoin d'unpack
+        return {"type": nom, cle: _verifier_codes(list(corps[1:]))}
+    return encoder, decoder
+
+def _encodeur_champs(*champs):
+    """Message à champs numériques : (clé, nombre de valeurs) dans l'ordre du format ;
+    un champ de 5 valeurs est une main (codes vérifiés au décodage)"""
+    def encoder(trame, code, msg):
+        valeurs = []
+        for cle, n in champs:
+            if n == 1: valeurs.append(msg[cle])
+            else: valeurs.extend(msg[cle])
+        return trame.pack(trame.size - ENTETE.size, code, *valeurs)
+    def decoder(nom, charge, corps):
+        valeurs = charge.unpack_from(corps, 1)
+        msg = {"type": nom}
+        i = 0
+        for cle, n in champs:
+            if n == 1: msg[cle] = valeurs[i]
+            elif n == 5: msg[cle] = _verifier_codes(list(valeurs[i:i + n]))
+            else: msg[cle] = valeurs[i:i + n]
+            i += n
+        return msg
+    return encoder, decoder
+
+def _encoder_hello(trame, code, msg):
+    return trame.pack(trame.size - ENTETE.size, code, MAGIQUE, msg.get("version", VERSION))
+
+def _decoder_hello(nom, charge, corps):
+    magique, version = charge.unpack_from(corps, 1)
+    if magique != MAGIQUE: raise ErreurProtocole("Signature HELLO invalide")
+    return {"type": nom, "version": version}
+
+def _encoder_session(trame, code, msg):
+    return trame.pack(trame.size - ENTETE.size, code, msg["jeton"])
+
+def _decoder_session(nom, charge, corps):
+    return {"type": nom, "jeton": bytes(corps[1:])}
+
+def _encoder_reprise(trame, code, msg):
+    return trame.pack(trame.size - ENTETE.size, code, MAGIQUE, msg.get("version", VERSION), msg["jeton"],
+                      msg["numero"], int(msg["hand_recue"]))
+
+def _decoder_reprise(nom, charge, corps):
+    magique, version, jeton, numero, drapeaux = charge.unpack_from(corps, 1)
+    if magique != MAGIQUE: raise ErreurProtocole("Signature REPRISE invalide")
+    return {"type": nom, "version": version, "jeton": jeton, "numero": numero, "hand_recue": bool(drapeaux & 1)}
+
+_SANS_MAIN = (0,) * 5
+
+def _encoder_etat(trame, code, msg):
+    drapeaux = ((ETAT_START if "hand" in msg else 0) | (ETAT_HAND if "hand_obj" in msg else 0)
+                | (ETAT_RECUE if msg["recue"] else 0))
+    return trame.pack(trame.size - ENTETE.size, code, msg["numero"], drapeaux, *msg.get("hand", _SANS_MAIN),
+                      *msg.get("hand_obj", _SANS_MAIN), *msg["soldes"])
+
+def _decoder_etat(nom, charge, corps):
+    valeurs = charge.unpack_from(corps, 1)
+    numero, drapeaux = valeurs[:2]
+    msg = {"type": nom, "numero": numero, "recue": bool(drapeaux & ETAT_RECUE), "soldes": valeurs[12:14]}
+    if drapeaux & ETAT_START: msg["hand"] = _verifier_codes(list(valeurs[2:7]))
+    if drapeaux & ETAT_HAND: msg["hand_obj"] = _verifier_codes(list(valeurs[7:12]))
+    return msg
+
+# nom -> (code de type, format de la charge utile, encodeur, décodeur)
+_MESSAGES = {
+    "HELLO": (0x01, "4sH", _encoder_hello, _decoder_hello),
+    "START": (0x02, "5B") + _encodeur_main("hand"),
+    "HAND": (0x03, "5B") + _encodeur_main("hand_obj"),
+    "SESSION": (0x04, f"{TAILLE_JETON}s", _encoder_session, _decoder_session),
+    "REPRISE": (0x05, f"4sH{TAILLE_JETON}sIB", _encoder_reprise, _decoder_reprise),
+    "ETAT": (0x06, "IB5B5Bii", _encoder_etat, _decoder_etat),  # soldes : (destinataire, émetteur)
+    "SPECTATEUR": (0x07, "4sH", _encoder_hello, _decoder_hello),
+    "MANCHE": (0x08, "Iii") + _encodeur_champs(("numero", 1), ("soldes", 2)),
+    "REVELE": (0x09, "I5B5B") + _encodeur_champs(("numero", 1), ("main_hote", 5), ("main_client", 5)),
+    "RESULTAT": (0x0A, "Ibiii") + _encodeur_champs(("numero", 1), ("issue", 1), ("gain_hote", 1), ("soldes", 2)),
+}
+
+# Trame complète (en-tête + type + charge) en un seul struct par message
+_PAR_NOM = {}
+_PAR_CODE = {}
+for _nom, (_code, _format, _enc, _dec) in _MESSAGES.items():
+    _trame = struct.Struct(">IB" + _format)
+    _charge = struct.Struct(">" + _format)
+    _PAR_NOM[_nom] = (_code, _trame, _enc)
+    _PAR_CODE[_code] = (_nom, _charge, _dec)
+
+def encoder(msg):
+    """dict -> trame complète (en-tête de taille compris), prête pour sendall"""
+    try:
+        code, trame, enc = _PAR_NOM[msg["type"]]
+    except KeyError:
+        raise ErreurProtocole(f"Type de message inconnu : {msg.get('type')}")
+    try:
+        return enc(trame, code, msg)
+    except struct.error as e:
+        raise ErreurProtocole(f"Message {msg['type']} invalide : {e}")
+
+def decoder(corps):
+    """Corps d'une trame (sans l'en-tête) -> dict"""
+    if not corps: raise ErreurProtocole("Trame vide")
+    try:
+        nom, charge, dec = _PAR_CODE[corps[0]]
+    except KeyError:
+        raise ErreurProtocole(f"Type de message inconnu : 0x{corps[0]:02x}")
+    if len(corps) - 1 != charge.size:
+        raise ErreurProtocole(f"Taille invalide pour {nom} : {len(corps) - 1} octets")
+    return dec(nom, charge, corps)
+
+def hello():
+    return encoder({"type": "HELLO", "version": VERSION})
+
+def spectateur():
+    return encoder({"type": "SPECTATEUR", "version": VERSION})
+
+def verifier_hello(msg, types=("HELLO",)):
+    """Lève ErreurProtocole si le premier message du pair n'est pas un HELLO (ou un autre des types
+    acceptés, REPRISE pour une reprise de session) de la même version"""
+    if msg.get("type") not in types:
+        raise ErreurProtocole(f"Le pair n'a pas commencé par {' ou '.join(types)} (ancienne version du jeu ?)")
+    if msg["version"] != VERSION:
+        raise ErreurProtocole(f"Version du protocole incompatible : pair v{msg['version']}, local v{VERSION}")
+
+# ------------------------
+# Reprise de session
+# ------------------------
+class InstantaneManche:
+    """Manche en cours vue d'un côté de la connexion : ce qui a été envoyé et reçu depuis le dernier
+    START. Après une coupure, le pair qui reprend (REPRISE) dit ce qu'il a reçu, celui qui a
+    distribué répond par un ETAT qui ne contient que ce qui manque ; le HAND perdu dans l'autre
+    sens est renvoyé par a_renvoyer."""
+    __slots__ = ("numero", "start", "hand_envoyee", "hand_recue", "soldes")
+    def __init__(self):
+        self.numero = 0            # START envoyés (distributeur) ou reçus (pair)
+        self.start = None          # main distribuée au pair dans le dernier START
+        self.hand_envoyee = None   # HAND envoyé pendant la manche en cours
+        self.hand_recue = False    # HAND du pair reçu pendant la manche en cours
+        self.soldes = (0, 0)       # (pair, local) au début de la manche
+
+    def _nouvelle_manche(self):
+        self.numero += 1
+        self.hand_envoyee = None
+        self.hand_recue = False
+
+    def envoye(self, msg):
+        if msg["type"] == "START":
+            self._nouvelle_manche()
+            self.start = list(msg["hand"])
+        elif msg["type"] == "HAND":
+            self.hand_envoyee = list(msg["hand_obj"])
+
+    def recu(self, msg):
+        if msg["type"] == "START":
+            self._nouvelle_manche()
+        elif msg["type"] == "HAND":
+            self.hand_recue = True
+        elif msg["type"] == "ETAT":
+            if "hand" in msg:
+                self.numero = msg["numero"] - 1
+                self._nouvelle_manche()
+            if "hand_obj" in msg: self.hand_recue = True
+
+    def reprise(self, jeton):
+        return {"type": "REPRISE", "jeton": jeton, "numero": self.numero, "hand_recue": self.hand_recue}
+
+    def etat(self, reprise):
+        """ETAT en réponse à une REPRISE : START manqué, HAND non reçu, soldes du début de manche"""
+        if reprise["numero"] > self.numero:
+            raise ErreurProtocole(f"Manche {reprise['numero']} inconnue (dernière : {self.numero})")
+        manquee = reprise["numero"] < self.numero
+        msg = {"type": "ETAT", "numero": self.numero, "recue": self.hand_recue and not manquee,
+               "soldes": self.soldes}
+        if manquee: msg["hand"] = self.start
+        if self.hand_envoyee is not None and (manquee or not reprise["hand_recue"]):
+            msg["hand_obj"] = self.hand_envoyee
+        return msg
+
+    def a_renvoyer(self, etat):
+        """HAND que le distributeur n'a pas reçu d'après son ETAT (à appeler avant recu(etat))"""
+        if "hand" not in etat and not etat["recue"] and self.hand_envoyee is not None:
+            return {"type": "HAND", "hand_obj": self.hand_envoyee}
+        return None
+
+# ------------------------
+# Micro-benchmark
+# ------------------------
+def _trame_pickle(data):
+    serialized = pickle.dumps(data)
+    return struct.pack('>I', len(serialized)) + serialized
+
+def comparer(nombre=200_000):
+    """Octets et temps d'encodage / décodage : binaire contre pickle (codes int et objets Carte)"""
+    from moteur import PAQUET
+    main = list(PAQUET[3:8])
+    cas = {
+        "binaire": (lambda: encoder({"type": "START", "hand": main}), lambda t: decoder(t[4:])),
+        "pickle (codes)": (lambda: _trame_pickle({"type": "START", "hand": [int(c) for c in main]}),
+                           lambda t: pickle.loads(t[4:])),
+        "pickle (Carte)": (lambda: _trame_pickle({"type": "START", "hand": main}), lambda t: pickle.loads(t[4:])),
+    }
+    resultats = {}
+    for nom, (enc, dec) in cas.items():
+        trame = enc()
+        t_enc = min(timeit.repeat(enc, number=nombre, repeat=3)) / nombre
+        t_dec = min(timeit.repeat(lambda: dec(trame), number=nombre, repeat=3)) / nombre
+        resultats[nom] = {"octets": len(trame), "encodage_us": t_enc * 1e6, "decodage_us": t_dec * 1e6}
+    return resultats
+
+if __name__ == "__main__":
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{'Chemin':<16}{'Octets':>8}{'Encodage (µs)':>16}{'Décodage (µs)':>16}")
+    for nom, r in comparer(nombre).items():
+        print(f"{nom:<16}{r['octets']:>8}{r['encodage_us']:>16.3f}{r['decodage_us']:>16.3f}")
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Proxy TCP local qui injecte des pannes, pour tester la reprise des sessions LAN.
+
+Le proxy relaie les connexions de --ecoute vers --cible et, à intervalles aléatoires (moyenne
+--coupure secondes), coupe brutalement toutes les connexions en cours :
+  - par défaut des deux côtés (le client et l'hôte voient la fermeture) ;
+  - avec --demi, seulement côté client : l'hôte garde une connexion à moitié morte, comme après
+    une coupure Wi-Fi, et doit la remplacer quand le client revient.
+Après une coupure, les nouvelles connexions sont refusées pendant --trou secondes. --latence
+ajoute un délai à chaque envoi.
+
+essai : joue des manches scriptées à travers le proxy et vérifie qu'après toutes les reprises les
+deux côtés ont les mêmes soldes (code de sortie 1 sinon).
+  --cible lan     : hôte / client NetworkManager (comme le jeu) ;
+  --cible serveur : deux clients NetworkManager attablés sur serveur.py.
+
+Usage : python proxy_pannes.py relayer --ecoute 5556 --cible 127.0.0.1:5555 --coupure 5 [--trou 1] [--demi]
+        python proxy_pannes.py essai --manches 2000 --coupure 0.2 [--trou 0.1] [--demi] [--cible serveur]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import threading
+import time
+
+import reseau
+from moteur import MainJoueur, Partie, carte_depuis_code
+
+MISE_ESSAI = 10
+SOLDE_ESSAI = 1_000_000
+DELAI_ESSAI = reseau.DELAI_REPRISE + 5
+
+class Proxy:
+    def __init__(self, cible, coupure=0.0, trou=0.0, latence=0.0, demi=False, graine=None):
+        self.cible = cible
+        self.coupure = coupure
+        self.trou = trou
+        self.latence = latence
+        self.demi = demi
+        self.rng = random.Random(graine)
+        self.liaisons = set()
+        self.figees = []  # côtés hôte laissés ouverts par --demi (sinon fermés par le ramasse-miettes)
+        self.ferme_jusqu_a = 0.0
+        self.stats = {"connexions": 0, "coupures": 0, "refus": 0}
+
+    async def servir(self, port, pret=None):
+        serveur = await asyncio.start_server(self._relier, "127.0.0.1", port)
+        if pret: pret.set_result(serveur.sockets[0].getsockname()[1])
+        async with serveur:
+            if self.coupure:
+                await self._pannes()
+            else:
+                await serveur.serve_forever()
+
+    async def _relier(self, reader, writer):
+        if time.perf_counter() < self.ferme_jusqu_a:
+            self.stats["refus"] += 1
+            writer.transport.abort()
+            return
+        try:
+            amont_r, amont_w = await asyncio.open_connection(*self.cible)
+        except OSError:
+            self.stats["refus"] += 1
+            writer.transport.abort()
+            return
+        self.stats["connexions"] += 1
+        for w in (writer, amont_w):
+            w.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        liaison = (writer, amont_w, (asyncio.ensure_future(self._pomper(reader, amont_w)),
+                                     asyncio.ensure_future(self._pomper(amont_r, writer))))
+        self.liaisons.add(liaison)
+        await asyncio.wait(liaison[2], return_when=asyncio.FIRST_COMPLETED)
+        if liaison in self.liaisons:
+            # Fermeture normale d'un côté : on la propage à l'autre
+            self.liaisons.discard(liaison)
+            for t in liaison[2]: t.cancel()
+            writer.close()
+            amont_w.close()
+
+    async def _pomper(self, reader, writer):
+        while True:
+            donnees = await reader.read(65536)
+            if not donnees: return
+            if self.latence: await asyncio.sleep(self.latence)
+            writer.write(donnees)
+            await writer.drain()
+
+    def couper_tout(self):
+        self.stats["coupures"] += 1
+        for client_w, amont_w, taches in list(self.liaisons):
+            for t in taches: t.cancel()
+            client_w.transport.abort()
+            if self.demi: self.figees.append(amont_w)
+            else: amont_w.transport.abort()
+        self.liaisons.clear()
+        self.ferme_jusqu_a = time.perf_counter() + self.trou
+
+    async def _pannes(self):
+        while True:
+            await asyncio.sleep(self.rng.expovariate(1 / self.coupure))
+            if self.liaisons: self.couper_tout()
+
+def lancer_proxy(proxy, port=0):
+    """Proxy dans un thread avec sa propre boucle asyncio ; retourne (boucle, port d'écoute)"""
+    boucle = asyncio.new_event_loop()
+    pret = boucle.create_future()
+    threading.Thread(target=boucle.run_until_complete, args=(proxy.servir(port, pret),), daemon=True).start()
+    return boucle, asyncio.run_coroutine_threadsafe(asyncio.wait_for(asyncio.shield(pret), 5), boucle).result()
+
+# ------------------------
+# Essai scripté
+# ------------------------
+class ClientEssai:
+    """Réagit comme handle_message en mode lan : répond HAND à chaque START, résout à réception du HAND adverse"""
+    def __init__(self, net, limite=None):
+        self.net = net
+        self.limite = limite  # ne répond plus après cette manche (table du serveur figée pour comparer)
+        self.partie = Partie(SOLDE_ESSAI, SOLDE_ESSAI, "lan")
+        self.adverse = None
+        self.envoyee = False
+        self.derniere = 0  # numéro de la dernière manche résolue
+        self.cond = threading.Condition()
+
+    def recevoir(self, msg):
+        t = msg["type"]
+        if t == "START":
+            self.partie.joueur.main.cartes = [carte_depuis_code(c) for c in msg["hand"]]
+            self.adverse = None
+            if self.limite is not None and self.net.instantane.numero > self.limite: return
+            self.envoyee = True
+            self.net.send({"type": "HAND", "hand_obj": msg["hand"]})
+        elif t == "HAND":
+            self.adverse = MainJoueur()
+            self.adverse.cartes = [carte_depuis_code(c) for c in msg["hand_obj"]]
+            if self.envoyee: self.resoudre()
+        elif t == "ETAT":
+            if "hand" in msg:
+                # Soldes du début de la manche : la précédente est réglée même si son HAND a été manqué
+                self.partie.joueur.solde, self.partie.luigi.solde = msg["soldes"]
+                with self.cond:
+                    self.derniere = max(self.derniere, msg["numero"] - 1)
+                    self.cond.notify_all()
+                self.recevoir({"type": "START", "hand": msg["hand"]})
+            if "hand_obj" in msg:
+                self.recevoir({"type": "HAND", "hand_obj": msg["hand_obj"]})
+
+    def resoudre(self):
+        self.partie.resoudre(MISE_ESSAI, self.adverse)
+        self.envoyee = False
+        with self.cond:
+            self.derniere = self.net.instantane.numero
+            self.cond.notify_all()
+
+    def attendre(self, numero, delai=DELAI_ESSAI):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.derniere >= numero, delai)
+
+def _port_libre():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+def _client(port):
+    net = reseau.NetworkManager(False, "127.0.0.1", port)
+    for _ in range(50):
+        if net.start_client(): return net
+        net = reseau.NetworkManager(False, "127.0.0.1", port)
+        time.sleep(0.05)
+    raise RuntimeError("Connexion impossible à travers le proxy")
+
+def essai_lan(manches, proxy, graine):
+    port_hote = _port_libre()
+    hote = reseau.NetworkManager(True, "127.0.0.1", port_hote)
+    proxy.cible = ("127.0.0.1", port_hote)
+    _, port_proxy = lancer_proxy(proxy)
+    attente = threading.Thread(target=hote.start_host)
+    attente.start()
+    client = ClientEssai(_client(port_proxy))
+    attente.join()
+    threading.Thread(target=client.net.receive_loop, args=(client.recevoir,), daemon=True).start()
+
+    recue = {}
+    evenement = threading.Event()
+    def hote_recoit(msg):
+        if msg["type"] == "HAND":
+            recue["main"] = msg["hand_obj"]
+            evenement.set()
+    threading.Thread(target=hote.receive_loop, args=(hote_recoit,), daemon=True).start()
+
+    partie = Partie(SOLDE_ESSAI, SOLDE_ESSAI, "lan", graine=graine)
+    jouees = 0
+    for _ in range(manches):
+        partie.jeu.reinitialiser()
+        partie.joueur.main.cartes = [partie.jeu.piocher() for _ in range(5)]
+        main_client = [int(partie.jeu.piocher()) for _ in range(5)]
+        evenement.clear()
+        hote.noter_soldes(partie.joueur.solde, partie.luigi.solde)
+        hote.send({"type": "START", "hand": main_client})
+        hote.send({"type": "HAND", "hand_obj": partie.joueur.main.codes()})
+        if not evenement.wait(DELAI_ESSAI): break
+        adverse = MainJoueur()
+        adverse.cartes = [carte_depuis_code(c) for c in recue["main"]]
+        partie.resoudre(MISE_ESSAI, adverse)
+        jouees += 1
+    client.attendre(hote.instantane.numero)
+    soldes = {"hote": [partie.joueur.solde, partie.luigi.solde],
+              "client": [client.partie.luigi.solde, client.partie.joueur.solde]}
+    resultat = {"manches": jouees, "soldes": soldes, "identiques": soldes["hote"] == soldes["client"],
+                "reprises": {"hote": hote.statistiques_reprises(), "client": client.net.statistiques_reprises()}}
+    client.net.close()
+    hote.close()
+    return resultat
+
+def essai_serveur(manches, proxy, graine):
+    from serveur import Serveur
+    serveur = Serveur(MISE_ESSAI, SOLDE_ESSAI, delai_manche=DELAI_ESSAI, pause=0, graine=graine)
+    boucle, port_proxy = lancer_proxy(proxy)
+    pret = boucle.create_future()
+    asyncio.run_coroutine_threadsafe(serveur.servir("127.0.0.1", 0, 0, pret), boucle)
+    proxy.cible = ("127.0.0.1", asyncio.run_coroutine_threadsafe(asyncio.wait_for(asyncio.shield(pret), 5), boucle).result())
+    clients = [ClientEssai(_client(port_proxy), limite=manches) for _ in range(2)]
+    for c in clients:
+        threading.Thread(target=c.net.receive_loop, args=(c.recevoir,), daemon=True).start()
+    for c in clients: c.attendre(manches, DELAI_ESSAI + manches)
+    a, b = clients
+    soldes = {"a": [a.partie.joueur.solde, a.partie.luigi.solde], "b": [b.partie.luigi.solde, b.partie.joueur.solde]}
+    resultat = {"manches": min(a.derniere, b.derniere), "soldes": soldes, "identiques": soldes["a"] == soldes["b"],
+                "serveur": serveur.etat(), "reprises": [c.net.statistiques_reprises() for c in clients]}
+    for c in clients: c.net.close()
+    return resultat
+
+def essai(manches, cible, coupure, trou, latence, demi, graine):
+    proxy = Proxy(None, coupure, trou, latence, demi, graine)
+    t0 = time.perf_counter()
+    resultat = (essai_serveur if cible == "serveur" else essai_lan)(manches, proxy, graine)
+    resultat["duree_s"] = round(time.perf_counter() - t0, 3)
+    resultat["proxy"] = proxy.stats
+    # Sans coupure, l'essai n'a pas exercé la reprise : il ne doit pas passer pour réussi
+    resultat["reprise_testee"] = not coupure or proxy.stats["coupures"] > 0
+    if not resultat["reprise_testee"]:
+        print(f"Aucune coupure pendant l'essai ({resultat['duree_s']} s pour {manches} manches) : "
+              "augmenter --manches ou baisser --coupure", file=sys.stderr)
+    return resultat
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Proxy TCP avec pannes pour tester la reprise des sessions LAN")
+    parser.add_argument("commande", choices=("relayer", "essai"))
+    parser.add_argument("--ecoute", type=int, default=5556)
+    parser.add_argument("--cible", default="lan", help="relayer : hote:port ; essai : lan ou serveur")
+    parser.add_argument("--coupure", type=float, default=5.0, help="secondes en moyenne entre deux coupures (0 = jamais)")
+    parser.add_argument("--trou", type=float, default=0.0, help="secondes de refus des connexions après une coupure")
+    parser.add_argument("--latence", type=float, default=0.0, help="délai ajouté à chaque envoi (secondes)")
+    parser.add_argument("--demi", action="store_true", help="coupe seulement côté client (connexion à moitié morte)")
+    parser.add_argument("--manches", type=int, default=1000)
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+    if args.commande == "relayer":
+        hote, _, port = args.cible.rpartition(":")
+        proxy = Proxy((hote or "127.0.0.1", int(port)), args.coupure, args.trou, args.latence, args.demi, args.graine)
+        print(f"Proxy 127.0.0.1:{args.ecoute} -> {hote}:{port}")
+        try:
+            asyncio.run(proxy.servir(args.ecoute))
+        except KeyboardInterrupt:
+            print(proxy.stats)
+    else:
+        # Les messages de NetworkManager (threads compris) vont sur stderr, le rapport JSON sur stdout
+        rapport, sys.stdout = sys.stdout, sys.stderr
+        resultat = essai(args.manches, args.cible, args.coupure, args.trou, args.latence, args.demi, args.graine)
+        rapport.write(json.dumps(resultat, indent=2, ensure_ascii=False) + "\n")
+        rapport.flush()
+        sys.exit(0 if resultat["identiques"] and resultat["manches"] >= args.manches and resultat["reprise_testee"]
+                 else 1)
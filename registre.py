@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Registre des crédits : journal en ajout seul + instantané compacté.
+
+Chaque manche ajoute un enregistrement de taille fixe à solde.journal (O(1), jamais de réécriture) :
+  numéro u64, variation joueur i32, variation adversaire i32, solde joueur i64, solde adversaire i64, crc32 u32
+Les fsync sont groupés (tous les FSYNC_ENREGISTREMENTS ajouts ou FSYNC_SECONDES secondes, et à la
+fermeture). Tous les INTERVALLE_INSTANTANE ajouts, solde.json est réécrit de façon atomique
+(fichier temporaire + fsync + rename + fsync du dossier) avec le numéro du dernier
+enregistrement, puis le journal est remplacé (de la même façon) par un journal qui ne contient
+qu'un enregistrement d'ancrage : variation nulle, soldes et numéro courants.
+
+Au chargement : instantané, puis rejeu des enregistrements plus récents que lui. Un enregistrement
+tronqué ou dont le crc est faux (arrêt pendant une écriture) marque la fin du journal, qui est
+coupé à cet endroit. Les soldes étant aussi stockés en absolu, le dernier enregistrement valide
+suffit même si l'instantané est illisible ; l'ancrage garantit qu'il en existe toujours un, même
+juste après une compaction.
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+
+SOLDE_INITIAL = 100
+FSYNC_ENREGISTREMENTS = 8
+FSYNC_SECONDES = 2.0
+INTERVALLE_INSTANTANE = 256
+_MAGIQUE = b"LUJR"
+VERSION_JOURNAL = 1
+_ENTETE = struct.Struct("<4sHH")
+_ENREGISTREMENT = struct.Struct("<QiiqqI")
+_CORPS = struct.Struct("<Qiiqq")
+
+def _synchroniser_dossier(fichier):
+    """fsync du dossier de fichier : rend le rename durable (sans effet sous Windows)"""
+    if os.name == "nt": return
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(fichier)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class Registre:
+    def __init__(self, fichier_instantane, fichier_journal=None, charger=True):
+        self.fichier_instantane = fichier_instantane
+        self.fichier_journal = fichier_journal or os.path.splitext(fichier_instantane)[0] + ".journal"
+        self.solde_joueur = self.solde_luigi = SOLDE_INITIAL
+        self.sequence = 0
+        self._journal = None
+        self._non_synchronises = 0
+        self._dernier_fsync = time.monotonic()
+        self._depuis_instantane = 0
+        if charger: self.charger()
+
+    # --------------------
+    # Lecture
+    # --------------------
+    def _lire_instantane(self):
+        try:
+            with open(self.fichier_instantane, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data.get("joueur", SOLDE_INITIAL)), int(data.get("luigi", SOLDE_INITIAL)), int(data.get("sequence", 0))
+        except FileNotFoundError:
+            return SOLDE_INITIAL, SOLDE_INITIAL, 0
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print("Instantané des soldes illisible, reprise depuis le journal :", e)
+            return None
+
+    def charger(self):
+        """Instantané puis rejeu du journal ; retourne (solde joueur, solde adversaire)"""
+        instantane = self._lire_instantane()
+        sj, sl, seq = instantane or (SOLDE_INITIAL, SOLDE_INITIAL, 0)
+        fin_valide = _ENTETE.size
+        try:
+            with open(self.fichier_journal, "rb") as f:
+                donnees = f.read()
+        except FileNotFoundError:
+            donnees = b""
+        if donnees[:_ENTETE.size] == _ENTETE.pack(_MAGIQUE, VERSION_JOURNAL, 0):
+            vue = memoryview(donnees)
+            for pos in range(_ENTETE.size, len(donnees) - _ENREGISTREMENT.size + 1, _ENREGISTREMENT.size):
+                n, dj, dl, rj, rl, crc = _ENREGISTREMENT.unpack_from(vue, pos)
+                if zlib.crc32(vue[pos:pos + _CORPS.size]) != crc: break
+                fin_valide = pos + _ENREGISTREMENT.size
+                # Sans instantané lisible, le dernier enregistrement valide fait foi
+                if n > seq or instantane is None:
+                    sj, sl, seq = rj, rl, n
+        else:
+            # Vide, en-tête incomplet (arrêt pendant compacter) ou format inconnu
+            if len(donnees) >= _ENTETE.size: print("Journal des soldes inconnu, ignoré :", self.fichier_journal)
+            donnees = b""
+        self.solde_joueur, self.solde_luigi, self.sequence = sj, sl, seq
+        if donnees: self._ouvrir_journal(fin_valide)
+        if instantane is None:
+            # Gardé pour examen plutôt qu'écrasé par le nouvel instantané
+            try: os.replace(self.fichier_instantane, self.fichier_instantane + ".corrompu")
+            except OSError: pass
+        if instantane is None or not donnees or len(donnees) > fin_valide:
+            self.compacter()
+        return sj, sl
+
+    def _ouvrir_journal(self, tronquer_a):
+        """Journal existant, ouvert en ajout après le dernier enregistrement valide"""
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+        self._journal = open(self.fichier_journal, "r+b", buffering=0)
+        self._journal.truncate(tronquer_a)
+        self._journal.seek(tronquer_a)
+        self._depuis_instantane = (tronquer_a - _ENTETE.size) // _ENREGISTREMENT.size
+
+    # --------------------
+    # Écriture
+    # --------------------
+    def ajouter(self, delta_joueur, delta_luigi):
+        """Enregistre le résultat d'une manche (un seul write, fsync groupé).
+        Sans journal ouvert (dossier en lecture seule), les soldes ne sont tenus qu'en mémoire."""
+        self.sequence += 1
+        self.solde_joueur += delta_joueur
+        self.solde_luigi += delta_luigi
+        if self._journal is None: return
+        corps = _CORPS.pack(self.sequence, delta_joueur, delta_luigi, self.solde_joueur, self.solde_luigi)
+        self._journal.write(corps + struct.pack("<I", zlib.crc32(corps)))
+        self._non_synchronises += 1
+        self._depuis_instantane += 1
+        if self._depuis_instantane >= INTERVALLE_INSTANTANE:
+            self.compacter()
+        elif (self._non_synchronises >= FSYNC_ENREGISTREMENTS
+              or time.monotonic() - self._dernier_fsync >= FSYNC_SECONDES):
+            self.synchroniser()
+
+    def enregistrer_soldes(self, solde_joueur, solde_luigi):
+        """Comme ajouter(), à partir des soldes après la manche"""
+        self.ajouter(solde_joueur - self.solde_joueur, solde_luigi - self.solde_luigi)
+
+    def synchroniser(self):
+        if self._non_synchronises:
+            os.fsync(self._journal.fileno())
+            self._non_synchronises = 0
+        self._dernier_fsync = time.monotonic()
+
+    def compacter(self):
+        """Instantané atomique des soldes courants puis journal remplacé par son seul ancrage"""
+        if self._journal: self.synchroniser()
+        temp = self.fichier_instantane + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"joueur": self.solde_joueur, "luigi": self.solde_luigi, "sequence": self.sequence}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.fichier_instantane)
+        _synchroniser_dossier(self.fichier_instantane)
+        # Un arrêt ici laisse des enregistrements déjà couverts par l'instantané : ignorés au rejeu.
+        # Le nouveau journal garde les soldes courants : ils restent lisibles si l'instantané se corrompt.
+        corps = _CORPS.pack(self.sequence, 0, 0, self.solde_joueur, self.solde_luigi)
+        temp = self.fichier_journal + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(_ENTETE.pack(_MAGIQUE, VERSION_JOURNAL, 0) + corps + struct.pack("<I", zlib.crc32(corps)))
+            f.flush()
+            os.fsync(f.fileno())
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+        os.replace(temp, self.fichier_journal)
+        _synchroniser_dossier(self.fichier_journal)
+        self._ouvrir_journal(_ENTETE.size + _ENREGISTREMENT.size)
+        self._depuis_instantane = 0
+
+    def fermer(self):
+        if self._journal:
+            self.synchroniser()
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Rejeux de parties : graine + actions, rejoués dans moteur.Partie.
+
+Une partie est entièrement déterminée par la graine de son paquet (Partie.graine) et, pour
+chaque manche, les places échangées par le joueur et par Luigi et la mise. Luigi est enregistré
+comme le joueur : sa décision dépend de la table de stratégie, qui peut être installée en cours
+de partie. Les cartes sont tirées place par place dans l'ordre croissant : la main finale
+(ensemble des cartes) et donc les soldes sont identiques à la partie d'origine.
+
+Format (petit-boutiste), une partie :
+  en-tête : "LURP", version u16, mode u8 (0 solo, 1 lan), graine u64, solde joueur i64,
+            solde Luigi i64, mise u16
+  manches : u16 par manche, bits 0-4 = places échangées par le joueur, bits 5-9 = par Luigi ;
+            bit 15 : la mise change, la nouvelle mise suit (u16)
+  fin     : 0xFFFF, nb_manches u32, solde joueur i64, solde Luigi i64 (absente si le jeu a été
+            interrompu : la partie se rejoue mais ne se vérifie pas)
+Un fichier peut contenir plusieurs parties à la suite (corpus de non-régression).
+
+Usage : python rejeu.py rejouer partie.lurp            (détail manche par manche)
+        python rejeu.py verifier corpus.lurp [...]     (soldes finaux identiques au bit près ?)
+        python rejeu.py generer 10000 --sortie corpus.lurp [--graine 0]
+"""
+
+import argparse
+import random
+import struct
+import sys
+import time
+from collections import namedtuple
+
+from moteur import Partie, carte_depuis_code, choisir_defausse_luigi, regle_luigi_simple
+
+VERSION_REJEU = 1
+_MAGIQUE = b"LURP"
+_ENTETE = struct.Struct("<4sHBQqqH")
+_MANCHE = struct.Struct("<H")
+_MISE = struct.Struct("<H")
+_FIN = struct.Struct("<HIqq")
+MARQUE_FIN = 0xFFFF
+NOUVELLE_MISE = 0x8000
+MODES = ("solo", "lan")
+_INDICES = tuple(tuple(i for i in range(5) if masque >> i & 1) for masque in range(32))
+
+class ErreurRejeu(ValueError):
+    pass
+
+PartieEnregistree = namedtuple("PartieEnregistree", "mode graine solde_joueur solde_luigi manches fin")
+# manches : [(masque joueur, masque Luigi, mise)] ; fin : (nb_manches, solde joueur, solde Luigi) ou None
+
+class Enregistreur:
+    """Ajoute une partie à un fichier de rejeu, une manche après chaque resoudre()"""
+    def __init__(self, fichier, partie, mise):
+        if partie.graine is None: raise ValueError("La partie n'a pas de graine (rng ou jeu fourni)")
+        self.partie = partie
+        self.mise = mise
+        self.manches = 0
+        self._f = open(fichier, "ab")
+        self._f.write(_ENTETE.pack(_MAGIQUE, VERSION_REJEU, MODES.index(partie.mode), partie.graine,
+                                   partie.joueur.solde, partie.luigi.solde, mise))
+        self._f.flush()
+
+    def manche(self, mise):
+        """À appeler après resoudre(mise) : une manche = 2 octets (4 si la mise a changé)"""
+        def_j, def_l = self.partie.defausses
+        if mise != self.mise:
+            self.mise = mise
+            self._f.write(_MANCHE.pack(NOUVELLE_MISE | def_l << 5 | def_j) + _MISE.pack(mise))
+        else:
+            self._f.write(_MANCHE.pack(def_l << 5 | def_j))
+        self._f.flush()
+        self.manches += 1
+
+    def fermer(self):
+        if self._f.closed: return
+        self._f.write(_FIN.pack(MARQUE_FIN, self.manches, self.partie.joueur.solde, self.partie.luigi.solde))
+        self._f.close()
+
+def lire_parties(donnees):
+    """Parties d'un fichier de rejeu (bytes), dans l'ordre ; lève ErreurRejeu si le format est faux"""
+    pos = 0
+    while pos < len(donnees):
+        if len(donnees) - pos < _ENTETE.size: raise ErreurRejeu(f"En-tête tronqué à l'octet {pos}")
+        magique, version, mode, graine, sj, sl, mise = _ENTETE.unpack_from(donnees, pos)
+        if magique != _MAGIQUE or version != VERSION_REJEU or mode >= len(MODES):
+            raise ErreurRejeu(f"Rejeu inconnu à l'octet {pos}")
+        pos += _ENTETE.size
+        manches = []
+        fin = None
+        while pos + _MANCHE.size <= len(donnees):
+            (mot,) = _MANCHE.unpack_from(donnees, pos)
+            if mot == MARQUE_FIN:
+                if len(donnees) - pos < _FIN.size: raise ErreurRejeu("Fin de partie tronquée")
+                fin = _FIN.unpack_from(donnees, pos)[1:]
+                pos += _FIN.size
+                break
+            pos += _MANCHE.size
+            if mot & NOUVELLE_MISE:
+                (mise,) = _MISE.unpack_from(donnees, pos)
+                pos += _MISE.size
+            manches.append((mot & 31, mot >> 5 & 31, mise))
+        else:
+            pos = len(donnees)  # partie interrompue : dernière du fichier
+        yield PartieEnregistree(MODES[mode], graine, sj, sl, manches, fin)
+
+def rejouer(enregistree, detail=None):
+    """Rejoue la partie dans le moteur ; retourne la Partie finale. detail(partie, résultat) après chaque manche."""
+    partie = Partie(enregistree.solde_joueur, enregistree.solde_luigi, enregistree.mode, graine=enregistree.graine)
+    for def_j, def_l, mise in enregistree.manches:
+        partie.distribuer()
+        partie.echanger_cartes(_INDICES[def_j])
+        partie.tour_luigi(lambda main, ind=_INDICES[def_l]: ind)
+        res = partie.resoudre(mise)
+        if detail: detail(partie, res)
+    return partie
+
+def verifier(enregistree):
+    """None si le rejeu retrouve les soldes enregistrés (ou si la partie n'a pas de fin), sinon un message"""
+    partie = rejouer(enregistree)
+    if enregistree.fin is None: return None
+    attendu = enregistree.fin
+    obtenu = (len(enregistree.manches), partie.joueur.solde, partie.luigi.solde)
+    if obtenu != tuple(attendu):
+        return f"graine {enregistree.graine:#x} : attendu {tuple(attendu)}, obtenu {obtenu}"
+    return None
+
+def generer(fichier, nb, graine=0, manches_max=200, mise=10):
+    """Corpus de nb parties solo simulées (joueur : ancienne règle de Luigi, Luigi : sa règle courante)"""
+    rng = random.Random(graine)
+    for _ in range(nb):
+        partie = Partie(100, 100, "solo", graine=rng.getrandbits(64))
+        enr = Enregistreur(fichier, partie, mise)
+        try:
+            for _ in range(manches_max):
+                m = rng.choice((10, 20, 30)) if rng.random() < 0.1 else enr.mise
+                partie.jouer_manche(m, regle_luigi_simple, choisir_defausse_luigi)
+                enr.manche(m)
+                if partie.fin_partie(): break
+        finally:
+            enr.fermer()
+
+def _lire(fichier):
+    with open(fichier, "rb") as f:
+        return list(lire_parties(f.read()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeux de parties de Poker Luigi")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    p = sous.add_parser("rejouer", help="détail manche par manche")
+    p.add_argument("fichier")
+    p = sous.add_parser("verifier", help="rejoue tout et compare les soldes finaux")
+    p.add_argument("fichiers", nargs="+")
+    p = sous.add_parser("generer", help="corpus de parties simulées")
+    p.add_argument("nombre", type=int)
+    p.add_argument("--sortie", required=True)
+    p.add_argument("--graine", type=int, default=0)
+    p.add_argument("--manches-max", type=int, default=200)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.commande == "rejouer":
+        for n, enr in enumerate(_lire(args.fichier), 1):
+            print(f"Partie {n} ({enr.mode}, graine {enr.graine:#018x}) : {enr.solde_joueur} / {enr.solde_luigi}")
+            def detail(partie, res):
+                donne_j, donne_l = ([carte_depuis_code(c) for c in d] for d in partie.donnes)
+                print(f"  {donne_j} -> {partie.joueur.main.cartes} {res.nom_j:<13} | "
+                      f"{donne_l} -> {partie.luigi.main.cartes} {res.nom_l:<13} | "
+                      f"{res.delta_joueur:+d} / {res.delta_luigi:+d} -> {partie.joueur.solde} / {partie.luigi.solde}")
+            partie = rejouer(enr, detail)
+            etat = "fin enregistrée " + ("identique" if verifier(enr) is None else "DIFFÉRENTE") if enr.fin else "interrompue"
+            print(f"  soldes finaux {partie.joueur.solde} / {partie.luigi.solde} ({etat})")
+    elif args.commande == "verifier":
+        parties = manches = sans_fin = 0
+        erreurs = []
+        for fichier in args.fichiers:
+            for enr in _lire(fichier):
+                parties += 1
+                manches += len(enr.manches)
+                sans_fin += enr.fin is None
+                e = verifier(enr)
+                if e: erreurs.append(f"{fichier} : {e}")
+        duree = time.perf_counter() - t0
+        for e in erreurs: print(e)
+        print(f"{parties} parties, {manches} manches rejouées en {duree:.2f} s ({manches / max(duree, 1e-9):.0f} manches/s), "
+              f"{len(erreurs)} différence(s), {sans_fin} partie(s) sans fin enregistrée")
+        sys.exit(1 if erreurs else 0)
+    else:
+        generer(args.sortie, args.nombre, args.graine, args.manches_max)
+        print(f"{args.nombre} parties écrites dans {args.sortie} en {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main()
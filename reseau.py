@@ -0,0 +1,649 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Connexion LAN (hôte / client) sur le protocole binaire de protocole.py.
+
+Reprise après coupure : l'hôte donne un jeton de session (SESSION) à la connexion. Si la socket
+tombe, receive_loop ne s'arrête pas tout de suite : le client se reconnecte (REPRISE avec le
+jeton), l'hôte lui renvoie dans un seul ETAT ce qu'il a manqué de la manche en cours (son START,
+le HAND de l'hôte, les soldes) et le client renvoie son HAND s'il s'est perdu. La partie ne
+s'arrête que si la reprise échoue pendant DELAI_REPRISE secondes. L'hôte accepte une reprise à
+tout moment : une connexion à moitié morte de son côté est remplacée dès que le client revient.
+
+Vers l'interface : receive_loop tourne dans son propre thread ; FileMessages lui sert de file
+vers la boucle Tk, qui la vide par lots à intervalle fixe.
+
+Spectateurs : une connexion qui commence par SPECTATEUR (au lieu de HELLO) reçoit le flux public
+de la table (MANCHE, REVELE, RESULTAT ; voir Diffusion). Elle ne reçoit jamais de main avant
+l'abattage.
+"""
+
+import hmac
+import os
+import queue
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import Counter, deque
+
+import protocole
+
+DELAI_HELLO = 5.0
+DELAI_REPRISE = 30.0
+TAILLE_LECTURE = 64 * 1024
+FILE_ECOUTE = 128             # connexions en attente d'accept (joueur, reprises, spectateurs)
+LIMITE_FILE_SPECTATEUR = 64   # trames en attente par spectateur avant de le couper (ou de sauter)
+LOT_INTERFACE = 64            # messages rendus au plus par FileMessages.vider()
+# Keepalive TCP : une connexion morte sans fermeture (Wi-Fi coupé) est détectée en une dizaine de secondes
+KEEPALIVE = {"TCP_KEEPIDLE": 5, "TCP_KEEPINTVL": 2, "TCP_KEEPCNT": 3}
+
+def regler_socket(s):
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, valeur in KEEPALIVE.items():
+        if hasattr(socket, option):
+            try: s.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), valeur)
+            except OSError: pass
+
+def lire_trame(sock):
+    """Une trame lue à l'octet près, hors du tampon de réception (négociation d'une reprise)"""
+    entete = _lire_exactement(sock, protocole.ENTETE.size)
+    msglen = protocole.ENTETE.unpack(entete)[0]
+    if msglen > protocole.TAILLE_MAX_CORPS:
+        raise protocole.ErreurProtocole(f"Trame trop grande : {msglen} octets")
+    return protocole.decoder(_lire_exactement(sock, msglen))
+
+def _lire_exactement(sock, n):
+    morceaux = bytearray()
+    while len(morceaux) < n:
+        m = sock.recv(n - len(morceaux))
+        if not m: raise ConnectionError("Connexion fermée pendant la négociation")
+        morceaux += m
+    return bytes(morceaux)
+
+# ------------------------
+# Classe Réseau (ROBUSTE)
+# ------------------------
+class NetworkManager:
+    def __init__(self, is_host, ip=None, port=5555, taille_max_trame=protocole.TAILLE_MAX_CORPS):
+        self.is_host = is_host
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        regler_socket(self.client)
+        self.addr = (ip, port) if ip else ('0.0.0.0', port)
+        self.conn = None
+        self.running = True
+        # Tampon de réception réutilisé : [_debut, _fin) = octets reçus pas encore découpés en trames.
+        # Il contient toujours au moins une trame de taille maximale.
+        self.taille_max_trame = taille_max_trame
+        self._tampon = bytearray(max(TAILLE_LECTURE, protocole.ENTETE.size + taille_max_trame))
+        self._vue = memoryview(self._tampon)
+        self._debut = self._fin = 0
+        self._recus = deque()
+        self.octets_recus = 0
+        self.trames_recues = 0
+        self._t0 = time.perf_counter()
+        # Session : jeton, état de la manche en cours, reprises (connexions remplaçantes côté hôte)
+        self.jeton = None
+        self.instantane = protocole.InstantaneManche()
+        self._verrou = threading.Lock()  # envoi et remplacement de la connexion
+        self._reprises = queue.Queue()
+        self.reprises = 0
+        self.reprise_max_s = 0.0
+        self.spectateurs = None  # Diffusion, créée au premier spectateur ou événement public
+
+    def start_host(self):
+        try:
+            self.client.bind(self.addr)
+            self.client.listen(FILE_ECOUTE)
+            print("Serveur: En attente...")
+            while True:
+                self.conn, addr = self.client.accept()
+                regler_socket(self.conn)
+                try:
+                    if self._negocier(): break
+                    # sinon un spectateur arrivé avant le joueur
+                except (protocole.ErreurProtocole, OSError) as e:
+                    # Scan de ports, ancien client pickle, mauvaise version : on attend le vrai joueur
+                    print(f"Connexion refusée ({addr[0]}) :", e)
+                self._vider_tampon()  # octets de la connexion écartée
+            print(f"Serveur: Client connecté {addr}")
+            threading.Thread(target=self._accepter, daemon=True, name="reprises").start()
+            return True
+        except Exception as e:
+            print("Erreur Host:", e)
+            return False
+
+    def start_client(self):
+        try:
+            self.client.connect(self.addr)
+            self.conn = self.client
+            self._negocier()
+            print("Client: Connecté au serveur")
+            return True
+        except Exception as e:
+            print("Erreur Client:", e)
+            return False
+
+    def _vider_tampon(self):
+        self._recus.clear()
+        self._debut = self._fin = 0
+
+    def _negocier(self):
+        """Échange des HELLO : une version différente (ou un ancien client pickle) est refusée proprement.
+        L'hôte envoie ensuite le jeton de session. Retourne False si l'hôte a reçu un spectateur."""
+        self.conn.settimeout(DELAI_HELLO)
+        self._t0 = time.perf_counter()
+        try:
+            self.conn.sendall(protocole.hello())
+            try:
+                msg = self._recv_message() or {}
+                protocole.verifier_hello(msg, ("HELLO", "SPECTATEUR") if self.is_host else ("HELLO",))
+                if msg["type"] == "SPECTATEUR":
+                    self._ajouter_spectateur(self.conn)
+                    self.conn = None
+                    return False
+                if self.is_host:
+                    self.jeton = os.urandom(protocole.TAILLE_JETON)
+                    self.conn.sendall(protocole.encoder({"type": "SESSION", "jeton": self.jeton}))
+                else:
+                    session = self._recv_message() or {}
+                    if session.get("type") != "SESSION":
+                        raise protocole.ErreurProtocole("Pas de jeton de session reçu de l'hôte")
+                    self.jeton = session["jeton"]
+            except socket.timeout:
+                raise protocole.ErreurProtocole("Le pair ne répond pas à la négociation")
+            except protocole.ErreurProtocole as e:
+                raise protocole.ErreurProtocole(f"Pair incompatible : {e}")
+        except Exception:
+            self.conn.close()
+            raise
+        self.conn.settimeout(None)
+        return True
+
+    def send(self, data):
+        """Envoie un message (dict) encodé en trame binaire avec header de taille (4 bytes).
+        Le message est d'abord noté dans l'état de la manche : perdu dans une coupure, il sera
+        rattrapé par la reprise."""
+        try:
+            trame = protocole.encoder(data)
+        except (protocole.ErreurProtocole, ValueError, TypeError, KeyError, struct.error) as e:
+            print("Erreur Send:", e)  # message invalide : rien n'est envoyé ni noté, la connexion reste ouverte
+            return
+        with self._verrou:
+            self.instantane.envoye(data)
+            conn = self.conn
+            try:
+                if conn:
+                    conn.sendall(trame)
+            except OSError as e:
+                print("Erreur Send:", e)
+                _couper(conn)  # réveille receive_loop, qui lance la reprise
+
+    def noter_soldes(self, solde_local, solde_pair):
+        """Soldes au début de la manche (hôte), renvoyés au client s'il a manqué le START"""
+        with self._verrou:
+            self.instantane.soldes = (solde_pair, solde_local)
+
+    def _remplir(self):
+        """Un recv_into dans la place libre du tampon, puis découpe de toutes les trames complètes.
+        Retourne False si la connexion est fermée."""
+        manque = protocole.ENTETE.size
+        if self._fin - self._debut >= manque:
+            manque += protocole.ENTETE.unpack_from(self._vue, self._debut)[0]
+        if self._debut + manque > len(self._tampon):
+            # Seul le début de trame incomplet est recopié, jamais les trames déjà lues
+            reste = self._fin - self._debut
+            self._vue[:reste] = self._vue[self._debut:self._fin]
+            self._debut, self._fin = 0, reste
+        try:
+            n = self.conn.recv_into(self._vue[self._fin:])
+        except socket.timeout: raise
+        except OSError: return False
+        if not n: return False
+        self.octets_recus += n
+        self._fin += n
+        self._decouper()
+        return True
+
+    def _decouper(self):
+        vue, debut, fin = self._vue, self._debut, self._fin
+        entete = protocole.ENTETE.size
+        while fin - debut >= entete:
+            msglen = protocole.ENTETE.unpack_from(vue, debut)[0]
+            if msglen > self.taille_max_trame:
+                raise protocole.ErreurProtocole(f"Trame trop grande : {msglen} octets")
+            if fin - debut - entete < msglen: break
+            self._recus.append(protocole.decoder(vue[debut + entete:debut + entete + msglen]))
+            debut += entete + msglen
+            self.trames_recues += 1
+        if debut == fin: debut = fin = 0
+        self._debut, self._fin = debut, fin
+
+    def _recv_message(self):
+        """Prochaine trame décodée ; None si la connexion est fermée"""
+        while not self._recus:
+            if not self._remplir(): return None
+        return self._recus.popleft()
+
+    def statistiques(self):
+        """Octets et trames reçus depuis la connexion, et débits moyens par seconde"""
+        duree = max(time.perf_counter() - self._t0, 1e-9)
+        return {"octets": self.octets_recus, "trames": self.trames_recues,
+                "octets_s": self.octets_recus / duree, "trames_s": self.trames_recues / duree}
+
+    def receive_loop(self, callback):
+        while self.running:
+            try:
+                if self.conn:
+                    obj = self._recv_message()
+                    if obj is None:
+                        if not self.running: break
+                        obj = self._reprendre()
+                        if obj is None: break
+                        if obj is True: continue  # hôte : rien à transmettre au jeu
+                    with self._verrou:  # send() et noter_soldes() modifient le même état (thread Tk)
+                        self.instantane.recu(obj)
+                    callback(obj)
+            except Exception as e:
+                print("Erreur Receive:", e)
+                break
+        print("Connexion perdue.")
+
+    # ------------------------
+    # Reprise de session
+    # ------------------------
+    def _reprendre(self):
+        """Après une coupure : True (hôte) ou l'ETAT reçu (client) si la session a repris, None sinon"""
+        t0 = time.perf_counter()
+        print("Connexion coupée, reprise de la session...")
+        fin = t0 + DELAI_REPRISE
+        resultat = self._attendre_reprise(fin) if self.is_host else self._rappeler(fin)
+        if resultat is not None:
+            duree = time.perf_counter() - t0
+            self.reprises += 1
+            self.reprise_max_s = max(self.reprise_max_s, duree)
+            print(f"Connexion rétablie en {duree * 1e3:.0f} ms")
+        return resultat
+
+    def _installer(self, sock):
+        """Remplace la connexion (sous self._verrou) ; les octets de l'ancienne sont abandonnés"""
+        ancienne = self.conn
+        self.conn = sock
+        if not self.is_host: self.client = sock
+        self._debut = self._fin = 0
+        self._recus.clear()
+        if ancienne is not None and ancienne is not sock:
+            try: ancienne.close()
+            except OSError: pass
+
+    def _accepter(self):
+        """Hôte : accepte les spectateurs et les REPRISE portant le jeton de la session, à tout moment"""
+        while self.running:
+            try:
+                sock, addr = self.client.accept()
+            except OSError:
+                return  # socket d'écoute fermée par close()
+            regler_socket(sock)
+            sock.settimeout(DELAI_HELLO)
+            try:
+                sock.sendall(protocole.hello())
+                reprise = lire_trame(sock)
+                protocole.verifier_hello(reprise, ("REPRISE", "SPECTATEUR"))
+                if reprise["type"] == "SPECTATEUR":
+                    self._ajouter_spectateur(sock)
+                    continue
+                if not hmac.compare_digest(reprise["jeton"], self.jeton):
+                    raise protocole.ErreurProtocole("jeton de session inconnu")
+            except (OSError, protocole.ErreurProtocole) as e:
+                print(f"Reprise refusée ({addr[0]}) :", e)
+                sock.close()
+                continue
+            self._reprises.put((sock, reprise))
+            # L'ancienne connexion peut sembler vivante de ce côté : on la coupe pour réveiller receive_loop
+            _couper(self.conn)
+
+    def _attendre_reprise(self, fin):
+        while self.running and time.perf_counter() < fin:
+            try:
+                sock, reprise = self._reprises.get(timeout=min(fin - time.perf_counter(), 0.5))
+            except queue.Empty:
+                continue
+            with self._verrou:
+                try:
+                    sock.sendall(protocole.encoder(self.instantane.etat(reprise)))
+                    sock.settimeout(None)
+                except (OSError, protocole.ErreurProtocole) as e:
+                    print("Reprise impossible :", e)
+                    sock.close()
+                    continue
+                self._installer(sock)
+            return True
+        return None
+
+    def _rappeler(self, fin):
+        """Client : reconnexions successives jusqu'à fin ; REPRISE puis HELLO + ETAT en un aller-retour"""
+        pause = 0.05
+        while self.running and time.perf_counter() < fin:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            regler_socket(sock)
+            sock.settimeout(max(min(DELAI_HELLO, fin - time.perf_counter()), 0.01))
+            try:
+                sock.connect(self.addr)
+                with self._verrou: reprise = protocole.encoder(self.instantane.reprise(self.jeton))
+                sock.sendall(reprise)
+                protocole.verifier_hello(lire_trame(sock))
+                etat = lire_trame(sock)
+                if etat["type"] != "ETAT": raise protocole.ErreurProtocole(f"ETAT attendu, reçu {etat['type']}")
+                sock.settimeout(None)
+            except protocole.ErreurProtocole as e:
+                print("Reprise refusée :", e)
+                sock.close()
+                return None
+            except OSError:
+                sock.close()
+                time.sleep(pause)
+                pause = min(pause * 2, 1.0)
+                continue
+            with self._verrou:
+                renvoi = self.instantane.a_renvoyer(etat)
+                self._installer(sock)
+                if renvoi:
+                    try: sock.sendall(protocole.encoder(renvoi))
+                    except OSError: _couper(sock)
+            return etat
+        return None
+
+    def get_local_ip(self):
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+            s.close()
+            return ip
+        except: return "127.0.0.1"
+
+    # ------------------------
+    # Spectateurs
+    # ------------------------
+    def _diffusion(self):
+        # Créée au premier besoin, par le thread des reprises ou par la boucle Tk
+        with self._verrou:
+            if self.spectateurs is None: self.spectateurs = Diffusion()
+        return self.spectateurs
+
+    def _ajouter_spectateur(self, sock):
+        self._diffusion().ajouter(sock)
+
+    def diffuser(self, msg):
+        """Événement public de la table (hôte) : encodé une fois pour tous les spectateurs"""
+        if not self.is_host: return
+        msg.setdefault("numero", self.instantane.numero)
+        self._diffusion().diffuser(msg)
+
+    def statistiques_reprises(self):
+        return {"reprises": self.reprises, "reprise_max_ms": self.reprise_max_s * 1e3}
+
+    def close(self):
+        self.running = False
+        if self.conn: self.conn.close()
+        if self.client: self.client.close()
+        if self.spectateurs: self.spectateurs.fermer()
+
+def _couper(conn):
+    """shutdown sans close : le recv bloqué dans receive_loop se termine aussitôt"""
+    if conn is None: return
+    try: conn.shutdown(socket.SHUT_RDWR)
+    except OSError: pass
+
+
+# ------------------------
+# File vers l'interface
+# ------------------------
+class FileMessages:
+    """Messages reçus (thread de receive_loop) en attente de la boucle Tk, qui les prend par lots avec
+    vider() à intervalle fixe au lieu d'un root.after par message.
+
+    Un START, HAND ou ETAT qui suit un message du même type encore en attente le remplace : le jeu
+    n'applique que le plus récent (deux ETAT sont fusionnés, le second complétant le premier). Seul le
+    dernier message de la file peut être remplacé, l'ordre START -> HAND d'une manche n'est donc
+    jamais modifié et aucune manche n'est perdue.
+
+    statistiques() : messages ajoutés / remplacés / traités, lots, profondeur de la file (actuelle
+    et maximale) et latence entre la réception et le traitement (p50 / p99 / max sur les
+    derniers messages)."""
+
+    REMPLACABLES = ("START", "HAND", "ETAT")
+
+    def __init__(self, lot=LOT_INTERFACE, historique=1024):
+        self.lot = lot
+        self.stats = Counter()
+        self.profondeur_max = 0
+        self._file = deque()  # (instant de réception, message)
+        self._verrou = threading.Lock()
+        self._latences = deque(maxlen=historique)
+        self._latence_max = 0.0
+
+    def ajouter(self, msg):
+        t = time.perf_counter()
+        with self._verrou:
+            file = self._file
+            if msg and file:
+                recu, dernier = file[-1]
+                type_msg = msg.get("type")
+                if type_msg in self.REMPLACABLES and dernier and dernier.get("type") == type_msg:
+                    if type_msg == "ETAT": msg = {**dernier, **msg}
+                    file[-1] = (recu, msg)  # la latence compte depuis le message remplacé
+                    self.stats["remplaces"] += 1
+                    return
+            file.append((t, msg))
+            self.stats["ajoutes"] += 1
+            if len(file) > self.profondeur_max: self.profondeur_max = len(file)
+
+    def vider(self):
+        """Boucle Tk : au plus self.lot messages, dans l'ordre de réception"""
+        with self._verrou:
+            file = self._file
+            if not file: return []
+            lot = [file.popleft() for _ in range(min(self.lot, len(file)))]
+        t = time.perf_counter()
+        for recu, _ in lot:
+            self._latences.append(t - recu)
+        self._latence_max = max(self._latence_max, t - lot[0][0])
+        self.stats["lots"] += 1
+        self.stats["traites"] += len(lot)
+        return [msg for _, msg in lot]
+
+    def __len__(self):
+        return len(self._file)
+
+    def statistiques(self):
+        latences = sorted(self._latences)
+        q = lambda p: round(latences[min(int(p * len(latences)), len(latences) - 1)] * 1e3, 3) if latences else None
+        return dict(self.stats, profondeur=len(self._file), profondeur_max=self.profondeur_max,
+                    latence_ms={"p50": q(0.5), "p99": q(0.99), "max": round(self._latence_max * 1e3, 3)})
+
+
+# ------------------------
+# Diffusion aux spectateurs
+# ------------------------
+class Spectateur:
+    __slots__ = ("sock", "adresse", "file", "partiel", "a_couper", "ecriture")
+    def __init__(self, sock):
+        self.sock = sock
+        try: self.adresse = sock.getpeername()
+        except OSError: self.adresse = None
+        self.file = deque()    # trames à écrire (la première peut être une fin de trame, memoryview)
+        self.partiel = False   # la première trame est déjà à moitié écrite
+        self.a_couper = False
+        self.ecriture = False  # inscrit pour EVENT_WRITE
+
+class Diffusion:
+    """Flux public d'une table vers N spectateurs.
+
+    diffuser() encode l'événement une seule fois et ajoute la même trame à la file bornée de chaque
+    spectateur, puis réveille un unique thread d'écriture (sockets non bloquantes, selectors) :
+    l'appelant (la boucle Tk de l'hôte) ne fait aucun appel système par spectateur et n'attend
+    jamais un spectateur lent. Un spectateur dont la file est pleine est coupé (politique "couper")
+    ou perd ses plus vieilles trames non commencées (politique "sauter"). Un spectateur qui arrive
+    reçoit d'abord les événements de la manche en cours.
+
+    Le verrou ne protège que la liste des spectateurs et la manche en cours : les écritures se
+    font hors verrou (deque.append et popleft sont atomiques)."""
+
+    def __init__(self, limite=LIMITE_FILE_SPECTATEUR, politique="couper"):
+        if politique not in ("couper", "sauter"): raise ValueError(f"Politique inconnue : {politique}")
+        self.limite = limite
+        self.politique = politique
+        self.manche = []       # trames publiques de la manche en cours
+        self.stats = Counter()
+        self._liste = ()       # spectateurs inscrits (tuple remplacé, jamais modifié)
+        self._nouveaux = []    # arrivés, pas encore inscrits par le thread d'écriture
+        self._a_vider = False
+        self._verrou = threading.Lock()
+        self._thread = None
+        self._ouverte = True
+
+    def _demarrer(self):
+        self._selecteur = selectors.DefaultSelector()
+        self._reveil_r, self._reveil_w = socket.socketpair()
+        self._reveil_r.setblocking(False)
+        self._reveil_w.setblocking(False)
+        self._selecteur.register(self._reveil_r, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._boucle, daemon=True, name="spectateurs")
+        self._thread.start()
+
+    def _reveiller(self):
+        try: self._reveil_w.send(b"\0")
+        except OSError: pass  # déjà réveillé (tampon plein) ou fermé
+
+    def ajouter(self, sock):
+        sock.settimeout(None)
+        sock.setblocking(False)
+        s = Spectateur(sock)
+        with self._verrou:
+            if not self._ouverte:
+                sock.close()
+                return
+            if self._thread is None: self._demarrer()
+            s.file.extend(self.manche)
+            self._nouveaux.append(s)
+            self.stats["spectateurs"] += 1
+        self._reveiller()
+        print(f"Spectateur connecté {s.adresse}")
+
+    def diffuser(self, msg):
+        """Encode msg une fois et le met dans la file de chaque spectateur ; retourne la trame"""
+        return self.diffuser_trame(protocole.encoder(msg), msg["type"] == "MANCHE")
+
+    def diffuser_trame(self, trame, nouvelle_manche=False):
+        limite, couper = self.limite, self.politique == "couper"
+        with self._verrou:
+            if nouvelle_manche: self.manche = [trame]
+            else: self.manche.append(trame)
+            self.stats["evenements"] += 1
+            if not self._liste and not self._nouveaux: return trame
+            for s in self._liste:
+                if couper and len(s.file) >= limite:
+                    s.a_couper = True
+                else:
+                    s.file.append(trame)
+            for s in self._nouveaux: s.file.append(trame)
+            self._a_vider = True
+        self._reveiller()
+        return trame
+
+    def _boucle(self):
+        sel = self._selecteur
+        while self._ouverte:
+            try:
+                evenements = sel.select()
+            except OSError:
+                break
+            a_vider = set()
+            for cle, masque in evenements:
+                s = cle.data
+                if s is None:
+                    try:
+                        while self._reveil_r.recv(4096): pass
+                    except OSError: pass
+                elif masque & selectors.EVENT_READ and not self._lire(s):
+                    continue
+                elif masque & selectors.EVENT_WRITE:
+                    a_vider.add(s)
+            with self._verrou:
+                if self._nouveaux:
+                    for s in self._nouveaux: sel.register(s.sock, selectors.EVENT_READ, s)
+                    a_vider.update(self._nouveaux)
+                    self._liste += tuple(self._nouveaux)
+                    self._nouveaux.clear()
+                if self._a_vider:
+                    a_vider.update(self._liste)
+                    self._a_vider = False
+            for s in a_vider:
+                if s.a_couper:
+                    self.stats["spectateurs_coupes"] += 1
+                    self._retirer(s)
+                    continue
+                while len(s.file) > self.limite:  # politique "sauter"
+                    del s.file[1 if s.partiel else 0]
+                    self.stats["trames_sautees"] += 1
+                self._vider(s)
+        sel.close()
+        self._reveil_r.close()
+        self._reveil_w.close()
+
+    def _lire(self, s):
+        """Un spectateur n'envoie rien après SPECTATEUR : lisible = fermé (ou protocole non respecté)"""
+        try:
+            if s.sock.recv(4096): return True
+        except BlockingIOError:
+            return True
+        except OSError:
+            pass
+        self._retirer(s)
+        return False
+
+    def _vider(self, s):
+        file = s.file
+        try:
+            while file:
+                trame = file[0]
+                n = s.sock.send(trame)
+                self.stats["octets"] += n
+                if n < len(trame):
+                    file[0] = memoryview(trame)[n:]
+                    s.partiel = True
+                    break
+                file.popleft()
+                s.partiel = False
+                self.stats["trames"] += 1
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._retirer(s)
+            return
+        if bool(file) != s.ecriture:
+            s.ecriture = bool(file)
+            self._selecteur.modify(s.sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if file else 0), s)
+
+    def _retirer(self, s):
+        with self._verrou:
+            if s not in self._liste: return
+            self._liste = tuple(x for x in self._liste if x is not s)
+        try: self._selecteur.unregister(s.sock)
+        except (KeyError, ValueError): pass
+        s.sock.close()
+
+    def statistiques(self):
+        liste = self._liste
+        return dict(self.stats, connectes=len(liste) + len(self._nouveaux),
+                    en_attente_max=max((len(s.file) for s in liste), default=0))
+
+    def fermer(self):
+        with self._verrou:
+            self._ouverte = False
+            for s in self._liste + tuple(self._nouveaux): s.sock.close()
+            self._liste = ()
+            self._nouveaux.clear()
+        if self._thread: self._reveiller()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Serveur multi-tables (asyncio).
+
+Remplace l'hôte LAN (listen(1), un thread bloquant par connexion) quand on veut beaucoup de
+tables : les clients du jeu se connectent avec "Rejoindre" comme chez un hôte normal. Chaque
+client qui arrive est placé dans la file d'attente puis assis face au suivant ; chaque table a
+son propre JeuDeCartes (moteur.Partie en mode "lan").
+
+Déroulement d'une manche (mêmes messages que l'hôte de poker Luigi.py) :
+  START (main de chaque siège) -> HAND des deux sièges -> chacun reçoit le HAND de l'autre
+  -> le serveur résout la manche comme resolve_lan_round (mise 10, somme nulle).
+La partie s'arrête quand un solde tombe à 0. Si un siège ne répond pas dans --delai-manche
+secondes ou se déconnecte, il est éjecté et son adversaire retourne dans la file d'attente.
+
+Confiance : le protocole n'a pas de demande de pioche, chaque client tire ses remplaçantes dans
+son propre paquet. Le serveur vérifie seulement ce qu'il connaît (main_autorisee : cartes
+gardées à leur place dans la donne, aucune carte de la donne reprise après défausse) ; la
+valeur des remplaçantes n'est pas vérifiable, un client modifié peut donc choisir ses cartes.
+Un siège qui envoie une main impossible est éjecté comme sur une erreur de protocole.
+
+Reprise : chaque client reçoit un jeton de session (SESSION). Une connexion coupée garde son
+siège pendant DELAI_REPRISE secondes ; le client qui revient avec REPRISE + jeton récupère dans
+un ETAT ce qu'il a manqué de la manche en cours (voir protocole.InstantaneManche).
+
+Contre-pression : chaque envoi attend drain() (borné par DELAI_ECRITURE) dès que le tampon
+d'écriture dépasse LIMITE_ECRITURE ; un client qui ne lit plus est déconnecté au lieu de faire
+grossir la mémoire du serveur. Une connexion ne lit qu'une trame à la fois.
+
+Usage : python serveur.py [--port 5555] [--max-connexions 10000] [--delai-manche 60] [--pause 4]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+
+import protocole
+from moteur import Partie, carte_depuis_code
+
+MISE_LAN = 10
+SOLDE_INITIAL = 100
+DELAI_HELLO = 5.0
+DELAI_MANCHE = 60.0
+DELAI_ECRITURE = 10.0
+DELAI_REPRISE = 30.0
+PAUSE_MANCHES = 4.0
+LIMITE_ECRITURE = 64 * 1024
+MAX_CONNEXIONS = 10_000
+
+async def lire_message(reader):
+    """Prochaine trame décodée ; None si la connexion est fermée"""
+    try:
+        entete = await reader.readexactly(protocole.ENTETE.size)
+        msglen = protocole.ENTETE.unpack(entete)[0]
+        if msglen > protocole.TAILLE_MAX_CORPS:
+            raise protocole.ErreurProtocole(f"Trame trop grande : {msglen} octets")
+        return protocole.decoder(await reader.readexactly(msglen))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+def main_autorisee(donne, main):
+    """Main finale possible à partir de la donne : chaque carte gardée reste à sa place, une
+    carte remplacée ne revient pas de la donne (défaussée ou déplacée)"""
+    return all(c == d or c not in donne for d, c in zip(donne, main))
+
+class Connexion:
+    """Un client connecté : lecture en tâche de fond, mains reçues dans une file d'une place.
+    Coupée, elle garde sa session (jeton, état de la manche) jusqu'à une reprise ou DELAI_REPRISE."""
+    __slots__ = ("reader", "writer", "adresse", "mains", "fermee", "coupee", "fin", "jeton", "instantane",
+                 "_lecture", "_minuterie", "_sessions")
+    def __init__(self, reader, writer, sessions):
+        self.adresse = writer.get_extra_info("peername")
+        self.mains = asyncio.Queue(maxsize=1)
+        self.fermee = False
+        self.coupee = False
+        self.fin = asyncio.Event()
+        self.jeton = os.urandom(protocole.TAILLE_JETON)
+        self.instantane = protocole.InstantaneManche()
+        self._lecture = None
+        self._minuterie = None
+        self._sessions = sessions
+        sessions[self.jeton] = self
+        self._brancher(reader, writer)
+
+    def _brancher(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        writer.transport.set_write_buffer_limits(high=LIMITE_ECRITURE)
+
+    def demarrer_lecture(self, stats):
+        self._lecture = asyncio.create_task(self._lire(self.reader, stats))
+        return self._lecture
+
+    async def _lire(self, reader, stats):
+        try:
+            while True:
+                msg = await lire_message(reader)
+                if reader is not self.reader: return  # remplacée par une reprise
+                if msg is None:
+                    self.couper()
+                    return
+                stats["trames_recues"] += 1
+                if msg["type"] != "HAND": continue
+                if len(set(msg["hand_obj"])) != 5 or self.mains.full():
+                    # Main impossible ou deux HAND pour une même manche
+                    stats["erreurs_protocole"] += 1
+                    break
+                self.instantane.recu(msg)
+                self.mains.put_nowait(msg["hand_obj"])
+        except protocole.ErreurProtocole:
+            if reader is not self.reader: return
+            stats["erreurs_protocole"] += 1
+        self.fermer()
+
+    async def envoyer(self, trame):
+        """Écrit une trame déjà encodée ; False si le client est parti ou ne lit plus.
+        Pendant une coupure, la trame est perdue mais la reprise rattrapera l'état de la manche."""
+        if self.fermee: return False
+        if self.coupee: return True
+        try:
+            self.writer.write(trame)
+            await asyncio.wait_for(self.writer.drain(), DELAI_ECRITURE)
+            return True
+        except asyncio.TimeoutError:
+            self.fermer()
+            return False
+        except (ConnectionError, OSError):
+            self.couper()
+            return True
+
+    async def envoyer_message(self, msg):
+        """Message de la manche (START, HAND) : noté dans l'état de la manche puis envoyé"""
+        self.instantane.envoye(msg)
+        return await self.envoyer(protocole.encoder(msg))
+
+    async def recevoir_main(self):
+        """Main finale du prochain HAND (liste de codes), ou None si la connexion se ferme"""
+        attente = asyncio.ensure_future(self.mains.get())
+        fermeture = asyncio.ensure_future(self.fin.wait())
+        try:
+            await asyncio.wait((attente, fermeture), return_when=asyncio.FIRST_COMPLETED)
+            return attente.result() if attente.done() else None
+        finally:
+            # Délai de la table dépassé ou connexion fermée : le get() ne doit pas voler la main suivante
+            attente.cancel()
+            fermeture.cancel()
+
+    def vider(self):
+        while not self.mains.empty(): self.mains.get_nowait()
+
+    def couper(self):
+        """Connexion perdue : le siège attend une reprise pendant DELAI_REPRISE secondes"""
+        if self.fermee or self.coupee: return
+        self.coupee = True
+        self.writer.close()
+        self._minuterie = asyncio.get_running_loop().call_later(DELAI_REPRISE, self.fermer)
+
+    async def reprendre(self, reader, writer, reprise, stats):
+        """Rebranche la session sur une nouvelle connexion : HELLO + ETAT, puis lecture"""
+        etat = protocole.encoder(self.instantane.etat(reprise))
+        if self._minuterie: self._minuterie.cancel()
+        ancien = self.writer
+        self._brancher(reader, writer)
+        self.coupee = False
+        ancien.close()  # connexion encore ouverte de notre côté si elle était à moitié morte
+        if not await self.envoyer(protocole.hello() + etat):
+            return None
+        return self.demarrer_lecture(stats)
+
+    def fermer(self):
+        if self.fermee: return
+        self.fermee = True
+        if self._minuterie: self._minuterie.cancel()
+        self._sessions.pop(self.jeton, None)
+        self.writer.close()
+        self.fin.set()
+
+class Serveur:
+    def __init__(self, mise=MISE_LAN, solde=SOLDE_INITIAL, delai_manche=DELAI_MANCHE, pause=PAUSE_MANCHES,
+                 max_connexions=MAX_CONNEXIONS, graine=None):
+        self.mise = mise
+        self.solde = solde
+        self.delai_manche = delai_manche
+        self.pause = pause
+        self.max_connexions = max_connexions
+        self.rng = random.Random(graine)
+        self.attente = deque()
+        self.connexions = 0
+        self.tables = set()
+        self.sessions = {}
+        self.stats = Counter()
+        self.t0 = time.perf_counter()
+
+    async def accueillir(self, reader, writer):
+        """Callback de asyncio.start_server : négociation HELLO puis file d'attente, ou REPRISE d'une session"""
+        if self.connexions >= self.max_connexions:
+            self.stats["refusees"] += 1
+            writer.close()
+            return
+        self.connexions += 1
+        self.stats["connexions"] += 1
+        try:
+            try:
+                msg = await asyncio.wait_for(lire_message(reader), DELAI_HELLO) or {}
+                protocole.verifier_hello(msg, ("HELLO", "REPRISE"))
+            except (asyncio.TimeoutError, protocole.ErreurProtocole):
+                self.stats["hello_refuses"] += 1
+                writer.close()
+                return
+            if msg["type"] == "REPRISE":
+                lecture = await self.reprendre(reader, writer, msg)
+                if lecture: await lecture
+                return
+            conn = Connexion(reader, writer, self.sessions)
+            trame = protocole.hello() + protocole.encoder({"type": "SESSION", "jeton": conn.jeton})
+            if not await conn.envoyer(trame) or conn.coupee:
+                conn.fermer()
+                return
+            lecture = conn.demarrer_lecture(self.stats)
+            self.placer(conn)
+            await lecture
+        finally:
+            self.connexions -= 1
+
+    async def reprendre(self, reader, writer, reprise):
+        conn = self.sessions.get(reprise["jeton"])
+        if conn is None or conn.fermee:
+            self.stats["reprises_refusees"] += 1
+            writer.close()
+            return None
+        try:
+            lecture = await conn.reprendre(reader, writer, reprise, self.stats)
+        except protocole.ErreurProtocole:
+            self.stats["reprises_refusees"] += 1
+            writer.close()
+            return None
+        self.stats["reprises"] += 1
+        return lecture
+
+    def placer(self, conn):
+        """Assoit conn face au premier client encore connecté de la file, sinon le met en attente"""
+        while self.attente:
+            adversaire = self.attente.popleft()
+            if not adversaire.fermee:
+                table = asyncio.create_task(self.jouer_table(adversaire, conn))
+                self.tables.add(table)
+                table.add_done_callback(self.tables.discard)
+                return
+        self.attente.append(conn)
+
+    async def jouer_table(self, a, b):
+        """Une table : manches successives jusqu'à la ruine d'un siège, un abandon ou un délai dépassé"""
+        self.stats["tables"] += 1
+        partie = Partie(self.solde, self.solde, "lan", graine=self.rng.getrandbits(64))
+        sieges = (a, b)
+        fautifs = ()
+        try:
+            while True:
+                for conn in sieges: conn.vider()
+                partie.distribuer()
+                a.instantane.soldes = (partie.joueur.solde, partie.luigi.solde)
+                b.instantane.soldes = (partie.luigi.solde, partie.joueur.solde)
+                envois = await asyncio.gather(
+                    a.envoyer_message({"type": "START", "hand": partie.joueur.main.codes()}),
+                    b.envoyer_message({"type": "START", "hand": partie.luigi.main.codes()}))
+                if not all(envois):
+                    fautifs = [c for c, ok in zip(sieges, envois) if not ok]
+                    break
+                taches = [asyncio.ensure_future(c.recevoir_main()) for c in sieges]
+                _, en_retard = await asyncio.wait(taches, timeout=self.delai_manche)
+                if en_retard:
+                    self.stats["delais_depasses"] += 1
+                    for t in en_retard: t.cancel()
+                    fautifs = [c for c, t in zip(sieges, taches) if t in en_retard]
+                    break
+                main_a, main_b = taches[0].result(), taches[1].result()
+                if main_a is None or main_b is None:
+                    fautifs = [c for c, m in zip(sieges, (main_a, main_b)) if m is None]
+                    break
+                fautifs = [c for c, donne, m in zip(sieges, partie.donnes, (main_a, main_b))
+                           if not main_autorisee(donne, m)]
+                if fautifs:
+                    self.stats["erreurs_protocole"] += len(fautifs)
+                    break
+                # Chaque client compare localement : il lui faut la main finale de l'autre
+                envois = await asyncio.gather(
+                    a.envoyer_message({"type": "HAND", "hand_obj": main_b}),
+                    b.envoyer_message({"type": "HAND", "hand_obj": main_a}))
+                partie.joueur.main.cartes = [carte_depuis_code(c) for c in main_a]
+                partie.luigi.main.cartes = [carte_depuis_code(c) for c in main_b]
+                partie.resoudre(self.mise, partie.luigi.main)
+                self.stats["manches"] += 1
+                if not all(envois):
+                    fautifs = [c for c, ok in zip(sieges, envois) if not ok]
+                    break
+                if partie.phase == "terminee":
+                    self.stats["parties_terminees"] += 1
+                    fautifs = sieges
+                    break
+                if self.pause: await asyncio.sleep(self.pause)
+        finally:
+            for conn in sieges:
+                if conn in fautifs or conn.fermee: conn.fermer()
+                else: self.placer(conn)
+
+    def etat(self):
+        duree = time.perf_counter() - self.t0
+        return dict(self.stats, connexions_actives=self.connexions, tables_actives=len(self.tables),
+                    sessions=len(self.sessions),
+                    en_attente=sum(not c.fermee for c in self.attente),
+                    manches_s=round(self.stats["manches"] / max(duree, 1e-9), 1))
+
+    async def servir(self, hote="0.0.0.0", port=5555, intervalle_stats=0, pret=None):
+        serveur = await asyncio.start_server(self.accueillir, hote, port, backlog=1024)
+        port = serveur.sockets[0].getsockname()[1]
+        print(f"Serveur multi-tables sur {hote}:{port}")
+        if pret: pret.set_result(port)
+        async with serveur:
+            if not intervalle_stats:
+                await serveur.serve_forever()
+            while True:
+                await asyncio.sleep(intervalle_stats)
+                print(self.etat())
+
+def augmenter_limite_fichiers():
+    """Des milliers de sockets dépassent souvent la limite par défaut (1024) des descripteurs"""
+    try:
+        import resource
+    except ImportError:
+        return
+    souple, dure = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if dure == resource.RLIM_INFINITY or souple < dure:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (dure if dure != resource.RLIM_INFINITY else 65536, dure))
+        except (ValueError, OSError):
+            pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur Poker Luigi multi-tables")
+    parser.add_argument("--hote", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--max-connexions", type=int, default=MAX_CONNEXIONS)
+    parser.add_argument("--delai-manche", type=float, default=DELAI_MANCHE)
+    parser.add_argument("--pause", type=float, default=PAUSE_MANCHES, help="secondes entre deux manches")
+    parser.add_argument("--mise", type=int, default=MISE_LAN)
+    parser.add_argument("--solde", type=int, default=SOLDE_INITIAL)
+    parser.add_argument("--graine", type=int, default=None)
+    parser.add_argument("--stats", type=float, default=10.0, help="intervalle d'affichage des compteurs (0 = jamais)")
+    args = parser.parse_args()
+    augmenter_limite_fichiers()
+    serveur = Serveur(args.mise, args.solde, args.delai_manche, args.pause, args.max_connexions, args.graine)
+    try:
+        asyncio.run(serveur.servir(args.hote, args.port, args.stats))
+    except KeyboardInterrupt:
+        print(serveur.etat())
+        sys.exit(0)
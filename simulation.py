@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Simulation sans interface (aucun import de tkinter, pygame ou Pillow).
+
+Joue N parties avec graine et écrit les résultats agrégés en JSON :
+ - mode solo : règles de valider (le joueur est un bot face à Luigi)
+ - mode bots : règles LAN de resolve_lan_round (à somme nulle)
+Une partie s'arrête quand un solde tombe à 0 (moteur.Partie.fin_partie) ou après --manches manches.
+
+Deux moteurs :
+ - python : moteur.Partie manche par manche (référence, toutes les politiques)
+ - numpy  : manches vectorisées par blocs avec evaluation_vectorisee, mêmes règles.
+   --verifier rejoue les mêmes donnes dans moteur.Partie et compare chaque manche.
+
+Politiques d'échange : garde (ne jette rien), simple (ancienne règle de Luigi), table (strategie.py).
+
+Usage : python simulation.py --parties 1000 --mode solo --joueur simple --luigi table
+                             --manches 200 --graine 1 --processus 4 --sortie resultats.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+
+import moteur
+from moteur import MULTIPLICATEURS, NOMS_CATEGORIES, PAQUET, Partie, regle_luigi_simple
+MANCHES_PAR_BLOC = 1 << 16  # moteur numpy : nombre de manches traitées par appel vectorisé
+PARTIES_PAR_TACHE = 4096
+
+# ------------------------
+# Politiques (moteur python)
+# ------------------------
+def _garde(main): return []
+
+def _politique(nom):
+    if nom == "garde": return _garde
+    if nom == "simple": return regle_luigi_simple
+    if nom == "table":
+        if moteur._strategie_luigi is None:
+            import strategie
+            moteur.installer_strategie_luigi(strategie.charger_table())
+        return moteur.choisir_defausse_luigi
+    raise ValueError(f"Politique inconnue : {nom}")
+
+class PaquetOrdonne:
+    """Paquet dont l'ordre de pioche est imposé (rejouer une donne numpy dans moteur.Partie)"""
+    __slots__ = ("ordre", "cartes")
+    def __init__(self, ordre):
+        self.ordre = ordre
+        self.cartes = []
+    def reinitialiser(self):
+        self.cartes = [PAQUET[c] for c in reversed(self.ordre)]
+    def piocher(self):
+        return self.cartes.pop() if self.cartes else None
+
+# ------------------------
+# Agrégats
+# ------------------------
+def _agregat_vide():
+    return {"parties": 0, "manches": 0, "issues": Counter(), "fins": Counter(),
+            "mains_joueur": Counter(), "mains_luigi": Counter(),
+            "gain_joueur": 0, "gain_luigi": 0, "solde_joueur": 0, "solde_luigi": 0}
+
+def _fusionner(total, partiel):
+    for cle, v in partiel.items():
+        total[cle] += v
+    return total
+
+# ------------------------
+# Moteur python
+# ------------------------
+def simuler_python(indices, graine, mode, joueur, luigi, manches, mise, solde):
+    pol_j, pol_l = _politique(joueur), _politique(luigi)
+    agg = _agregat_vide()
+    for i in indices:
+        p = Partie(solde, solde, mode, random.Random(graine * 1_000_003 + i))
+        for _ in range(manches):
+            r = p.jouer_manche(mise, pol_j, pol_l)
+            agg["manches"] += 1
+            agg["issues"][("defaite", "egalite", "victoire")[r.issue + 1]] += 1
+            agg["mains_joueur"][r.nom_j] += 1
+            agg["mains_luigi"][r.nom_l] += 1
+            agg["gain_joueur"] += r.delta_joueur
+            agg["gain_luigi"] += r.delta_luigi
+            if p.phase == "terminee": break
+        agg["parties"] += 1
+        agg["fins"][p.fin_partie() or "limite"] += 1
+        agg["solde_joueur"] += p.joueur.solde
+        agg["solde_luigi"] += p.luigi.solde
+    return agg
+
+# ------------------------
+# Moteur numpy
+# ------------------------
+_decisions_table = None
+_BINOMES = None
+
+def _indice_combinaison(np, tries):
+    """Rang colex d'une main triée (c0 < ... < c4) : somme C(c_i, i + 1), bijection vers 0..201 375"""
+    return sum(_BINOMES[k + 1][tries[:, k]] for k in range(5))
+
+def _charger_decisions_table(np):
+    """Défausse de la table pour les 201 376 mains, en bits sur la main triée par code.
+    Même calcul que strategie.forme_canonique, vectorisé sur toutes les mains."""
+    global _decisions_table, _BINOMES
+    if _decisions_table is None:
+        import math
+        import strategie
+        _BINOMES = [np.array([math.comb(n, k) for n in range(32)], dtype=np.int32) for k in range(6)]
+        cles, defausses = zip(*sorted(strategie.charger_table().entrees()))
+        cles, defausses = np.array(cles, dtype=np.int64), np.array(defausses, dtype=np.int64)
+
+        mains = np.array(list(combinations(range(32), 5)), dtype=np.int64)
+        rangs, couleurs = mains >> 2, mains & 3
+        masques = np.stack([np.where(couleurs == s, 1 << rangs, 0).sum(axis=1) for s in range(4)], axis=1)
+        ordre = np.argsort(-masques, axis=1, kind="stable")
+        tries = np.take_along_axis(masques, ordre, axis=1)
+        cle = tries[:, 0] << 24 | tries[:, 1] << 16 | tries[:, 2] << 8 | tries[:, 3]
+        bits = defausses[np.searchsorted(cles, cle)]
+
+        # Position de chaque carte dans l'ordre canonique : cartes des couleurs placées avant la sienne,
+        # puis cartes de sa couleur de rang inférieur
+        bits_a_un = np.array([bin(m).count("1") for m in range(256)], dtype=np.int64)
+        place = np.argsort(ordre, axis=1)
+        lignes = np.arange(len(mains))[:, None]
+        avant = np.zeros_like(mains)
+        for s in range(4):
+            avant += np.where(place[lignes, couleurs] > place[:, s:s + 1], bits_a_un[masques[:, s:s + 1]], 0)
+        position = avant + bits_a_un[masques[lignes, couleurs] & ((1 << rangs) - 1)]
+        jetee = (bits[:, None] >> position) & 1
+        decisions = np.zeros(len(mains), dtype=np.uint8)
+        decisions[_indice_combinaison(np, mains)] = (jetee << np.arange(5)).sum(axis=1)
+        _decisions_table = decisions
+    return _decisions_table
+
+def _ordre_defausse(np, nom, mains, categories):
+    """(n, 5) positions jetées dans l'ordre de pioche de la politique, complétées par -1"""
+    n = mains.shape[0]
+    ordre = np.full((n, 5), -1, dtype=np.int8)
+    if nom == "simple":
+        # sorted(range(5), key=valeur_num)[:3] : tri stable par rang, seulement sous la Suite
+        plus_faibles = np.argsort(mains >> 2, axis=1, kind="stable")[:, :3]
+        ordre[:, :3] = np.where((categories < 4)[:, None], plus_faibles, -1)
+    elif nom == "table":
+        decisions = _charger_decisions_table(np)
+        tri = np.argsort(mains, axis=1)
+        bits = decisions[_indice_combinaison(np, np.take_along_axis(mains, tri, axis=1).astype(np.intp))]
+        jetee = np.zeros((n, 5), dtype=bool)
+        lignes = np.arange(n)
+        for b in range(5):
+            jetee[lignes, tri[:, b]] = (bits >> b) & 1
+        # positions croissantes, comme TableStrategie.defausse
+        ordre = np.sort(np.where(jetee, np.arange(5), 5), axis=1).astype(np.int8)
+        ordre[ordre == 5] = -1
+    elif nom != "garde":
+        raise ValueError(f"Politique inconnue : {nom}")
+    return ordre
+
+def _piocher(np, mains, ordre, paquets, pointeur):
+    lignes = np.arange(mains.shape[0])
+    for t in range(5):
+        pos = ordre[:, t]
+        ok = pos >= 0
+        mains[lignes[ok], pos[ok]] = paquets[lignes[ok], pointeur[ok] + t]
+    return pointeur + np.count_nonzero(ordre >= 0, axis=1)
+
+def manches_numpy(np, paquets, mode, joueur, luigi, mise):
+    """Joue une manche par ligne de paquets (ordre de pioche). Retourne (cat_j, cat_l, issue, d_j, d_l)."""
+    from evaluation_vectorisee import evaluer_lot
+    main_j = paquets[:, 0:10:2].copy()
+    main_l = paquets[:, 1:10:2].copy()
+    pointeur = np.full(paquets.shape[0], 10, dtype=np.intp)
+    pointeur = _piocher(np, main_j, _ordre_defausse(np, joueur, main_j, evaluer_lot(main_j)[0]), paquets, pointeur)
+    _piocher(np, main_l, _ordre_defausse(np, luigi, main_l, evaluer_lot(main_l)[0]), paquets, pointeur)
+    cat_j, cle_j = evaluer_lot(main_j)
+    cat_l, cle_l = evaluer_lot(main_l)
+    issue = np.sign((cat_j.astype(np.int32) << 15 | cle_j) - (cat_l.astype(np.int32) << 15 | cle_l))
+    mult = np.array([MULTIPLICATEURS[n] for n in NOMS_CATEGORIES], dtype=np.int64) * mise
+    d_j = np.where(issue > 0, mult[cat_j], 0)
+    if mode == "solo":
+        d_l = np.where(issue < 0, mise, 0)
+    else:
+        d_j = np.where(issue < 0, -mult[cat_l], d_j)
+        d_l = -d_j
+    return cat_j, cat_l, issue, d_j, d_l
+
+def simuler_numpy(indices, graine, mode, joueur, luigi, manches, mise, solde):
+    import numpy as np
+    agg = _agregat_vide()
+    rng = np.random.default_rng([graine, indices[0]])
+    soldes_j = np.full(len(indices), solde, dtype=np.int64)
+    soldes_l = np.full(len(indices), solde, dtype=np.int64)
+    actives = np.arange(len(indices))
+    jouees = 0
+    # Par vagues : chaque partie encore en cours joue quelques manches d'un coup,
+    # puis on retire celles dont un solde est tombé à 0.
+    while actives.size and jouees < manches:
+        k = actives.size
+        vague = min(manches - jouees, max(1, MANCHES_PAR_BLOC // k))
+        paquets = rng.permuted(np.tile(np.arange(32, dtype=np.int8), (k * vague, 1)), axis=1)[:, :20]
+        cat_j, cat_l, issue, d_j, d_l = manches_numpy(np, paquets, mode, joueur, luigi, mise)
+
+        cumul_j = soldes_j[actives, None] + np.cumsum(d_j.reshape(k, vague), axis=1)
+        cumul_l = soldes_l[actives, None] + np.cumsum(d_l.reshape(k, vague), axis=1)
+        fini = (cumul_j <= 0) | (cumul_l <= 0)
+        termine = fini.any(axis=1)
+        derniere = np.where(termine, fini.argmax(axis=1), vague - 1)
+        jouee = (np.arange(vague) <= derniere[:, None]).ravel()
+        lignes = np.arange(k)
+        soldes_j[actives] = cumul_j[lignes, derniere]
+        soldes_l[actives] = cumul_l[lignes, derniere]
+
+        agg["manches"] += int(jouee.sum())
+        for nom, valeur in zip(("defaite", "egalite", "victoire"), np.bincount(issue[jouee] + 1, minlength=3)):
+            agg["issues"][nom] += int(valeur)
+        for cle, cats in (("mains_joueur", cat_j), ("mains_luigi", cat_l)):
+            for nom, valeur in zip(NOMS_CATEGORIES, np.bincount(cats[jouee], minlength=9)):
+                if valeur: agg[cle][nom] += int(valeur)
+        agg["gain_joueur"] += int(d_j[jouee].sum())
+        agg["gain_luigi"] += int(d_l[jouee].sum())
+        actives = actives[~termine]
+        jouees += vague
+
+    agg["parties"] = len(indices)
+    agg["fins"]["defaite"] += int((soldes_j <= 0).sum())
+    agg["fins"]["victoire"] += int(((soldes_j > 0) & (soldes_l <= 0)).sum())
+    agg["fins"]["limite"] += int(((soldes_j > 0) & (soldes_l > 0)).sum())
+    agg["solde_joueur"] = int(soldes_j.sum())
+    agg["solde_luigi"] = int(soldes_l.sum())
+    return agg
+
+def verifier(nb, graine, mode, joueur, luigi, mise):
+    """Rejoue nb donnes numpy dans moteur.Partie ; retourne le nombre de manches différentes"""
+    import numpy as np
+    rng = np.random.default_rng([graine, 0])
+    paquets = rng.permuted(np.tile(np.arange(32, dtype=np.int8), (nb, 1)), axis=1)[:, :20]
+    _, _, issue, d_j, d_l = manches_numpy(np, paquets, mode, joueur, luigi, mise)
+    pol_j, pol_l = _politique(joueur), _politique(luigi)
+    ecarts = 0
+    for i, ordre in enumerate(paquets.tolist()):
+        r = Partie(10 ** 9, 10 ** 9, mode, jeu=PaquetOrdonne(ordre)).jouer_manche(mise, pol_j, pol_l)
+        if (r.issue, r.delta_joueur, r.delta_luigi) != (issue[i], d_j[i], d_l[i]):
+            ecarts += 1
+    return ecarts
+
+# ------------------------
+# Lancement
+# ------------------------
+def _tache(args):
+    moteur_nom = args[0]
+    return (simuler_numpy if moteur_nom == "numpy" else simuler_python)(*args[1:])
+
+def simuler(parties, mode="solo", joueur="simple", luigi="table", manches=200, mise=10, solde=100,
+            graine=0, processus=None, moteur_nom="numpy"):
+    regles = "solo" if mode == "solo" else "lan"
+    processus = processus or os.cpu_count()
+    if "table" in (joueur, luigi):
+        import strategie
+        strategie.charger_table()  # (re)génère la table ici plutôt que dans chaque processus
+    # Blocs fixes de parties : le résultat ne dépend pas du nombre de processus
+    taille = PARTIES_PAR_TACHE if moteur_nom == "numpy" else 50
+    taches = [(moteur_nom, list(range(d, min(d + taille, parties))), graine, regles, joueur, luigi, manches, mise, solde)
+              for d in range(0, parties, taille)]
+    total = _agregat_vide()
+    t0 = time.perf_counter()
+    if processus == 1:
+        for t in taches: _fusionner(total, _tache(t))
+    else:
+        with ProcessPoolExecutor(max_workers=processus) as pool:
+            for f in as_completed([pool.submit(_tache, t) for t in taches]):
+                _fusionner(total, f.result())
+    duree = time.perf_counter() - t0
+    n = max(total["parties"], 1)
+    return {
+        "parametres": {"parties": parties, "mode": mode, "joueur": joueur, "luigi": luigi, "manches_max": manches,
+                       "mise": mise, "solde_initial": solde, "graine": graine, "processus": processus,
+                       "moteur": moteur_nom},
+        "parties": total["parties"],
+        "manches": total["manches"],
+        "duree_s": round(duree, 3),
+        "manches_par_seconde": round(total["manches"] / duree) if duree else None,
+        "manches_par_seconde_par_processus": round(total["manches"] / duree / processus) if duree else None,
+        "issues": dict(total["issues"]),
+        "fins": dict(total["fins"]),
+        "mains_joueur": dict(total["mains_joueur"]),
+        "mains_luigi": dict(total["mains_luigi"]),
+        "gain_moyen_joueur_par_manche": total["gain_joueur"] / max(total["manches"], 1),
+        "gain_moyen_luigi_par_manche": total["gain_luigi"] / max(total["manches"], 1),
+        "solde_final_moyen": {"joueur": total["solde_joueur"] / n, "luigi": total["solde_luigi"] / n},
+        "modules_graphiques_charges": sorted(m for m in ("tkinter", "pygame", "PIL") if m in sys.modules),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulation de parties de Poker Luigi sans interface")
+    parser.add_argument("--parties", type=int, default=1000)
+    parser.add_argument("--mode", choices=("solo", "bots"), default="solo")
+    parser.add_argument("--joueur", choices=("garde", "simple", "table"), default="simple")
+    parser.add_argument("--luigi", choices=("garde", "simple", "table"), default="table")
+    parser.add_argument("--manches", type=int, default=200, help="manches maximum par partie")
+    parser.add_argument("--mise", type=int, default=10)
+    parser.add_argument("--solde", type=int, default=100)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--processus", type=int, default=None)
+    parser.add_argument("--moteur", choices=("numpy", "python"), default=None,
+                        help="numpy par défaut s'il est installé")
+    parser.add_argument("--verifier", type=int, default=0, metavar="N",
+                        help="compare d'abord N donnes numpy à moteur.Partie")
+    parser.add_argument("--sortie", default=None, help="fichier JSON (sinon sortie standard)")
+    args = parser.parse_args()
+
+    if args.moteur is None:
+        args.moteur = "numpy" if importlib.util.find_spec("numpy") else "python"
+    regles = "solo" if args.mode == "solo" else "lan"
+    if args.verifier:
+        ecarts = verifier(args.verifier, args.graine, regles, args.joueur, args.luigi, args.mise)
+        print(f"Vérification : {args.verifier} manches, {ecarts} écart(s)", file=sys.stderr)
+        if ecarts: sys.exit(1)
+
+    resultats = simuler(args.parties, args.mode, args.joueur, args.luigi, args.manches, args.mise,
+                        args.solde, args.graine, args.processus, args.moteur)
+    texte = json.dumps(resultats, ensure_ascii=False, indent=2)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(texte)
+    else:
+        print(texte)
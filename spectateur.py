@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Spectateur d'une table LAN (console) et banc d'essai de la diffusion.
+
+regarder : se connecte à l'hôte d'une partie LAN avec SPECTATEUR (au lieu de HELLO) et affiche le
+flux public de la table : début de chaque manche (soldes), mains finales révélées, résultat. Les
+mains ne sont jamais envoyées aux spectateurs avant l'abattage.
+
+banc : N spectateurs en boucle locale (plus --lents spectateurs qui ne lisent jamais) reçoivent
+des événements diffusés par reseau.Diffusion ; mesure le temps passé par l'appelant (la boucle Tk
+de l'hôte), la latence jusqu'au dernier spectateur et compare à l'envoi naïf (un encodage et un
+sendall par spectateur, comme NetworkManager.send).
+
+Usage : python spectateur.py regarder 192.168.1.20 [--port 5555]
+        python spectateur.py banc [--spectateurs 500] [--evenements 2000] [--cadence 200] [--lents 10]
+                                  [--politique couper|sauter] [--limite 64] [--sortie banc.json]
+"""
+
+import argparse
+import json
+import selectors
+import socket
+import sys
+import threading
+import time
+
+import protocole
+from moteur import PAQUET, evaluer_codes
+from reseau import DELAI_HELLO, LIMITE_FILE_SPECTATEUR, Diffusion, lire_trame
+
+# ------------------------
+# Spectateur
+# ------------------------
+def connecter(hote, port=5555, delai=DELAI_HELLO):
+    sock = socket.create_connection((hote, port), timeout=delai)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        sock.sendall(protocole.spectateur())
+        protocole.verifier_hello(lire_trame(sock))
+    except Exception:
+        sock.close()
+        raise
+    sock.settimeout(None)
+    return sock
+
+def regarder(hote, port, callback):
+    """Appelle callback pour chaque événement public jusqu'à la fin de la partie"""
+    sock = connecter(hote, port)
+    try:
+        while True:
+            callback(lire_trame(sock))
+    except ConnectionError:
+        pass
+    finally:
+        sock.close()
+
+def _main(codes):
+    return f"{' '.join(repr(PAQUET[c]) for c in codes)} ({evaluer_codes(*codes)[1]})"
+
+def afficher(msg):
+    t = msg["type"]
+    if t == "MANCHE":
+        print(f"Manche {msg['numero']} — hôte {msg['soldes'][0]} / client {msg['soldes'][1]}")
+    elif t == "REVELE":
+        print(f"  hôte   : {_main(msg['main_hote'])}")
+        print(f"  client : {_main(msg['main_client'])}")
+    elif t == "RESULTAT":
+        issue = {1: "l'hôte gagne", 0: "égalité", -1: "le client gagne"}[msg["issue"]]
+        print(f"  {issue} ({msg['gain_hote']:+d} pour l'hôte) — hôte {msg['soldes'][0]} / client {msg['soldes'][1]}")
+
+# ------------------------
+# Banc d'essai
+# ------------------------
+def evenements_types(nb):
+    """Cycle MANCHE / REVELE / RESULTAT comme une table réelle (tailles de trames réelles)"""
+    messages = []
+    for i in range(nb):
+        n = i // 3 + 1
+        if i % 3 == 0: messages.append({"type": "MANCHE", "numero": n, "soldes": (100, 100)})
+        elif i % 3 == 1: messages.append({"type": "REVELE", "numero": n, "main_hote": [0, 5, 10, 15, 20],
+                                          "main_client": [1, 6, 11, 16, 21]})
+        else: messages.append({"type": "RESULTAT", "numero": n, "issue": 1, "gain_hote": 10, "soldes": (110, 90)})
+    return messages
+
+class BancDiffusion:
+    """Diffusion vers des spectateurs en boucle locale, lus par un seul thread (selectors).
+    attendre(k) bloque jusqu'à ce que tous les spectateurs rapides aient reçu k octets."""
+    def __init__(self, spectateurs, lents=0, limite=LIMITE_FILE_SPECTATEUR, politique="couper"):
+        self.diffusion = Diffusion(limite, politique)
+        ecoute = socket.socket()
+        ecoute.bind(("127.0.0.1", 0))
+        ecoute.listen(1024)
+        self.rapides = []
+        self.lents = []
+        for i in range(spectateurs + lents):
+            c = socket.socket()
+            if i >= spectateurs:
+                c.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)  # ne lit jamais
+            c.connect(ecoute.getsockname())
+            s, _ = ecoute.accept()
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if i >= spectateurs: s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+            (self.lents if i >= spectateurs else self.rapides).append(c)
+            self.diffusion.ajouter(s)
+        ecoute.close()
+        self.recus = dict.fromkeys(self.rapides, 0)
+        self.minimum = 0  # octets reçus par le plus en retard des spectateurs rapides
+        self.coupes = 0   # spectateurs rapides coupés par la diffusion
+        self._cond = threading.Condition()
+        self._selecteur = selectors.DefaultSelector()
+        for c in self.rapides:
+            c.setblocking(False)
+            self._selecteur.register(c, selectors.EVENT_READ)
+        self._fin = False
+        self._thread = threading.Thread(target=self._lire, daemon=True)
+        self._thread.start()
+
+    def _lire(self):
+        en_retard = {0: len(self.rapides)}  # octets reçus -> nombre de spectateurs à ce niveau
+        while not self._fin:
+            for cle, _ in self._selecteur.select(0.2):
+                c = cle.fileobj
+                try:
+                    n = len(c.recv(65536))
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    n = 0
+                avant = self.recus[c]
+                if not n:
+                    self._selecteur.unregister(c)
+                    self.coupes += 1
+                    n = float("inf")  # ne retient plus le minimum
+                self.recus[c] = avant + n
+                en_retard[avant] -= 1
+                if not en_retard[avant]: del en_retard[avant]
+                en_retard[avant + n] = en_retard.get(avant + n, 0) + 1
+                if avant == self.minimum and self.minimum not in en_retard:
+                    with self._cond:
+                        self.minimum = min(en_retard)
+                        self._cond.notify_all()
+
+    def attendre(self, octets, delai=30.0):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.minimum >= octets, delai)
+
+    def fermer(self):
+        self._fin = True
+        self._thread.join()
+        self.diffusion.fermer()
+        for c in self.rapides + self.lents: c.close()
+        self._selecteur.close()
+
+def banc(spectateurs, evenements, cadence, lents=0, limite=LIMITE_FILE_SPECTATEUR, politique="couper"):
+    messages = evenements_types(evenements)
+    b = BancDiffusion(spectateurs, lents, limite, politique)
+    periode = 1.0 / cadence if cadence else 0.0
+    latences = []
+    appelant = 0.0
+    total = 0
+    t0 = prochain = time.perf_counter()
+    try:
+        for msg in messages:
+            if periode:
+                prochain += periode
+                time.sleep(max(prochain - time.perf_counter(), 0))
+            debut = time.perf_counter()
+            total += len(b.diffusion.diffuser(msg))
+            appelant += time.perf_counter() - debut
+            if not periode: continue
+            # Cadencé : latence de chaque événement jusqu'au dernier spectateur rapide
+            if b.attendre(total): latences.append(time.perf_counter() - debut)
+        complet = b.attendre(total)
+        duree = time.perf_counter() - t0
+        stats = b.diffusion.statistiques()
+    finally:
+        b.fermer()
+    latences.sort()
+    q = lambda p: round(latences[min(int(p * len(latences)), len(latences) - 1)] * 1e3, 3) if latences else None
+    return {"spectateurs": spectateurs, "lents": lents, "evenements": evenements, "cadence": cadence,
+            "politique": politique, "limite": limite, "complet": complet, "duree_s": round(duree, 3),
+            "livraisons_s": round(evenements * spectateurs / duree),
+            "appelant_us_par_evenement": round(appelant / evenements * 1e6, 2),
+            "latence_ms": {"p50": q(0.5), "p99": q(0.99), "max": q(1.0)},
+            "rapides_coupes": b.coupes, "diffusion": stats}
+
+def banc_naif(spectateurs, evenements):
+    """Référence : un encodage et un sendall bloquant par spectateur dans l'appelant (spectateurs rapides)"""
+    messages = evenements_types(evenements)
+    ecoute = socket.socket()
+    ecoute.bind(("127.0.0.1", 0))
+    ecoute.listen(1024)
+    paires = []
+    for _ in range(spectateurs):
+        c = socket.create_connection(ecoute.getsockname())
+        s, _ = ecoute.accept()
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        paires.append((c, s))
+    ecoute.close()
+    fin = threading.Event()
+    def vider():
+        sel = selectors.DefaultSelector()
+        for c, _ in paires:
+            c.setblocking(False)
+            sel.register(c, selectors.EVENT_READ)
+        while not fin.is_set():
+            for cle, _ in sel.select(0.1):
+                try: cle.fileobj.recv(65536)
+                except OSError: pass
+        sel.close()
+    lecteur = threading.Thread(target=vider, daemon=True)
+    lecteur.start()
+    t0 = time.perf_counter()
+    for msg in messages:
+        for _, s in paires: s.sendall(protocole.encoder(msg))
+    duree = time.perf_counter() - t0
+    fin.set()
+    lecteur.join()
+    for c, s in paires:
+        c.close()
+        s.close()
+    return {"spectateurs": spectateurs, "evenements": evenements,
+            "appelant_us_par_evenement": round(duree / evenements * 1e6, 2)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spectateur d'une table LAN de Poker Luigi")
+    parser.add_argument("commande", choices=("regarder", "banc"))
+    parser.add_argument("hote", nargs="?", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--spectateurs", type=int, default=500)
+    parser.add_argument("--lents", type=int, default=10, help="spectateurs qui ne lisent jamais")
+    parser.add_argument("--evenements", type=int, default=2000)
+    parser.add_argument("--cadence", type=float, default=200.0, help="événements/s (0 = au plus vite)")
+    parser.add_argument("--politique", choices=("couper", "sauter"), default="couper")
+    parser.add_argument("--limite", type=int, default=LIMITE_FILE_SPECTATEUR)
+    parser.add_argument("--sortie", default=None)
+    args = parser.parse_args()
+    if args.commande == "regarder":
+        try:
+            regarder(args.hote, args.port, afficher)
+        except (OSError, protocole.ErreurProtocole) as e:
+            print("Connexion impossible :", e)
+            sys.exit(1)
+        except KeyboardInterrupt:
+            pass
+        print("Fin de la diffusion.")
+    else:
+        rapport, sys.stdout = sys.stdout, sys.stderr  # "Spectateur connecté ..." hors du rapport
+        resultat = {"diffusion": banc(args.spectateurs, args.evenements, args.cadence, args.lents, args.limite,
+                                      args.politique),
+                    "naif": banc_naif(args.spectateurs, min(args.evenements, 500))}
+        sys.stdout = rapport
+        texte = json.dumps(resultat, indent=2, ensure_ascii=False)
+        if args.sortie:
+            with open(args.sortie, "w", encoding="utf-8") as f: f.write(texte)
+        print(texte)
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Table de stratégie d'échange pour Luigi.
+
+Générateur hors-ligne : pour chaque main à isomorphisme de couleur près (10 808 classes sur les
+201 376 mains), calcule la défausse qui maximise le gain moyen de Luigi dans le modèle ci-dessous,
+puis écrit le résultat dans un petit fichier binaire que le jeu ouvre en mmap et lit en O(1).
+
+Modèle (approché) : le joueur adverse joue l'ancienne règle de Luigi (regle_luigi_simple) ; la
+distribution de sa main finale est estimée une fois pour toutes par NB_TIRAGES tirages avec graine,
+sur le paquet complet. Elle est la même pour toutes les mains de Luigi : elle ne tient compte ni
+des cartes qu'il a en main ni de celles qu'il jette (qui manquent en réalité à l'adversaire). La
+défausse est donc optimale contre cet adversaire fixe, pas l'optimum exact de la donne.
+
+Le gain de Luigi est celui de gains_manche pour le mode de la table : en solo (le seul mode où
+joue Luigi, table du jeu) il gagne la mise quand il l'emporte et ne perd rien sinon, la défausse
+maximise donc sa probabilité de gagner ; en LAN (--mode lan, pour l'analyse) le gain est à somme
+nulle, +MULTIPLICATEURS[main de Luigi] s'il gagne, -MULTIPLICATEURS[main adverse] s'il perd.
+
+Dans ce modèle, l'espérance de chaque défausse est calculée sans tirage (toutes les mains
+finales de Luigi sont énumérées) : T(S) = somme des valeurs des mains contenant S, puis inversion
+de Möbius sur les 32 sous-ensembles de la main pour exclure les cartes jetées.
+
+Format (petit-boutiste) :
+  en-tête  : "LUIG", version u16, empreinte u32, nb_alvéoles u32, nb_classes u32, crc32 u32
+  alvéoles : nb_alvéoles x (clé u32 = masques de rangs par couleur triés, défausse u8 = bits
+             dans l'ordre canonique des cartes) ; adressage ouvert, clé 0 = alvéole vide.
+
+La génération (une dizaine de secondes) peut se faire dans un processus à part (charger_table(
+processus=True)) pour ne pas disputer le GIL à l'interface.
+
+Usage : python strategie.py [--fichier strategie_luigi.bin] [--mode solo|lan]  (sinon générée au premier chargement)
+"""
+
+import argparse
+import math
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from moteur import MULTIPLICATEURS, PAQUET, evaluer_codes, gains_manche, regle_luigi_simple, MainJoueur
+
+FICHIER_TABLE = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "strategie_luigi.bin")
+
+VERSION_TABLE = 2
+NB_TIRAGES = 200_000
+GRAINE = 0
+_BITS_ALVEOLES = 14
+NB_ALVEOLES = 1 << _BITS_ALVEOLES  # > 1.5 x 10 808 classes
+_ENTETE = struct.Struct("<4sHIIII")
+_ALVEOLE = struct.Struct("<IB")
+_MAGIQUE = b"LUIG"
+
+def empreinte(mode="solo"):
+    """Résumé des paramètres de génération : une table produite avec d'autres règles est périmée"""
+    return zlib.crc32(repr((VERSION_TABLE, mode, sorted(MULTIPLICATEURS.items()), NB_TIRAGES, GRAINE)).encode("utf-8"))
+
+def _force(res):
+    """(score, nom, ordre_valeurs) -> entier comparable (ordre_valeurs compacté en base 8)"""
+    cle = 0
+    for v in res[2]: cle = cle * 8 + v
+    return res[0] * 8 ** 5 + cle * 8 ** (5 - len(res[2]))
+
+# ------------------------
+# Forme canonique (isomorphisme de couleur)
+# ------------------------
+def forme_canonique(codes):
+    """Retourne (clé, cartes dans l'ordre canonique). Deux mains qui ne diffèrent que par une
+    permutation des couleurs ont la même clé."""
+    masques = [0, 0, 0, 0]
+    for c in codes: masques[c & 3] |= 1 << (c >> 2)
+    ordre = sorted(range(4), key=masques.__getitem__, reverse=True)
+    cle = masques[ordre[0]] << 24 | masques[ordre[1]] << 16 | masques[ordre[2]] << 8 | masques[ordre[3]]
+    canon = [r * 4 + s for s in ordre for r in range(8) if masques[s] >> r & 1]
+    return cle, canon
+
+def _alveole(cle):
+    return ((cle * 2654435761) & 0xFFFFFFFF) >> (32 - _BITS_ALVEOLES)
+
+# ------------------------
+# Génération
+# ------------------------
+def distribution_adverse(nb_tirages=NB_TIRAGES, graine=GRAINE):
+    """Forces des mains finales d'un adversaire qui joue regle_luigi_simple (tirages avec graine sur le
+    paquet complet : la même distribution sert pour toutes les mains de Luigi)"""
+    rng = random.Random(graine)
+    cartes = list(PAQUET)
+    main = MainJoueur()
+    compte = Counter()
+    for _ in range(nb_tirages):
+        tirage = rng.sample(cartes, 8)
+        main.cartes = tirage[:5]
+        for i, c in zip(regle_luigi_simple(main), tirage[5:]):
+            main.cartes[i] = c
+        res = main.evaluer_main()
+        compte[(_force(res), res[1])] += 1
+    return compte, nb_tirages
+
+def valeurs_mains(compte, total, mode="solo"):
+    """Gain moyen de Luigi (en mises, gains_manche du mode) pour chacune des 201 376 mains finales,
+    indexé par masque 32 bits"""
+    forces = sorted(compte)
+    cles = [f for f, _ in forces]
+    p_cumul = [0.0]
+    perte_cumul = [0.0]  # variation de Luigi quand il perd contre les mains jusqu'à celle-ci (<= 0)
+    for f, nom in forces:
+        p = compte[(f, nom)] / total
+        p_cumul.append(p_cumul[-1] + p)
+        perte_cumul.append(perte_cumul[-1] + p * gains_manche(1, nom, None, 1, mode)[1])
+    valeurs = {}
+    for main in combinations(range(32), 5):
+        res = evaluer_codes(*main)
+        f = _force(res)
+        inf, sup = bisect_left(cles, f), bisect_right(cles, f)
+        # Luigi est l'adversaire (second terme) de gains_manche ; issue vue du joueur
+        gagne = p_cumul[inf] * gains_manche(-1, None, res[1], 1, mode)[1]
+        perd = perte_cumul[-1] - perte_cumul[sup]
+        masque = 0
+        for c in main: masque |= 1 << c
+        valeurs[masque] = gagne + perd
+    return valeurs
+
+def _sommes_sur_surensembles(valeurs):
+    """T(S) pour tout S de 0 à 5 cartes : somme des valeurs des mains qui contiennent S"""
+    t = Counter()
+    for masque, v in valeurs.items():
+        sous = [0]
+        for b in range(32):
+            if masque >> b & 1: sous += [s | 1 << b for s in sous]
+        for s in sous: t[s] += v
+    return t
+
+def meilleure_defausse(canon, t):
+    """Défausse optimale (bits dans l'ordre canonique) d'une main représentée par ses 5 codes"""
+    g = []
+    for b in range(32):
+        s = 0
+        for i in range(5):
+            if b >> i & 1: s |= 1 << canon[i]
+        g.append(t[s])
+    # Inversion de Möbius : g[b] = somme sur les mains qui gardent b et ne reprennent aucune carte jetée
+    for i in range(5):
+        for b in range(32):
+            if not b >> i & 1: g[b] -= g[b | 1 << i]
+    meilleur, meilleur_gain = 0, None
+    for garde in sorted(range(32), key=lambda b: -bin(b).count("1")):
+        gain = g[garde] / math.comb(27, 5 - bin(garde).count("1"))
+        if meilleur_gain is None or gain > meilleur_gain + 1e-12:
+            meilleur, meilleur_gain = 31 & ~garde, gain
+    return meilleur
+
+def generer_table(fichier=FICHIER_TABLE, mode="solo"):
+    compte, total = distribution_adverse()
+    t = _sommes_sur_surensembles(valeurs_mains(compte, total, mode))
+    alveoles = [(0, 0)] * NB_ALVEOLES
+    classes = 0
+    vues = set()
+    for main in combinations(range(32), 5):
+        cle, canon = forme_canonique(main)
+        if cle in vues: continue
+        vues.add(cle)
+        classes += 1
+        i = _alveole(cle)
+        while alveoles[i][0]: i = (i + 1) & (NB_ALVEOLES - 1)
+        alveoles[i] = (cle, meilleure_defausse(canon, t))
+    corps = b"".join(_ALVEOLE.pack(c, d) for c, d in alveoles)
+    entete = _ENTETE.pack(_MAGIQUE, VERSION_TABLE, empreinte(mode), NB_ALVEOLES, classes, zlib.crc32(corps))
+    temp = fichier + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(entete + corps)
+    os.replace(temp, fichier)
+    return classes
+
+# ------------------------
+# Lecture en jeu
+# ------------------------
+class TableStrategie:
+    """Table ouverte en mmap ; defausse() coûte une forme canonique + une ou deux alvéoles lues"""
+    def __init__(self, fichier=FICHIER_TABLE, mode="solo"):
+        with open(fichier, "rb") as f:
+            self.donnees = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.donnees) < _ENTETE.size:
+            self.donnees.close()
+            raise ValueError("Table de stratégie tronquée")
+        magique, version, emp, nb, classes, crc = _ENTETE.unpack_from(self.donnees, 0)
+        corps = self.donnees[_ENTETE.size:]
+        if (magique != _MAGIQUE or version != VERSION_TABLE or emp != empreinte(mode) or nb != NB_ALVEOLES
+                or len(corps) != nb * _ALVEOLE.size or zlib.crc32(corps) != crc):
+            self.donnees.close()
+            raise ValueError("Table de stratégie périmée ou corrompue")
+        self.classes = classes
+
+    def defausse(self, codes):
+        """Indices (dans codes) des cartes à jeter"""
+        cle, canon = forme_canonique(codes)
+        i = _alveole(cle)
+        while True:
+            c, bits = _ALVEOLE.unpack_from(self.donnees, _ENTETE.size + i * _ALVEOLE.size)
+            if c == cle or c == 0: break
+            i = (i + 1) & (NB_ALVEOLES - 1)
+        jetees = {canon[b] for b in range(5) if bits >> b & 1}
+        return [i for i, c in enumerate(codes) if c in jetees]
+
+    def entrees(self):
+        """(clé canonique, bits de défausse) de chaque classe, pour construire des tables dérivées"""
+        for i in range(NB_ALVEOLES):
+            cle, bits = _ALVEOLE.unpack_from(self.donnees, _ENTETE.size + i * _ALVEOLE.size)
+            if cle: yield cle, bits
+
+    def fermer(self):
+        self.donnees.close()
+
+def charger_table(fichier=FICHIER_TABLE, mode="solo", processus=False):
+    """Ouvre la table ; la (re)génère d'abord si elle manque, est périmée ou corrompue.
+    processus : génération dans un processus séparé (le jeu garde le GIL pour l'interface)"""
+    try:
+        return TableStrategie(fichier, mode)
+    except (OSError, ValueError, struct.error) as e:
+        print("Table de stratégie à (re)générer :", e)
+    if processus:
+        # spawn : pas de fork d'un processus qui a déjà des threads (Tk, audio, réseau)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pool.submit(generer_table, fichier, mode).result()
+    else:
+        generer_table(fichier, mode)
+    return TableStrategie(fichier, mode)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère la table de stratégie d'échange de Luigi")
+    parser.add_argument("--fichier", default=FICHIER_TABLE)
+    parser.add_argument("--mode", choices=("solo", "lan"), default="solo",
+                        help="gains de gains_manche à maximiser (Luigi ne joue qu'en solo)")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    classes = generer_table(args.fichier, args.mode)
+    print(f"{classes} classes écrites dans {args.fichier} ({os.path.getsize(args.fichier)} octets) "
+          f"en {time.perf_counter() - t0:.1f} s")
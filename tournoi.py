@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Poker Luigi - Tournoi de bots (bots.py) en tête-à-tête, sur plusieurs processus.
+
+Chaque rencontre A contre B se joue par paquets de donnes avec graine : chaque donne est jouée
+deux fois, A au siège 0 puis B au siège 0, pour que la chance des cartes s'annule (seuls les
+choix des bots font la différence). Règles LAN de resolve_lan_round (à somme nulle) ; la mise
+d'une manche est la plus petite des deux mises proposées.
+
+Formats :
+  tous   : toutes les paires (round-robin), --donnes donnes par paire ;
+  suisse : --rondes rondes ; à chaque ronde, les bots sont appariés par points (1 par rencontre
+           gagnée aux crédits, 0.5 pour une égalité) en évitant les rencontres déjà jouées. Avec un
+           nombre impair de bots, l'exempt (le moins bien classé qui ne l'a pas encore été et dont
+           l'absence laisse un appariement sans revanche) marque 1 point.
+
+Le classement est mis à jour à chaque paquet terminé : crédits gagnés, manches gagnées et Elo
+(modèle de Bradley-Terry ajusté sur toutes les manches jouées, égalités = une demi-victoire,
+bot de référence "luigi" à 1500 s'il participe). Les classements successifs peuvent être écrits
+au fil de l'eau (--flux, une ligne JSON par mise à jour).
+
+Usage : python tournoi.py luigi simple garde prudent --donnes 200000 [--format suisse --rondes 3]
+                          [--processus 4] [--graine 0] [--flux classement.jsonl] [--sortie final.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+
+from bots import INDICES, MISES, EtatDonne, charger_bot
+from moteur import Partie
+
+DONNES_PAR_TACHE = 20_000
+ELO_REFERENCE = 1500
+BOT_REFERENCE = "luigi"
+
+# ------------------------
+# Manches (processus de travail)
+# ------------------------
+_bots = {}
+
+def _bot(nom):
+    b = _bots.get(nom)
+    if b is None: b = _bots[nom] = charger_bot(nom)
+    return b
+
+def jouer_donne(graine, bot0, bot1, mises=MISES):
+    """Une manche : bot0 au siège 0 (main joueur), bot1 au siège 1 ; retourne le gain de bot0"""
+    partie = Partie(0, 0, "lan", graine=graine)
+    partie.distribuer()
+    main0, main1 = partie.joueur.main, partie.luigi.main
+    m0 = bot0.defausse(main0, EtatDonne(0, len(partie.jeu.cartes), None, mises))
+    partie.echanger_cartes(INDICES[m0])
+    m1 = bot1.defausse(main1, EtatDonne(1, len(partie.jeu.cartes), len(INDICES[m0]), mises))
+    partie.tour_luigi(lambda main: INDICES[m1])
+    restantes = len(partie.jeu.cartes)
+    mise = min(bot0.mise(main0, EtatDonne(0, restantes, len(INDICES[m1]), mises)),
+               bot1.mise(main1, EtatDonne(1, restantes, len(INDICES[m0]), mises)))
+    if mise not in mises: raise ValueError(f"Mise invalide : {mise}")
+    return partie.resoudre(mise).delta_joueur
+
+def jouer_paquet(a, b, graine, nb):
+    """nb donnes jouées dans les deux ordres de sièges ; bilan du point de vue de a"""
+    bot_a, bot_b = _bot(a), _bot(b)
+    rng = random.Random(graine)
+    bilan = {"a": a, "b": b, "manches": 0, "victoires_a": 0, "victoires_b": 0, "egalites": 0, "credits_a": 0}
+    for _ in range(nb):
+        g = rng.getrandbits(64)
+        for gain in (jouer_donne(g, bot_a, bot_b), -jouer_donne(g, bot_b, bot_a)):
+            bilan["manches"] += 1
+            bilan["credits_a"] += gain
+            if gain > 0: bilan["victoires_a"] += 1
+            elif gain < 0: bilan["victoires_b"] += 1
+            else: bilan["egalites"] += 1
+    return bilan
+
+def graine_paquet(graine, a, b, ronde, i):
+    """Graine d'un paquet : indépendante de l'ordre de a et b et du nombre de processus"""
+    x, y = sorted((a, b))
+    return random.Random(f"{graine}:{x}:{y}:{ronde}:{i}").getrandbits(64)
+
+# ------------------------
+# Classement
+# ------------------------
+class Classement:
+    def __init__(self, bots):
+        self.bots = list(bots)
+        self.credits = dict.fromkeys(bots, 0)
+        self.victoires = dict.fromkeys(bots, 0)
+        self.manches = dict.fromkeys(bots, 0)
+        self.points = dict.fromkeys(bots, 0.0)
+        self.duels = defaultdict(lambda: [0.0, 0])  # (a, b) trié -> [score de a, manches]
+        self.rencontres = defaultdict(int)          # (a, b) trié -> crédits de a dans la ronde en cours
+
+    def ajouter(self, bilan):
+        a, b = bilan["a"], bilan["b"]
+        n = bilan["manches"]
+        self.credits[a] += bilan["credits_a"]
+        self.credits[b] -= bilan["credits_a"]
+        self.victoires[a] += bilan["victoires_a"]
+        self.victoires[b] += bilan["victoires_b"]
+        self.manches[a] += n
+        self.manches[b] += n
+        score_a = bilan["victoires_a"] + bilan["egalites"] / 2
+        cle = tuple(sorted((a, b)))
+        self.duels[cle][0] += score_a if cle[0] == a else n - score_a
+        self.duels[cle][1] += n
+        self.rencontres[cle] += bilan["credits_a"] if cle[0] == a else -bilan["credits_a"]
+
+    def clore_ronde(self, exempt=None):
+        """Points de rencontre (suisse) : 1 au bot qui a gagné le plus de crédits, 0.5 chacun si égalité,
+        1 au bot exempt de la ronde"""
+        if exempt is not None: self.points[exempt] += 1
+        for (a, b), credits in self.rencontres.items():
+            if credits > 0: self.points[a] += 1
+            elif credits < 0: self.points[b] += 1
+            else:
+                self.points[a] += 0.5
+                self.points[b] += 0.5
+        self.rencontres.clear()
+
+    def elo(self, iterations=200):
+        """Forces de Bradley-Terry (algorithme MM) converties en Elo ; None pour un bot sans manche"""
+        joues = [x for x in self.bots if self.manches[x]]
+        force = dict.fromkeys(joues, 1.0)
+        # Une demi-manche fictive contre chaque adversaire évite les forces nulles ou infinies
+        scores = {x: 0.0 for x in joues}
+        paires = []
+        for (a, b), (s, n) in self.duels.items():
+            paires.append((a, b, n + 1))
+            scores[a] += s + 0.5
+            scores[b] += n - s + 0.5
+        for _ in range(iterations):
+            nouvelle = {}
+            for x in joues:
+                d = sum(n / (force[a] + force[b]) for a, b, n in paires if x in (a, b))
+                nouvelle[x] = scores[x] / d if d else force[x]
+            moy = math.exp(sum(math.log(v) for v in nouvelle.values()) / max(len(nouvelle), 1))
+            force = {x: v / moy for x, v in nouvelle.items()}
+        ancre = math.log10(force[BOT_REFERENCE]) if BOT_REFERENCE in force else 0.0
+        return {x: ELO_REFERENCE + 400 * (math.log10(force[x]) - ancre) if x in force else None for x in self.bots}
+
+    def tableau(self):
+        elo = self.elo()
+        lignes = [{"bot": x, "elo": round(elo[x], 1) if elo[x] is not None else None,
+                   "credits": self.credits[x], "manches": self.manches[x],
+                   "taux_victoire": self.victoires[x] / self.manches[x] if self.manches[x] else None,
+                   "credits_par_manche": self.credits[x] / self.manches[x] if self.manches[x] else None,
+                   "points": self.points[x]} for x in self.bots]
+        return sorted(lignes, key=lambda l: (l["points"], l["elo"] or 0), reverse=True)
+
+# ------------------------
+# Tournoi
+# ------------------------
+def _apparier(ordre, deja):
+    """Paires sans revanche (chaque bot contre le premier suivant possible, retour arrière si un bot
+    reste sans adversaire) ; None s'il n'en existe pas"""
+    if not ordre: return []
+    a = ordre[0]
+    for k in range(1, len(ordre)):
+        if tuple(sorted((a, ordre[k]))) in deja: continue
+        suite = _apparier(ordre[1:k] + ordre[k + 1:], deja)
+        if suite is not None: return [(a, ordre[k])] + suite
+    return None
+
+def apparier_suisse(classement, deja, rng, exemptes=()):
+    """(paires de la ronde, bot exempt ou None) : ordre des points, sans revanche si c'est possible.
+    Nombre impair de bots : l'exempt est le moins bien classé qui ne l'a pas encore été (puis les
+    autres) parmi ceux dont l'absence permet un appariement sans revanche"""
+    ordre = sorted(classement.bots, key=lambda x: (-classement.points[x], rng.random()))
+    if len(ordre) % 2 == 0:
+        candidats = [None]
+    else:
+        candidats = sorted(reversed(ordre), key=lambda x: x in exemptes)  # tri stable : du dernier au premier
+    for exempt in candidats:
+        paires = _apparier([x for x in ordre if x != exempt], deja)
+        if paires is not None: return paires, exempt
+    # Revanche inévitable : mêmes règles sans tenir compte des rencontres passées
+    exempt = candidats[0]
+    return _apparier([x for x in ordre if x != exempt], set()), exempt
+
+def tournoi(bots, donnes, format_="tous", rondes=3, processus=None, graine=0, flux=None, intervalle=1.0):
+    processus = processus or os.cpu_count()
+    if len(set(bots)) != len(bots) or len(bots) < 2: raise ValueError("Il faut au moins deux bots différents")
+    for b in bots: charger_bot(b)  # erreurs de nom et (re)génération de la table avant le pool
+    classement = Classement(bots)
+    rng = random.Random(graine)
+    deja = set()
+    exemptes = []
+    t0 = time.perf_counter()
+    derniere = 0.0
+    total_manches = 0
+
+    def publier(force=False):
+        nonlocal derniere
+        if not force and time.perf_counter() - derniere < intervalle: return
+        derniere = time.perf_counter()
+        tableau = classement.tableau()
+        duree = derniere - t0
+        print(f"[{duree:7.1f} s] {total_manches} manches ({total_manches / max(duree, 1e-9):.0f}/s)  " +
+              "  ".join(f"{l['bot']} {'-' if l['elo'] is None else round(l['elo'])} ({l['credits']:+d})" for l in tableau),
+              file=sys.stderr)
+        if flux:
+            flux.write(json.dumps({"duree_s": round(duree, 3), "manches": total_manches, "classement": tableau},
+                                  ensure_ascii=False) + "\n")
+            flux.flush()
+
+    nb_rondes = rondes if format_ == "suisse" else 1
+    pool = ProcessPoolExecutor(max_workers=processus) if processus > 1 else None
+    try:
+        for ronde in range(nb_rondes):
+            exempt = None
+            if format_ == "tous":
+                paires = list(combinations(bots, 2))
+            else:
+                paires, exempt = apparier_suisse(classement, deja, rng, exemptes)
+                if exempt is not None: exemptes.append(exempt)
+            deja.update(tuple(sorted(p)) for p in paires)
+            taches = [(a, b, graine_paquet(graine, a, b, ronde, i), min(DONNES_PAR_TACHE, donnes - d))
+                      for a, b in paires for i, d in enumerate(range(0, donnes, DONNES_PAR_TACHE))]
+            resultats = ((jouer_paquet(*t) for t in taches) if pool is None
+                         else (f.result() for f in as_completed([pool.submit(jouer_paquet, *t) for t in taches])))
+            for bilan in resultats:
+                classement.ajouter(bilan)
+                total_manches += bilan["manches"]
+                publier()
+            classement.clore_ronde(exempt)
+            publier(force=True)
+    finally:
+        if pool: pool.shutdown(cancel_futures=True)
+    duree = time.perf_counter() - t0
+    return {"parametres": {"bots": bots, "format": format_, "rondes": nb_rondes, "donnes_par_rencontre": donnes,
+                           "graine": graine, "processus": processus},
+            "exemptes": exemptes,
+            "manches": total_manches, "duree_s": round(duree, 3),
+            "manches_par_seconde": round(total_manches / duree) if duree else None,
+            "classement": classement.tableau(),
+            "duels": [{"a": a, "b": b, "score_a": s / n, "manches": n} for (a, b), (s, n) in sorted(classement.duels.items())]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tournoi de bots de Poker Luigi")
+    parser.add_argument("bots", nargs="+", help="noms de bots.BOTS ou module:Classe")
+    parser.add_argument("--donnes", type=int, default=100_000, help="donnes par rencontre (chacune jouée dans les deux sens)")
+    parser.add_argument("--format", choices=("tous", "suisse"), default="tous")
+    parser.add_argument("--rondes", type=int, default=3)
+    parser.add_argument("--processus", type=int, default=None)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--flux", default=None, help="classements successifs (JSON, une ligne par mise à jour)")
+    parser.add_argument("--sortie", default=None)
+    args = parser.parse_args()
+    flux = open(args.flux, "a", encoding="utf-8") if args.flux else None
+    try:
+        resultat = tournoi(args.bots, args.donnes, args.format, args.rondes, args.processus, args.graine, flux)
+    finally:
+        if flux: flux.close()
+    texte = json.dumps(resultat, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f: f.write(texte)
+    else:
+        print(texte)